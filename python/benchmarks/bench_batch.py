@@ -0,0 +1,48 @@
+# Wall time to compile a directory of generated programs with Batch.compile_files,
+# at several --jobs settings; plus what each file costs to send back from a
+# worker, as a marshalled code object against a pickled AST.
+#
+# Usage: uv run python benchmarks/bench_batch.py [files] [lines] [engine]
+#
+
+import marshal
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+from pylinguis.Batch import compile_files
+from pylinguis.parsers import find_parser
+
+from corpus import generate
+
+def main() -> None:
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    engine = sys.argv[3] if len(sys.argv) > 3 else "antlr"
+    cpus = os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fnames = []
+        for i in range(files):
+            fname = os.path.join(tmp, f"prog{i}.lin")
+            with open(fname, "wt") as f:
+                f.write(generate(lines))
+            fnames.append(fname)
+
+        module = find_parser("en-us", engine=engine).parse_file(fnames[0])
+        print(f"per-file payload: marshalled code {len(marshal.dumps(compile(module, fnames[0], 'exec'))):7} bytes, "
+              f"pickled AST {len(pickle.dumps(module, protocol=pickle.HIGHEST_PROTOCOL)):7} bytes")
+
+        base = None
+        for jobs in sorted({ 1, 2, 4, cpus }):
+            start = time.perf_counter()
+            results = compile_files(fnames, engine=engine, jobs=jobs)
+            elapsed = time.perf_counter() - start
+            assert all(r.code is not None for r in results)
+            base = base or elapsed
+            print(f"{engine} jobs={jobs:<3}: {elapsed:7.2f} s ({files} files of {lines} lines, {base / elapsed:4.1f}x, {cpus} CPUs)")
+
+if __name__ == "__main__":
+    main()
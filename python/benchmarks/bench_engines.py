@@ -0,0 +1,42 @@
+# Whole-parse throughput (source text to ast.Module) of the ANTLR and the hand-written
+# ("fast") engines, on large generated sources in every language.
+#
+# Usage: uv run python benchmarks/bench_engines.py [lines] [repeat]
+#
+
+import ast
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+from pylinguis.parsers.Languages import languages
+
+from corpus import generate
+
+def parse_time(parser, code: str, repeat: int) -> float:
+    """Returns the best of repeat whole parses, in seconds."""
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse(code)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    for name, language in languages.items():
+        code = generate(lines, language)
+        antlr = find_parser(name)
+        fast = find_parser(name, engine="fast")
+        assert ast.dump(antlr.parse(code)) == ast.dump(fast.parse(code)), f"{name}: engines disagree"
+
+        antlr_time = parse_time(antlr, code, repeat)
+        fast_time = parse_time(fast, code, repeat)
+        print(f"{name:6}: antlr {lines / antlr_time:10,.0f} lines/sec, fast {lines / fast_time:10,.0f} lines/sec "
+              f"({antlr_time / fast_time:.1f}x; {lines} lines)")
+
+if __name__ == "__main__":
+    main()
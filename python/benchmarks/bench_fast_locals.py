@@ -0,0 +1,79 @@
+# Loop-heavy Linguis programs run the way the driver runs them (exec of the module,
+# top-level names in a dict) and in fast-locals mode (the top level wrapped in a
+# function).
+#
+# Usage: uv run python benchmarks/bench_fast_locals.py [iterations] [repeats]
+#
+
+import contextlib
+import io
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+
+PROGRAMS = {
+    "for loop": """
+        total = 0;
+        for i = 0 to {n} do
+          total = total + i % 7;
+        end
+        """,
+    "while loop": """
+        i = 0;
+        x = 0;
+        while i < {n} do
+          t = i * 3;
+          x = x + t - i;
+          i = i + 1;
+        end
+        """,
+    "calls in a loop": """
+        def sq(n)
+          return n * n;
+        end
+        def sumsq(a, b)
+          return sq(a) + sq(b);
+        end
+        s = 0;
+        for i = 0 to {n} do
+          s = s + sumsq(i, 2);
+        end
+        """,
+    "recursion": """
+        def fib(n)
+          if n < 2 do
+            return n;
+          end
+          return fib(n-1) + fib(n-2);
+        end
+        println(fib({depth}));
+        """,
+}
+
+def best(code, runtime, repeats: int) -> float:
+    elapsed = float("inf")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeats):
+            namespace = runtime.namespace()
+            start = time.perf_counter()
+            exec(code, namespace)
+            elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    # fib(24) makes some 75,000 calls
+    depth = 24
+
+    plain = find_parser("en-us")
+    fast = find_parser("en-us", fast_locals=True)
+    for name, template in PROGRAMS.items():
+        source = template.replace("{n}", str(n)).replace("{depth}", str(depth))
+        before = best(plain.compile_code(source), plain.runtime, repeats)
+        after = best(fast.compile_code(source), fast.runtime, repeats)
+        print(f"{name:16}: exec {before * 1e3:8.1f} ms   fast locals {after * 1e3:8.1f} ms   ({before / after:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+# Latency of single-character edits to a large generated source, re-parsed
+# incrementally (IncrementalParse) against parsed whole again.
+#
+# Usage: uv run python benchmarks/bench_incremental.py [lines] [edits]
+#
+
+import random
+import re
+import statistics
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+
+from corpus import generate
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    edits = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    code = generate(lines)
+    digits = [ m.start() for m in re.finditer(r"\d", code) ]
+    spaces = [ m.start() for m in re.finditer(" ", code) ]
+    rng = random.Random(0)
+
+    parser = find_parser("en-us")
+    start = time.perf_counter()
+    parser.parse(code)
+    full = time.perf_counter() - start
+    print(f"full parse:        {full * 1000:9.2f} ms ({lines} lines)")
+
+    start = time.perf_counter()
+    session = parser.incremental(code)
+    print(f"incremental start: {(time.perf_counter() - start) * 1000:9.2f} ms")
+
+    # Each edit is made and then undone, so that the code stays valid and the same length
+    for label, where, edit, undo in [
+        ("digit replaced", digits, lambda pos: (pos, pos + 1, "7"), lambda pos, old: (pos, pos + 1, old)),
+        ("space inserted", spaces, lambda pos: (pos, pos, " "), lambda pos, old: (pos, pos + 1, "")),
+    ]:
+        times = []
+        for _ in range(edits):
+            pos = rng.choice(where)
+            old = session.code[pos]
+            for change in [ edit(pos), undo(pos, old) ]:
+                start = time.perf_counter()
+                session.edit(*change)
+                times.append(time.perf_counter() - start)
+        times.sort()
+        median, p95 = statistics.median(times), times[int(len(times) * 0.95)]
+        print(f"{label}:    median {median * 1000:7.2f} ms, p95 {p95 * 1000:7.2f} ms ({full / median:.0f}x quicker than a full parse)")
+
+if __name__ == "__main__":
+    main()
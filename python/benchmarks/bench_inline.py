@@ -0,0 +1,76 @@
+# Call-heavy Linguis programs, optimized with and without inlining small functions
+# (and without optimizing at all), run in fast-locals mode, as a loop would want.
+#
+# Usage: uv run python benchmarks/bench_inline.py [iterations] [repeats]
+#
+
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+
+HELPERS = """
+    def twice(n)
+      temp = n + n;
+      return temp;
+    end
+    def squared(n)
+      return n*n;
+    end
+    def squaredAndTwice(n)
+      return twice(squared(n));
+    end
+    def between(x, lo, hi)
+      return x >= lo && x < hi;
+    end
+    """
+
+PROGRAMS = {
+    "helpers of helpers": """
+        total = 0;
+        for i = 0 to {n} do
+          total = total + squaredAndTwice(i % 100);
+        end
+        """,
+    "predicate in a loop": """
+        count = 0;
+        for i = 0 to {n} do
+          if between(i % 50, 10, 20) do
+            count = count + 1;
+          end
+        end
+        """,
+    "constant arguments": """
+        total = 0;
+        for i = 0 to {n} do
+          total = total + twice(21) - squared(6);
+        end
+        """,
+}
+
+def best(parser, source: str, repeats: int) -> float:
+    code = parser.compile_code(source)
+    elapsed = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        parser.runtime.run(code)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    parsers = {
+        "plain": find_parser("en-us", fast_locals=True),
+        "optimize": find_parser("en-us", fast_locals=True, optimize=True, inline=False),
+        "inline": find_parser("en-us", fast_locals=True, optimize=True),
+    }
+    for name, template in PROGRAMS.items():
+        source = HELPERS + template.replace("{n}", str(n))
+        times = { label: best(parser, source, repeats) for label, parser in parsers.items() }
+        print(f"{name:20}: " + "   ".join(f"{label} {t * 1e3:7.1f} ms" for label, t in times.items())
+              + f"   ({times['optimize'] / times['inline']:.2f}x from inlining)")
+
+if __name__ == "__main__":
+    main()
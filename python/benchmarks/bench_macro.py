@@ -0,0 +1,84 @@
+# Whole Linguis programs (the algorithms in macro/: a sieve, recursive Fibonacci, an
+# n-body simulation in floats, bubble and insertion sorts, building a string, nested
+# loops), translated from en-us into every registered language, and run with each
+# engine at each optimization level: how long each takes to parse, to compile() and
+# to run.
+#
+# Usage: uv run python benchmarks/bench_macro.py [--programs=fib,sieve,...]
+#            [--languages=en-us,...] [--engines=antlr,fast] [--repeat=3]
+#
+
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+from pylinguis.parsers import find_parser, parser_names
+from pylinguis.parsers.Languages import ENUS
+
+from corpus import translate
+
+MACRO = os.path.join(os.path.dirname(os.path.abspath(__file__)), "macro")
+
+# The optimization levels, and the parser options for each
+LEVELS = {
+    "plain": {},
+    "optimize": { "optimize": True },
+    "opt+fast-locals": { "optimize": True, "fast_locals": True },
+}
+
+def best(run, repeat: int) -> float:
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed
+
+def main() -> None:
+    programs = sorted(os.path.splitext(os.path.basename(path))[0] for path in glob.glob(os.path.join(MACRO, "*.lin")))
+    names = None
+    engines = [ "antlr", "fast" ]
+    repeat = 3
+    for arg in sys.argv[1:]:
+        option, _, value = arg.partition("=")
+        if option == "--programs":
+            programs = value.split(",")
+        elif option == "--languages":
+            names = value.split(",")
+        elif option == "--engines":
+            engines = value.split(",")
+        elif option == "--repeat":
+            repeat = int(value)
+        else:
+            print(f"Unknown option '{arg}'")
+            sys.exit(2)
+
+    print(f"{'program':10} {'language':8} {'engine':6} {'level':16} {'parse ms':>9} {'compile ms':>10} {'run ms':>9}")
+    for program in programs:
+        filename = os.path.join(MACRO, program + ".lin")
+        with open(filename, encoding="utf-8") as f:
+            source = f.read()
+        for name in names or parser_names():
+            language = getattr(find_parser(name), "language", None)
+            if language is None:
+                print(f"{name}: skipped (not a language corpus.translate() writes)")
+                continue
+            code = translate(source, ENUS, language)
+            for engine in engines:
+                for level, options in LEVELS.items():
+                    parser = find_parser(name, engine=engine, **options)
+                    module = parser.parse_code(code)
+                    compiled = compile(module, filename, "exec")
+                    parse_time = best(lambda: parser.parse_code(code), repeat)
+                    compile_time = best(lambda: compile(module, filename, "exec"), repeat)
+                    # Each run in a namespace of its own, so that nothing (memoized results included) carries over
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        run_time = best(lambda: parser.runtime.run(compiled), repeat)
+                    print(f"{program:10} {name:8} {engine:6} {level:16} {parse_time * 1e3:9.2f} "
+                          f"{compile_time * 1e3:10.2f} {run_time * 1e3:9.2f}")
+
+if __name__ == "__main__":
+    main()
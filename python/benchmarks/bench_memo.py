@@ -0,0 +1,29 @@
+# Repeated parse()/compile_code() of the same few snippets, with and without the
+# parser's in-memory memo, as an embedding host would call them.
+#
+# Usage: uv run python benchmarks/bench_memo.py [count] [memo_size]
+#
+
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+
+from bench_reuse import SNIPPETS
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    memo_size = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    for size in [ 0, memo_size ]:
+        for method in [ "parse", "compile_code" ]:
+            parser = find_parser("en-us", memo_size=size)
+            call = getattr(parser, method)
+            start = time.perf_counter()
+            for i in range(count):
+                call(SNIPPETS[i % len(SNIPPETS)])
+            elapsed = time.perf_counter() - start
+            print(f"memo_size={size:<4} {method:12}: {count / elapsed:10,.0f} calls/sec  {parser.memo or ''}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# Pure recursive Linguis functions (naive Fibonacci and binomial coefficients), run
+# unoptimized, and optimized with and without memoization; plus what a memoized call
+# costs when every call is a hit.
+#
+# Usage: uv run python benchmarks/bench_memoize.py [n] [calls]
+#
+
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+from pylinguis.parsers.Memoize import memos
+
+PROGRAM = """
+def fib(n)
+  if n < 2 do
+    return n;
+  end
+  return fib(n-1) + fib(n-2);
+end
+def choose(n, k)
+  if k == 0 || k == n do
+    return 1;
+  end
+  return choose(n - 1, k - 1) + choose(n - 1, k);
+end
+"""
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+
+    for label, options in [ ("unoptimized", {}), ("no memoize", { "optimize": True, "memoize": False }),
+                            ("memoized", { "optimize": True }) ]:
+        parser = find_parser("en-us", **options)
+        namespace = parser.runtime.run(parser.compile_code(PROGRAM))
+        times = []
+        for call in [ lambda: namespace["fib"](n), lambda: namespace["choose"](n, n // 2) ]:
+            # A fresh cache each time, so the memoized ones do the work once, not zero times
+            for wrapper in namespace.get("__linguis_memos__", {}).values():
+                wrapper.cache_clear()
+            start = time.perf_counter()
+            call()
+            times.append(time.perf_counter() - start)
+        print(f"{label:12}: fib({n}) {times[0] * 1e3:9.3f} ms   choose({n}, {n // 2}) {times[1] * 1e3:9.3f} ms")
+
+    # Every call a hit: the cost of the lookup itself
+    fib = namespace["fib"]
+    start = time.perf_counter()
+    for _ in range(calls):
+        fib(n)
+    elapsed = time.perf_counter() - start
+    print(f"memoized hit: {elapsed / calls * 1e9:.0f} ns per call   {memos(namespace)['fib']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# Linguis lists of numbers as LinguisLists (Python lists) and as NumPy-backed
+# NumericLists (--numpy-lists): the memory a large one takes, what Linguis's list
+# operators (appending, concatenating, removing, repeating) and searching it cost, and
+# what a Linguis loop that subscripts it costs.
+#
+# Usage: uv run python benchmarks/bench_numeric_lists.py [length] [repeats]
+#
+
+import contextlib
+import io
+import sys
+import time
+import tracemalloc
+
+from pylinguis.parsers import find_parser
+from pylinguis.parsers.NumericList import make_list
+from pylinguis.parsers.Runtime import LinguisList
+
+LOOP = """
+total = 0;
+for i = 0 to size(l) do
+  total = total + l[i];
+end
+"""
+
+def best(run, repeats: int) -> float:
+    elapsed = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        run()
+        elapsed = min(elapsed, time.perf_counter() - start)
+    return elapsed
+
+def allocated(build) -> int:
+    tracemalloc.start()
+    value = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del value
+    return size
+
+def main() -> None:
+    length = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    # Numbers outside CPython's cache of small ints, so that each is an object of its own
+    values = lambda: [ 1000 + i for i in range(length) ]
+    plain_bytes = allocated(values)
+    numeric_bytes = allocated(lambda: make_list(values()).items)
+    print(f"memory for {length:,} ints: list {plain_bytes / length:5.1f} bytes each   "
+          f"NumericList {numeric_bytes / length:5.1f} bytes each")
+
+    plain, numeric = LinguisList(values()), make_list(values())
+    operations = [
+        ("list + x", lambda l: l + 7),
+        ("list + l", lambda l: l + l),
+        ("list - x", lambda l: l - 1500),
+        ("list - l", lambda l: l - [ 1000, 1500, 2000 ]),
+        ("list * 2", lambda l: l * 2),
+        ("x in list", lambda l: -1 in l),
+    ]
+    for name, operation in operations:
+        before = best(lambda: operation(plain), repeats)
+        after = best(lambda: operation(numeric), repeats)
+        print(f"{name:10}: list {before * 1e3:8.2f} ms   NumericList {after * 1e3:8.2f} ms   ({before / after:.1f}x)")
+
+    for numpy_lists in [ False, True ]:
+        parser = find_parser("en-us", numpy_lists=numpy_lists)
+        code = parser.compile_code(LOOP)
+        namespace = parser.runtime.namespace()
+        namespace["l"] = numeric if numpy_lists else plain
+        with contextlib.redirect_stdout(io.StringIO()):
+            elapsed = best(lambda: exec(code, dict(namespace)), repeats)
+        print(f"subscript loop, numpy_lists={numpy_lists!s:5}: {elapsed / length * 1e9:6.1f} ns per element")
+
+if __name__ == "__main__":
+    main()
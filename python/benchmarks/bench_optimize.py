@@ -0,0 +1,62 @@
+# Running each of the examples/ programs, compiled with and without the Optimizer
+# pass (constant folding and propagation, dead-branch pruning), and what the pass
+# costs at parse time.
+#
+# Usage: uv run python benchmarks/bench_optimize.py [runs] [engine]
+#
+
+import contextlib
+import glob
+import io
+import os
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "..", "examples")
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    engine = sys.argv[2] if len(sys.argv) > 2 else "antlr"
+
+    parsers = { optimize: find_parser("en-us", engine=engine, optimize=optimize) for optimize in [ False, True ] }
+    totals = { False: 0.0, True: 0.0 }
+    for parser in parsers.values():
+        parser.parse_code("a = 1;")     # Build the recognizers before anything is timed
+    for filename in sorted(glob.glob(os.path.join(EXAMPLES, "*.lin"))):
+        with open(filename, "rt", encoding="utf-8") as f:
+            source = f.read()
+        line = f"{os.path.basename(filename):26}"
+        for optimize, parser in parsers.items():
+            try:
+                # Best of a few, so that the first parse's warming up of the DFA doesn't count
+                parsed = float("inf")
+                with contextlib.redirect_stderr(io.StringIO()):
+                    for _ in range(3):
+                        start = time.perf_counter()
+                        code = compile(parser.parse_code(source), filename, "exec")
+                        parsed = min(parsed, time.perf_counter() - start)
+            except Exception:
+                line = f"{line} (doesn't parse with {engine})"
+                break
+
+            with contextlib.redirect_stdout(io.StringIO()):
+                try:
+                    parser.runtime.run(code)
+                except Exception as e:
+                    line = f"{line} (fails: {type(e).__name__})"
+                    break
+                start = time.perf_counter()
+                for _ in range(runs):
+                    parser.runtime.run(code)
+                elapsed = time.perf_counter() - start
+            totals[optimize] += elapsed
+            line += f"  optimize={optimize!s:5}: {elapsed / runs * 1e6:8.1f} us/run (parse {parsed * 1e3:6.1f} ms)"
+        print(line)
+
+    print(f"{'all examples':26}  {totals[False] / runs * 1e6:.1f} -> {totals[True] / runs * 1e6:.1f} us/run"
+          f" ({totals[False] / totals[True]:.2f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# A Linguis program (recursion, and a loop) run as it is, under cProfile, and under
+# --profile's sampling Profile: what each costs it, and how many samples it takes.
+#
+# Usage: uv run python benchmarks/bench_profile.py [n] [repeats]
+#
+
+import contextlib
+import cProfile
+import io
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+from pylinguis.Profile import Profile
+
+PROGRAM = """
+def fib(n)
+  if n < 2 do
+    return n;
+  end
+  return fib(n-1) + fib(n-2);
+end
+def squares(n)
+  total = 0;
+  for i = 0 to n do
+    total = total + i * i;
+  end
+  return total;
+end
+println(fib({n}));
+println(squares({n} * 20000));
+"""
+
+def main() -> None:
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    parser = find_parser("en-us")
+    code = parser.compile_code(PROGRAM.replace("{n}", str(n)), "bench.lin")
+    runners = {
+        "plain": contextlib.nullcontext,
+        "cProfile": cProfile.Profile,
+        "Profile": lambda: Profile("bench.lin"),
+    }
+    baseline = None
+    for label, runner in runners.items():
+        elapsed = float("inf")
+        for _ in range(repeats):
+            with contextlib.redirect_stdout(io.StringIO()):
+                profiler = runner()
+                start = time.perf_counter()
+                with profiler:
+                    exec(code, parser.runtime.namespace())
+                elapsed = min(elapsed, time.perf_counter() - start)
+        baseline = baseline or elapsed
+        samples = f"   {profiler.samples} samples" if isinstance(profiler, Profile) else ""
+        print(f"{label:9}: {elapsed * 1e3:8.1f} ms   ({elapsed / baseline:.2f}x){samples}")
+
+if __name__ == "__main__":
+    main()
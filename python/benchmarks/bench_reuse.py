@@ -0,0 +1,33 @@
+# Parses per second for snippet-sized inputs, reusing one lexer/parser/visitor per
+# parser object against building fresh ones for every parse.
+#
+# Usage: uv run python benchmarks/bench_reuse.py [count]
+#
+
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+
+SNIPPETS = [
+    "a = 5;",
+    "a = 1 + 2 * 3;",
+    "println(\"Hello Linguis\");",
+    "if a < 10 do a = 10; end",
+    "b = [1, 2, 3]; c = size(b);",
+    "def twice(n) return n + n; end",
+]
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    for reuse in [ False, True ]:
+        parser = find_parser("en-us", reuse=reuse)
+        start = time.perf_counter()
+        for i in range(count):
+            parser.parse(SNIPPETS[i % len(SNIPPETS)])
+        elapsed = time.perf_counter() - start
+        print(f"reuse={reuse!s:5}: {count / elapsed:10,.0f} parses/sec")
+
+if __name__ == "__main__":
+    main()
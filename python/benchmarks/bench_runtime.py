@@ -0,0 +1,55 @@
+# Many small, separate programs run one after another in one process, each in a
+# namespace of its own: built up from the parser's builtins() every time, against
+# cloned from the parser's RuntimeContext.
+#
+# Usage: uv run python benchmarks/bench_runtime.py [count]
+#
+
+import contextlib
+import io
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+
+PROGRAMS = [
+    "a = 5;",
+    "a = 1 + 2 * 3; b = a * a;",
+    "println(\"Hello Linguis\");",
+    "a = 3; if a < 10 do a = 10; end",
+    "b = [1, 2, 3]; c = size(b);",
+    "def twice(n) return n + n; end\nx = twice(21);",
+]
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    parser = find_parser("en-us", memo_size=len(PROGRAMS))
+    codes = [ parser.compile_code(program) for program in PROGRAMS ]
+
+    def from_builtins(code):
+        exec(code, { "__name__": "__main__", **parser.builtins() })
+
+    runs = { "builtins() dict": from_builtins, "runtime.run": parser.runtime.run }
+    # println output goes nowhere; results are printed at the end
+    results = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, run in runs.items():
+            start = time.perf_counter()
+            for i in range(count):
+                run(codes[i % len(codes)])
+            elapsed = time.perf_counter() - start
+            results.append((name, count / elapsed))
+
+        # And the whole way, from source (memoized, as a host running the same few would)
+        start = time.perf_counter()
+        for i in range(count):
+            parser.runtime.run(parser.compile_code(PROGRAMS[i % len(PROGRAMS)]))
+        elapsed = time.perf_counter() - start
+        results.append(("source, memo", count / elapsed))
+
+    for name, rate in results:
+        print(f"{name:16}: {rate:12,.0f} programs/sec")
+
+if __name__ == "__main__":
+    main()
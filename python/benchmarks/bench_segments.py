@@ -0,0 +1,40 @@
+# Parsing a source that switches language with #parser lines: cold, and again
+# after an edit to just one of its segments.
+#
+# Usage: uv run python benchmarks/bench_segments.py [segments] [lines] [engine]
+#
+
+import sys
+import time
+
+from pylinguis.parsers.Languages import ENPL, ENUS, FR
+from pylinguis.parsers.Segments import SegmentParser
+
+from corpus import generate
+
+def timed(segments: SegmentParser, code: str) -> float:
+    start = time.perf_counter()
+    segments.parse(code)
+    return time.perf_counter() - start
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    lines = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    engine = sys.argv[3] if len(sys.argv) > 3 else "antlr"
+
+    languages = [ ENUS, FR, ENPL ]
+    parts = []
+    for i in range(count):
+        language = languages[i % len(languages)]
+        parts.append(f"#parser {language.name}\n" + generate(lines, language))
+    code = "".join(parts)
+    edited = code.replace("a0 = (0 + 2)", "a0 = (0 + 3)", 1)
+
+    segments = SegmentParser("en-us", engine=engine)
+    cold = timed(segments, code)
+    edit = timed(segments, edited)
+    print(f"{engine}: cold {cold * 1000:8.1f} ms, after editing one segment {edit * 1000:8.1f} ms "
+          f"({count} segments of {lines} lines)")
+
+if __name__ == "__main__":
+    main()
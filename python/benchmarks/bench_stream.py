@@ -0,0 +1,51 @@
+# Peak memory and time to the first runnable code, parsing a large generated source
+# whole (parse_file) against one top-level unit at a time (units_from_file).
+#
+# Usage: uv run python benchmarks/bench_stream.py [lines] [engine]
+#
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from pylinguis.parsers import find_parser
+
+from corpus import generate
+
+def whole(parser, fname: str) -> float:
+    start = time.perf_counter()
+    module = parser.parse_file(fname)
+    code = compile(module, filename=fname, mode="exec")
+    return time.perf_counter() - start
+
+def streamed(parser, fname: str) -> float:
+    start = time.perf_counter()
+    first = None
+    for unit in parser.units_from_file(fname):
+        code = compile(unit, filename=fname, mode="exec")
+        if first is None:
+            first = time.perf_counter() - start
+    return first
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    engine = sys.argv[2] if len(sys.argv) > 2 else "antlr"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        fname = os.path.join(tmp, "big.lin")
+        with open(fname, "wt") as f:
+            f.write(generate(lines))
+
+        for label, run in [ ("whole", whole), ("stream", streamed) ]:
+            parser = find_parser("en-us", engine=engine)
+            parser.parse("a = 1;")      # Build the recognizers outside the measurement
+            tracemalloc.start()
+            first = run(parser, fname)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{engine} {label:6}: peak {peak / 1e6:8.1f} MB, first code ready after {first * 1000:8.1f} ms ({lines} lines)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+# Self tail-recursive Linguis functions, as plain recursion and with their tail calls
+# turned into loops by --optimize: time per call at depths plain recursion can reach,
+# and how deep each can go at all.
+#
+# Usage: uv run python benchmarks/bench_tail_calls.py [depth] [calls]
+#
+
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+
+PROGRAM = """
+def count(n, total)
+  if n == 0 do
+    return total;
+  end
+  return count(n - 1, total + n);
+end
+"""
+
+def main() -> None:
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 900
+    calls = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    for optimize in [ False, True ]:
+        parser = find_parser("en-us", optimize=optimize)
+        count = parser.runtime.run(parser.compile_code(PROGRAM))["count"]
+        start = time.perf_counter()
+        for _ in range(calls):
+            count(depth, 0)
+        elapsed = time.perf_counter() - start
+
+        deepest = depth
+        try:
+            while deepest < 10 ** 6:
+                count(deepest * 10, 0)
+                deepest *= 10
+        except RecursionError:
+            pass
+        print(f"optimize={optimize!s:5}: {elapsed / (calls * depth) * 1e9:6.1f} ns per level   "
+              f"reaches depth {deepest:>10,}{'+' if deepest >= 10 ** 6 else ''}")
+
+if __name__ == "__main__":
+    main()
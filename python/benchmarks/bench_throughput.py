@@ -0,0 +1,139 @@
+# Front-end throughput, stage by stage, in every registered language and with both
+# engines, on generated programs of increasing size: the lexer's tokens/sec, the
+# parser's parse-tree nodes/sec (AST nodes/sec for the fast engine, which builds the AST
+# as it parses) and the visitor's AST nodes/sec. Each is checked against the baseline
+# in baseline_throughput.json, and the script exits 1 if any has fallen by more than
+# the tolerance.
+#
+# Usage: uv run python benchmarks/bench_throughput.py [--sizes=1000,10000,100000]
+#            [--engines=antlr,fast] [--languages=en-us,...] [--repeat=5]
+#            [--baseline=file.json] [--tolerance=0.25] [--save]
+#
+# --save writes the results as the new baseline instead of checking them. Baselines
+# are only comparable on the machine (and Python) they were taken on; re-take it there
+# before relying on it. A million lines (--sizes=...,1000000) takes the ANTLR engine
+# some minutes, and several GB, per language.
+#
+
+import gc
+import json
+import os
+import platform
+import sys
+
+from pylinguis.parsers import find_parser, parser_names
+from pylinguis.parsers.Timings import FileTimings
+
+from corpus import generate
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_throughput.json")
+
+# What each stage's rate counts, and what it's reported as
+RATES = {
+    "lex": ("tokens", "tokens/sec"),
+    "parse": ("parse_tree_nodes", "parse-tree nodes/sec"),
+    "visit": ("ast_nodes", "AST nodes/sec"),
+}
+
+def rates(parser, code: str, repeat: int) -> dict:
+    """ The best of repeat rates of each of parser's stages over code, by stage. """
+
+    best: dict = {}
+    for _ in range(repeat):
+        gc.collect()
+        parser.timings = timings = FileTimings("<generated>")
+        parser.parse_code(code)
+        parser.timings = None
+        for stage in timings.stages:
+            if stage.name not in RATES:
+                continue
+            count = RATES[stage.name][0]
+            if stage.name == "parse" and parser.engine == "fast":
+                # The fast engine's parse is its visit, too
+                count = "ast_nodes"
+            rate = timings.counts[count] / stage.wall
+            best[stage.name] = max(best.get(stage.name, 0.0), rate)
+    return best
+
+def unit(engine: str, stage: str) -> str:
+    return "AST nodes/sec" if engine == "fast" and stage == "parse" else RATES[stage][1]
+
+def main() -> None:
+    sizes = [ 1000, 10000, 100000 ]
+    engines = [ "antlr", "fast" ]
+    names = None
+    repeat = 5
+    baseline_file = BASELINE
+    tolerance = 0.25
+    save = False
+    for arg in sys.argv[1:]:
+        option, _, value = arg.partition("=")
+        if option == "--sizes":
+            sizes = [ int(size) for size in value.split(",") ]
+        elif option == "--engines":
+            engines = value.split(",")
+        elif option == "--languages":
+            names = value.split(",")
+        elif option == "--repeat":
+            repeat = int(value)
+        elif option == "--baseline":
+            baseline_file = value
+        elif option == "--tolerance":
+            tolerance = float(value)
+        elif option == "--save":
+            save = True
+        else:
+            print(f"Unknown option '{arg}'")
+            sys.exit(2)
+
+    results: dict = {}
+    for name in names or parser_names():
+        language = getattr(find_parser(name), "language", None)
+        if language is None:
+            print(f"{name:6}: skipped (not one of the languages corpus.generate() writes)")
+            continue
+        for lines in sizes:
+            code = generate(lines, language)
+            for engine in engines:
+                parser = find_parser(name, engine=engine)
+                # The first parse warms up ANTLR's prediction DFA; big ones are slow enough to run once
+                parser.parse_code(generate(100, language))
+                measured = rates(parser, code, repeat if lines < 100000 else 1)
+                key = f"{name}/{engine}/{lines}"
+                results[key] = measured
+                print(f"{key:22}: " + "   ".join(f"{stage} {rate:12,.0f} {unit(engine, stage)}"
+                                                  for stage, rate in measured.items()))
+
+    machine = { "python": platform.python_version(), "machine": platform.machine(), "system": platform.system() }
+    if save:
+        with open(baseline_file, "w", encoding="utf-8") as f:
+            json.dump({ "machine": machine, "results": results }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {baseline_file}")
+        return
+
+    if not os.path.exists(baseline_file):
+        print(f"No baseline in {baseline_file}; run with --save to take one")
+        return
+    with open(baseline_file, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("machine") != machine:
+        print(f"WARNING: the baseline was taken on {baseline.get('machine')}, not {machine}")
+
+    regressions = 0
+    for key, measured in results.items():
+        for stage, rate in measured.items():
+            base = baseline["results"].get(key, {}).get(stage)
+            if base is None:
+                continue
+            change = rate / base - 1
+            if change < -tolerance:
+                regressions += 1
+                print(f"REGRESSION: {key} {stage}: {rate:,.0f} {unit(key.split('/')[1], stage)}, "
+                      f"{-change:.0%} below the baseline's {base:,.0f}")
+    print(f"{regressions} regression(s) beyond {tolerance:.0%} against {os.path.basename(baseline_file)}")
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# Two-stage (SLL, then LL) parsing against plain LL parsing: stage hit rates over
+# the examples/ corpus plus a generated program, and the time each mode takes.
+#
+# Usage: uv run python benchmarks/bench_two_stage.py [lines] [repeat]
+#
+
+import glob
+import os
+import sys
+import time
+
+from pylinguis.parsers import find_parser
+
+from corpus import generate
+
+EXAMPLES = os.path.join(os.path.dirname(__file__), "..", "..", "examples")
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    sources = []
+    for fname in sorted(glob.glob(os.path.join(EXAMPLES, "*.lin"))):
+        with open(fname) as f:
+            sources.append(f.read())
+    sources.append(generate(lines))
+
+    for two_stage in [ False, True ]:
+        parser = find_parser("en-us", two_stage=two_stage)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for code in sources:
+                try:
+                    parser.parse(code)
+                except Exception:
+                    pass    # A few examples exercise unfinished parts of the visitor
+        elapsed = time.perf_counter() - start
+
+        print(f"two_stage={two_stage!s:5}: {elapsed / repeat:8.3f} sec/pass over {len(sources)} sources, {parser.stats}")
+
+if __name__ == "__main__":
+    main()
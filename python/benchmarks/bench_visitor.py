@@ -0,0 +1,58 @@
+# Visitor throughput, with diagnostics (DEBUG logging plus trace dumps) on and off.
+#
+# Usage: uv run python benchmarks/bench_visitor.py [lines] [repeat]
+#
+
+import ast
+import logging
+import sys
+import tempfile
+import time
+
+import antlr4
+
+from pylinguis.parsers import find_parser
+
+from corpus import generate
+
+def visit_rate(parser, tree, repeat: int) -> float:
+    """Returns AST nodes produced per second by repeatedly visiting one parse tree."""
+
+    nodes = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        module = ast.Module(body=parser.getVisitor().visit(tree), type_ignores=[])
+        nodes += sum(1 for _ in ast.walk(module))
+    return nodes / (time.perf_counter() - start)
+
+def parse_rate(parser, code: str, repeat: int) -> float:
+    """Returns whole parses (lex, parse, visit) per second."""
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parser.parse(code)
+    return repeat / (time.perf_counter() - start)
+
+def main() -> None:
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    code = generate(lines)
+
+    # Send every record nowhere, so that we measure building them and not I/O
+    logger = logging.getLogger("parsers.enus")
+    logger.addHandler(logging.NullHandler())
+    logger.propagate = False
+
+    with tempfile.TemporaryDirectory() as tracedir:
+        for label, level, trace in [ ("off", logging.WARNING, None), ("on", logging.DEBUG, tracedir) ]:
+            logger.setLevel(level)
+            parser = find_parser("en-us", trace=trace)
+
+            stream = antlr4.CommonTokenStream(parser.getLexer(antlr4.InputStream(code)))
+            tree = parser.getParser(stream).block()
+
+            print(f"tracing {label:3}: visitor {visit_rate(parser, tree, repeat):12,.0f} AST nodes/sec, "
+                  f"{parse_rate(parser, code, repeat):8.2f} parses/sec ({lines} lines)")
+
+if __name__ == "__main__":
+    main()
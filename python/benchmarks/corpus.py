@@ -0,0 +1,58 @@
+# Generators for synthetic Linguis sources, shared by the benchmark scripts
+# in this directory.
+#
+
+import re
+
+from pylinguis.parsers.Languages import ENUS, Language
+
+# One "unit" of generated code; {i} is replaced by the unit's index so that
+# every unit declares distinct names. Each unit covers every statement form
+# and most of the expression forms in the grammar.
+UNIT = """\
+a{i} = ({i} + 2) * 3 - 4 / 2;
+if a{i} > 5 && !(a{i} == 7) do
+    b = a{i} - 1;
+else if a{i} == 7 do
+    b = 7;
+else do
+    b = 0;
+end
+def f{i}(x, y)
+    t = -x * (y + {i});
+    return t ^ 2;
+end
+c = f{i}(a{i}, 2);
+while b > 100 do
+    b = b - 1;
+end
+for j = 0 to 3 do
+    c = c + j % 2;
+end
+s = "unit {i}";
+l = [1, 2.5, {i}];
+t = size(l) == 3 || {i} in l || false;
+"""
+
+UNIT_LINES = UNIT.count("\n")
+
+def generate(lines: int, language: Language = ENUS) -> str:
+    """Generates a Linguis program at least `lines` lines long."""
+
+    units = max(1, (lines + UNIT_LINES - 1) // UNIT_LINES)
+    return translate("".join(UNIT.format(i=i) for i in range(units)), ENUS, language)
+
+def translate(code: str, source: Language, target: Language) -> str:
+    """
+    Rewrites code from one language's keywords and booleans into another's, word by word.
+
+    Crude, but enough for our generated programs: it doesn't know about strings or
+    comments, so keep keywords out of those.
+    """
+
+    if source is target:
+        return code
+    words = { source.keywords[k]: target.keywords[k] for k in source.keywords }
+    booleans = { b: t for b, v in source.booleans.items() for t, w in target.booleans.items() if v == w }
+    words.update(booleans)
+    return re.sub(r"\w+", lambda m: words.get(m.group(), m.group()), code)
@@ -0,0 +1,108 @@
+"""
+Compiling many Linguis source files at once, across a pool of worker processes.
+
+Each worker builds its own parser, once, then lexes, parses and compile()s whatever
+files it is handed, and sends back each one's code object marshalled (much smaller, and
+quicker both ways, than pickling the AST), along with anything the parser reported about
+it. Results come back in the order the files were given, whichever worker finished
+first, so running them (or reporting their errors) is as deterministic as doing it one
+file at a time.
+"""
+
+import ast
+import contextlib
+import io
+import marshal
+import os
+from concurrent.futures import ProcessPoolExecutor
+from types import CodeType
+from typing import Any, Dict, List, Optional, Tuple
+
+import pylinguis.parsers
+from pylinguis.parsers import LinguisParserBase
+
+class Compiled:
+    """ What compiling one file came to: its code, or the error that stopped it. """
+
+    def __init__(self, filename: str, code: Optional[CodeType], error: Optional[str], messages: str) -> None:
+        self.filename = filename
+        self.code = code
+        self.error = error
+        # Whatever the parser printed (to stderr) while reading it, such as the syntax errors it recovered from
+        self.messages = messages
+
+    def __repr__(self) -> str:
+        return f"Compiled({self.filename!r}, {'ok' if self.code is not None else self.error})"
+
+# This process's parser (and what it was made with), and once a file needs one, its SegmentParser
+_parser: Optional[LinguisParserBase] = None
+_options: Dict[str, Any] = {}
+_segments = None
+
+def new_parser(parser: str, engine: str, options: Dict[str, Any]) -> LinguisParserBase:
+    p = pylinguis.parsers.find_parser(parser, engine=engine, **options)
+    if p is None:
+        raise ValueError(f"Could not find parser named '{parser}'")
+    return p
+
+def start_worker(parser: str, engine: str, options: Dict[str, Any]) -> None:
+    global _parser, _options, _segments
+    _parser = new_parser(parser, engine, options)
+    _options = options
+    _segments = None
+
+def parse_file(filename: str) -> ast.Module:
+    """ Parses filename with this process's parser; or, if it has #parser lines in it, a segment at a time. """
+
+    global _segments
+    with open(filename, "rb") as f:
+        source = f.read()
+    if b"#parser" in source:
+        from pylinguis.parsers.Segments import SegmentParser, has_pragmas
+        code = source.decode("utf-8")
+        if has_pragmas(code):
+            if _segments is None:
+                _segments = SegmentParser(_parser.name, _parser.engine, **_options)
+            return _segments.parse(code, filename)
+    return _parser.parse_file(filename)
+
+def compile_file(filename: str) -> Tuple[str, Optional[bytes], Optional[str], str]:
+    """ Compiles filename with this process's parser, into the makings of a Compiled; the code is marshalled. """
+
+    messages = io.StringIO()
+    try:
+        with contextlib.redirect_stderr(messages):
+            module = parse_file(filename)
+            code = marshal.dumps(compile(module, filename=filename, mode="exec"))
+        error = None
+    except Exception as e:
+        code, error = None, f"{type(e).__name__}: {e}"
+    return filename, code, error, messages.getvalue()
+
+def compile_files(filenames: List[str], parser: str = "en-us", engine: str = "antlr",
+                  jobs: Optional[int] = None, **options: Any) -> List[Compiled]:
+    """
+    Compiles each of filenames with the named parser, in jobs worker processes (one per
+    CPU by default; jobs=1 compiles them in this process instead). Any options are
+    handed to the parsers, as by find_parser(). Returns a Compiled for each file, in the
+    order given.
+
+    Raises ValueError if there's no such parser (or engine).
+    """
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or len(filenames) <= 1:
+        start_worker(parser, engine, options)
+        results = [ compile_file(filename) for filename in filenames ]
+    else:
+        # Find out about a bad parser name here, rather than from a broken pool
+        new_parser(parser, engine, options)
+        # Hand the files out a few at a time: thousands of one-at-a-time round trips add up
+        chunksize = max(1, len(filenames) // (jobs * 8))
+        with ProcessPoolExecutor(max_workers=jobs, initializer=start_worker,
+                                 initargs=(parser, engine, options)) as pool:
+            results = list(pool.map(compile_file, filenames, chunksize=chunksize))
+
+    return [ Compiled(filename, marshal.loads(code) if code is not None else None, error, messages)
+             for filename, code, error, messages in results ]
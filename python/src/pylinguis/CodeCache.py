@@ -0,0 +1,164 @@
+"""
+An on-disk cache of compiled Linguis programs, in the spirit of CPython's `__pycache__`.
+
+Entries are marshalled code objects, addressed by a hash of everything that went into
+producing them: the source bytes, the parser that read them, the pylinguis version (the
+installed package's, and a hash of the translator's own sources; see codegen_version())
+and the Python bytecode magic number. A hit therefore skips the whole front end (lexing,
+parsing, visiting and compile()). Each cache directory is bounded in entries and bytes,
+and evicts least-recently-used entries beyond that. Writes go to a temporary file that
+is then renamed into place, so concurrent runs never see a half-written entry.
+"""
+
+import contextlib
+import hashlib
+import importlib.metadata
+import importlib.util
+import marshal
+import os
+import tempfile
+from types import CodeType
+from typing import Optional
+
+CACHE_DIR = "__lincache__"
+SUFFIX = ".linc"
+
+# codegen_version(), once worked out
+_codegen_version: Optional[str] = None
+
+def codegen_version() -> str:
+    """
+    What the code pylinguis compiles programs to depends on: the installed package's
+    version, and a hash of every module of the package (the parsers, the visitors and
+    the passes), so that changing any of them retires what the old ones cached.
+    """
+
+    global _codegen_version
+    if _codegen_version is None:
+        try:
+            installed = importlib.metadata.version("pylinguis")
+        except importlib.metadata.PackageNotFoundError:
+            installed = "unknown"
+        h = hashlib.sha256(installed.encode())
+        package = os.path.dirname(os.path.abspath(__file__))
+        sources = []
+        for root, dirs, files in os.walk(package):
+            dirs[:] = [ d for d in dirs if d != "__pycache__" ]
+            sources.extend(os.path.join(root, f) for f in files if f.endswith(".py"))
+        for path in sorted(sources):
+            h.update(os.path.relpath(path, package).encode())
+            h.update(b"\0")
+            with open(path, "rb") as f:
+                h.update(f.read())
+        _codegen_version = f"{installed}+{h.hexdigest()[:16]}"
+    return _codegen_version
+
+def cache_dir_for(filename: str) -> str:
+    """The cache directory for a source file: `__lincache__` beside it."""
+
+    return os.path.join(os.path.dirname(os.path.abspath(filename)), CACHE_DIR)
+
+def fix_filename(code: CodeType, filename: str) -> CodeType:
+    """Points code (and the code of every function in it) at filename, as CPython does for .pyc files."""
+
+    if code.co_filename == filename:
+        return code
+    consts = tuple(fix_filename(c, filename) if isinstance(c, CodeType) else c for c in code.co_consts)
+    return code.replace(co_filename=filename, co_consts=consts)
+
+class CodeCache:
+    """ A size-bounded, least-recently-used cache of code objects in one directory. """
+
+    def __init__(self, directory: str, max_entries: int = 1000, max_bytes: int = 64 * 1024 * 1024) -> None:
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source: bytes, parser: str, *parts: str) -> str:
+        """The cache key for source as read by the named parser; parts add anything else that changes the output."""
+
+        h = hashlib.sha256()
+        h.update(importlib.util.MAGIC_NUMBER)
+        for part in (parser, *parts):
+            h.update(part.encode())
+            h.update(b"\0")
+        h.update(source)
+        return h.hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, key: str, filename: str) -> Optional[CodeType]:
+        """Returns the cached code for key (attributed to filename), or None on a miss."""
+
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                code = marshal.load(f)
+            os.utime(path)  # Most recently used
+        except (OSError, EOFError, ValueError, TypeError):
+            # Missing, evicted by another run, or corrupt; all the same to us
+            self.misses += 1
+            return None
+        if not isinstance(code, CodeType):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return fix_filename(code, filename)
+
+    def put(self, key: str, code: CodeType) -> bool:
+        """
+        Stores code under key, then evicts whatever no longer fits. Returns whether it was
+        stored: as with __pycache__, a cache that can't be written (a read-only directory,
+        or a file where the cache directory should be) is quietly done without.
+        """
+
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, "wb") as f:
+                marshal.dump(code, f)
+            os.replace(temp, self.path(key))
+        except OSError:
+            with contextlib.suppress(OSError):
+                os.unlink(temp)
+            return False
+        except BaseException:
+            os.unlink(temp)
+            raise
+        try:
+            self.evict()
+        except OSError:
+            pass
+        return True
+
+    def evict(self) -> None:
+        """Removes least-recently-used entries until the directory is within its bounds."""
+
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(SUFFIX):
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+        entries.sort()
+
+        count = len(entries)
+        size = sum(e[1] for e in entries)
+        for mtime, esize, path in entries:
+            if count <= self.max_entries and size <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass    # Somebody else got there first
+            count -= 1
+            size -= esize
@@ -0,0 +1,156 @@
+"""
+A sampling profiler for Linguis programs, reporting in the program's own terms.
+
+cProfile, run over the exec() of a program, counts every Python call: the runtime's
+print and range, memoized()'s wrappers, all of them, with each of the program's own
+functions among them as just another frame. A Profile instead looks in on the thread
+running the program every interval (a millisecond, by default), from a thread of its
+own, and keeps only the frames whose code came from the program's source file: its
+functions, and its top level. So each sample is the stack of Linguis functions the
+program was in, and the line each of them had got to; whatever Python was doing
+beneath the innermost of them (printing, building a range) counts against that line.
+
+report() sums the samples up by function and by line: "self" is how often the
+function (or line) was the innermost, "total" how often it was anywhere on the stack.
+collapsed() writes them out as collapsed stacks, one line per distinct stack,
+
+    (top level) (prog.lin:12);fib (prog.lin:6);fib (prog.lin:6) 42
+
+which flamegraph.pl, speedscope and the like draw as flame graphs.
+
+Sampling costs the program little (taking a sample is a few microseconds, and it runs
+no slower between them), and nothing at all in the code it runs; but then what it
+sees is only ever a sample, and a function that runs for less than an interval at a
+time may not show up at all. Functions that --optimize inlined are gone by the time
+the program runs, so their time counts against the lines they were inlined into.
+"""
+
+import linecache
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# How often, in seconds, a Profile samples by default
+INTERVAL = 0.001
+
+# What the report calls the code outside any function (fast-locals mode runs it as __linguis_main__)
+TOP_LEVEL = "(top level)"
+TOP_LEVEL_NAMES = frozenset([ "<module>", "__linguis_main__" ])
+
+# One frame of a sample: the function's name, and the line it was on
+Frame = Tuple[str, int]
+
+class Profile:
+    """ Samples the Linguis frames of the thread that starts it; see the module docstring. """
+
+    def __init__(self, filename: str, interval: float = INTERVAL) -> None:
+        self.filename = filename
+        self.interval = interval
+        # How many samples found each stack of frames, outermost first
+        self.stacks: Counter[Tuple[Frame, ...]] = Counter()
+        self.samples = 0
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.switch_interval = 0.0
+
+    def __enter__(self) -> "Profile":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """ Starts sampling the calling thread. """
+
+        self.stopped.clear()
+        # The sampler has to get the GIL off the program to take a sample; by default
+        # Python makes it wait 5ms for it, which would be the interval instead
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self.switch_interval, self.interval))
+        self.thread = threading.Thread(target=self.sample, args=(threading.get_ident(),),
+                                       name="pylinguis-profile", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """ Stops sampling; the samples taken so far stay. """
+
+        if self.thread is None:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+        sys.setswitchinterval(self.switch_interval)
+
+    def sample(self, ident: int) -> None:
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(ident)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                if code.co_filename == self.filename:
+                    name = TOP_LEVEL if code.co_name in TOP_LEVEL_NAMES else code.co_name
+                    stack.append((name, frame.f_lineno))
+                frame = frame.f_back
+            del frame
+            if stack:
+                stack.reverse()
+                self.stacks[tuple(stack)] += 1
+                self.samples += 1
+
+    def functions(self) -> Dict[str, Tuple[int, int]]:
+        """ The self and total samples of each function, by name. """
+
+        counts: Dict[str, List[int]] = {}
+        for stack, count in self.stacks.items():
+            counts.setdefault(stack[-1][0], [ 0, 0 ])[0] += count
+            for name in { name for name, _ in stack }:
+                counts.setdefault(name, [ 0, 0 ])[1] += count
+        return { name: (own, total) for name, (own, total) in counts.items() }
+
+    def lines(self) -> Dict[Frame, Tuple[int, int]]:
+        """ The self and total samples of each line, by function and line number. """
+
+        counts: Dict[Frame, List[int]] = {}
+        for stack, count in self.stacks.items():
+            counts.setdefault(stack[-1], [ 0, 0 ])[0] += count
+            for frame in set(stack):
+                counts.setdefault(frame, [ 0, 0 ])[1] += count
+        return { frame: (own, total) for frame, (own, total) in counts.items() }
+
+    def report(self, limit: int = 20) -> str:
+        """ The functions and lines with the most samples (at most limit of each), as text. """
+
+        name = os.path.basename(self.filename)
+        out = [ f"Profile of {name}: {self.samples} samples, every {self.interval * 1e3:g} ms" ]
+        if not self.samples:
+            return out[0] + "\n"
+        percent = lambda count: f"{count * 100 / self.samples:6.1f}%"
+
+        out.extend([ "", "  self    total   function" ])
+        functions = sorted(self.functions().items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+        for function, (own, total) in functions[:limit]:
+            out.append(f"{percent(own)}  {percent(total)}  {function}")
+
+        out.extend([ "", "  self    total   line" ])
+        lines = sorted(self.lines().items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+        width = max(len(f"{name}:{line}") for (_, line), _ in lines[:limit])
+        for (function, line), (own, total) in lines[:limit]:
+            source = linecache.getline(self.filename, line).strip()
+            out.append(f"{percent(own)}  {percent(total)}  {f'{name}:{line}':{width}}  {function}: {source}")
+        return "\n".join(out) + "\n"
+
+    def collapsed(self) -> str:
+        """ The samples as collapsed stacks, for flame graphs; see the module docstring. """
+
+        name = os.path.basename(self.filename)
+        lines = []
+        for stack, count in sorted(self.stacks.items()):
+            lines.append(";".join(f"{function} ({name}:{line})" for function, line in stack) + f" {count}\n")
+        return "".join(lines)
+
+    def write_collapsed(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
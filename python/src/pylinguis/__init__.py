@@ -1,9 +1,13 @@
 import ast
+import contextlib
 from datetime import datetime
 import os
 import sys
+from types import CodeType
+from typing import Any, Dict, List, Optional, Tuple
 
 import pylinguis.parsers
+from pylinguis.CodeCache import CodeCache, cache_dir_for, codegen_version
 
 def banner() -> str:
     vMajor, vMinor = version()
@@ -20,35 +24,260 @@ def version() -> tuple[int, int]:
 def print_help() -> None:
     print("Usage: linguis [--parser=parsername] sourcefile")
     print("  --parser=parsername   Specifies which parser to use (default: en-us)")
+    print("  --engine=engine       Parses with the 'antlr' (default) or the hand-written 'fast' front end")
+    print("  --trace=directory     Writes parse-tree and Python dumps for each file to directory")
+    print("  --optimize, -O        Folds and propagates constants, and prunes dead branches, before compiling")
+    print("  --no-inline           With --optimize, doesn't inline small functions at their call sites")
+    print("  --no-memoize[=names]  With --optimize, doesn't memoize pure functions (or only not those named)")
+    print("  --memo-stats          With --optimize, prints each memoized function's cache hits after its program runs")
+    print("  --numpy-lists         Keeps lists of numbers in NumPy arrays (if NumPy is installed)")
+    print("  --profile[=directory] Samples each program as it runs, prints its time by Linguis function and line, and writes collapsed stacks beside it (or into directory)")
+    print("  --timings[=file.json] Times each stage (lexing, parsing, visiting, compile(), exec()) of each file; prints them, or writes them to file.json")
+    print("  --fast-locals         Runs each program's top level as a function, so its variables are fast locals")
+    print("  --no-cache            Always recompiles, ignoring (and not updating) __lincache__")
+    print("  --stream              Runs each top-level statement as soon as it's parsed (bypasses __lincache__)")
+    print("  --jobs=N              Compiles the files in N worker processes first, then runs them in order")
+    print("  --check               Only compiles the files, reporting any that fail")
     print("  --help, -h            Show this help message")
     sys.exit(0)
 
+def cache_key(cache: CodeCache, source: bytes, parser: str, engine: str, options: Dict[str, Any]) -> str:
+    """ The __lincache__ key for source; only the options that change the code it compiles to go in it. """
+
+    parts = [ engine, ".".join(str(v) for v in version()), codegen_version() ]
+    for option in [ "optimize", "fast_locals", "numpy_lists" ]:
+        if options.get(option):
+            parts.append(option)
+    if options.get("optimize") and options.get("inline") is False:
+        parts.append("no_inline")
+    if options.get("optimize") and options.get("memoize") is False:
+        parts.append("no_memoize")
+    elif options.get("optimize") and options.get("no_memoize"):
+        parts.append("no_memoize=" + ",".join(sorted(options["no_memoize"])))
+    return cache.key(source, parser, *parts)
+
+def print_memo_stats(namespace: Dict[str, Any]) -> None:
+    """ Prints the cache hits and misses of each function memoized in the program that ran in namespace. """
+
+    from pylinguis.parsers.Memoize import memos
+
+    for name, info in memos(namespace).items():
+        print(f"memoized {name}(): {info.hits} hits, {info.misses} misses, {info.currsize} of {info.maxsize} results kept")
+
+def print_profile(profile: Any, fname: str, directory: Optional[str]) -> None:
+    """ Prints profile's report on the program in fname, and writes its collapsed stacks beside fname (or into directory). """
+
+    print(profile.report(), end="")
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, os.path.basename(fname) + ".collapsed")
+    else:
+        path = fname + ".collapsed"
+    profile.write_collapsed(path)
+    print(f"Collapsed stacks written to {path}")
+
+def profiled(fname: str, profile: bool) -> Any:
+    """ A Profile of the program in fname, to run it in, if profiling; else a context that does nothing. """
+
+    if not profile:
+        return contextlib.nullcontext()
+    from pylinguis.Profile import Profile
+    return Profile(fname)
+
+def write_timings(path: str, timings: List[Any], parser: str, engine: str, options: Dict[str, Any]) -> None:
+    """ Writes the FileTimings of each file run (and what they were run with) to path, as JSON. """
+
+    import json
+    import platform
+
+    run = {
+        "pylinguis": ".".join(str(v) for v in version()),
+        "python": platform.python_version(),
+        "parser": parser,
+        "engine": engine,
+        "options": { option: value for option, value in options.items() if option != "trace" },
+        "files": [ file_timings.as_dict() for file_timings in timings ],
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2, default=list)
+    print(f"Timings written to {path}")
+
+def compile_all(fnames: List[str], parser: str, engine: str, jobs: int,
+                options: Dict[str, Any], use_cache: bool) -> Tuple[Dict[str, CodeType], int]:
+    """
+    Compiles fnames in jobs worker processes (those not already in __lincache__), printing
+    whatever went wrong with each, in order. Returns the code of each file that compiled,
+    and how many didn't.
+    """
+
+    from pylinguis.Batch import compile_files
+
+    codes = {}
+    cached = {}
+    if use_cache:
+        for fname in fnames:
+            with open(fname, "rb") as f:
+                source = f.read()
+            cache = CodeCache(cache_dir_for(fname))
+            key = cache_key(cache, source, parser, engine, options)
+            code = cache.get(key, fname)
+            if code is None:
+                cached[fname] = (cache, key)
+            else:
+                codes[fname] = code
+
+    failed = 0
+    for result in compile_files([ fname for fname in fnames if fname not in codes ], parser, engine, jobs=jobs, **options):
+        sys.stderr.write(result.messages)
+        if result.code is None:
+            print(f"ERROR: {result.filename}: {result.error}")
+            failed += 1
+            continue
+        codes[result.filename] = result.code
+        if result.filename in cached:
+            cache, key = cached[result.filename]
+            cache.put(key, result.code)
+    return codes, failed
+
 def main() -> None:
     print(f"{banner()}")
 
     parser = "en-us"
+    engine = "antlr"
     save = False
     savefile = None
+    trace = None
+    use_cache = True
+    stream = False
+    jobs = None
+    check = False
+    optimize = False
+    inline = True
+    memoize = True
+    no_memoize: List[str] = []
+    memo_stats = False
+    fast_locals = False
+    numpy_lists = False
+    profile = False
+    profile_dir = None
+    timings = False
+    timings_file = None
     incoming = []
     if len(sys.argv) < 2:
         print_help()
     for arg in sys.argv[1:]:
         if arg.startswith("--parser="):
             parser = arg[len("--parser="):]
+        elif arg.startswith("--engine="):
+            engine = arg[len("--engine="):]
         elif arg == "--help" or arg == "-h":
             print_help()
         elif arg == "--save" or arg == "-s":
             save = True
         elif arg.startswith("--savefile="):
             savefile = arg[len("--savefile="):]
+        elif arg.startswith("--trace="):
+            trace = arg[len("--trace="):]
+        elif arg == "--no-cache":
+            use_cache = False
+        elif arg == "--stream":
+            stream = True
+        elif arg.startswith("--jobs="):
+            try:
+                jobs = int(arg[len("--jobs="):])
+            except ValueError:
+                print(f"ERROR: --jobs takes a number of processes, not '{arg[len('--jobs='):]}'; exiting.")
+                sys.exit(1)
+        elif arg == "--check":
+            check = True
+        elif arg == "--optimize" or arg == "-O":
+            optimize = True
+        elif arg == "--no-inline":
+            inline = False
+        elif arg == "--no-memoize":
+            memoize = False
+        elif arg.startswith("--no-memoize="):
+            no_memoize.extend(name for name in arg[len("--no-memoize="):].split(",") if name)
+        elif arg == "--memo-stats":
+            memo_stats = True
+        elif arg == "--fast-locals":
+            fast_locals = True
+        elif arg == "--numpy-lists":
+            numpy_lists = True
+        elif arg == "--profile":
+            profile = True
+        elif arg.startswith("--profile="):
+            profile = True
+            profile_dir = arg[len("--profile="):]
+        elif arg == "--timings":
+            timings = True
+        elif arg.startswith("--timings="):
+            timings = True
+            timings_file = arg[len("--timings="):]
         else:
             incoming.append(arg)
 
-    p = pylinguis.parsers.find_parser(parser)
+    options: Dict[str, Any] = { "trace": trace }
+    if optimize:
+        options["optimize"] = True
+        if not inline:
+            options["inline"] = False
+        if not memoize:
+            options["memoize"] = False
+        elif no_memoize:
+            options["no_memoize"] = no_memoize
+    if fast_locals:
+        options["fast_locals"] = True
+    if numpy_lists:
+        from pylinguis.parsers import NumericList
+        if NumericList.available():
+            options["numpy_lists"] = True
+        else:
+            print("WARNING: --numpy-lists needs NumPy, which isn't installed; ignoring it")
+    try:
+        p = pylinguis.parsers.find_parser(parser, engine=engine, **options)
+    except ValueError as e:
+        print(f"ERROR: {e}; exiting.")
+        sys.exit(1)
     if not p:
-        print(f"ERROR: Could not find parser named '{parser}'; exiting.")
+        print(f"ERROR: Could not find parser named '{parser}' (have: {', '.join(pylinguis.parsers.parser_names())}); exiting.")
         sys.exit(1)
 
+    if jobs is not None and (save or savefile != None or stream) and not check:
+        print("WARNING: --jobs doesn't apply with --save/--savefile/--stream; ignoring it")
+        jobs = None
+    if timings and (jobs is not None or check):
+        print("WARNING: --timings doesn't apply with --jobs/--check; ignoring it")
+        timings = False
+    if timings and stream:
+        print("WARNING: --stream doesn't apply with --timings; ignoring it")
+        stream = False
+    if jobs is not None or check:
+        for fname in incoming:
+            if not os.path.exists(fname):
+                print(f"File '{fname}' does not exist!")
+                sys.exit(1)
+        codes, failed = compile_all(incoming, parser, engine, jobs or 1, options, use_cache and trace == None)
+        if check:
+            print(f"{len(incoming) - failed} of {len(incoming)} file(s) compiled")
+        if failed:
+            sys.exit(1)
+        if check:
+            return
+        # Compiled in parallel, but run one after another, in the order given
+        for fname in incoming:
+            print(f"Processing file '{fname}'...")
+            with profiled(fname, profile) as profiler:
+                namespace = p.runtime.run(codes[fname])
+            if memo_stats:
+                print_memo_stats(namespace)
+            if profiler:
+                print_profile(profiler, fname, profile_dir)
+        return
+
+    segments = None
+    from pylinguis.parsers.Timings import FileTimings, stage
+    file_timings: List[FileTimings] = []
     for fname in incoming:
         if save == True:
             savefile = fname + ".py"
@@ -58,26 +287,80 @@ def main() -> None:
             sys.exit(1)
         else:
             print(f"Processing file '{fname}'...")
+            timer = FileTimings(fname) if timings else None
+            p.timings = timer
+
+            # One namespace for the whole program, so that its functions can see its top-level names
+            namespace = p.runtime.namespace()
+
+            with open(fname, "rb") as f:
+                source = f.read()
+
+            # Files that switch parsers partway through (with #parser lines) are parsed a segment at a time
+            segmented = False
+            if b"#parser" in source:
+                from pylinguis.parsers.Segments import SegmentParser, has_pragmas
+                segmented = has_pragmas(source.decode("utf-8"))
+                if segmented and segments is None:
+                    segments = SegmentParser(parser, engine, **options)
+
+            if stream and not segmented and savefile == None and trace == None:
+                # Run each unit as it comes; nothing holds on to it after
+                with profiled(fname, profile) as profiler:
+                    for unit in p.units_from_file(fname):
+                        exec(compile(unit, filename=fname, mode="exec"), namespace)
+                if profiler:
+                    print_profile(profiler, fname, profile_dir)
+                continue
+
+            # Anything that needs the AST (saving, tracing) has to go through the parser
+            code = None
+            cache = None
+            if use_cache and savefile == None and trace == None:
+                cache = CodeCache(cache_dir_for(fname))
+                key = cache_key(cache, source, parser, engine, options)
+                with stage(timer, "cache"):
+                    code = cache.get(key, fname)
+
+            if code is None:
+                # Get the code into a string!
+                if segmented:
+                    with stage(timer, "parse"):
+                        module = segments.parse(source.decode("utf-8"), fname)
+                else:
+                    module = p.parse_file(fname)
+
+                # Write the translated Python to a savefile?
+                if savefile != None:
+                    date = datetime.now()
+                    with open(savefile, "wt") as sf:
+                        print(f"Saving translation to {savefile}")
+                        sf.write(f"# Translated from Linguis source file {fname} on {date}:\n")
+                        with open(fname, "r") as linfile:
+                            for line in linfile.readlines():
+                                sf.write(f"# {line}")
+                        sf.write("#\n\n")
+                        sf.writelines(ast.unparse(module))
+
+                with stage(timer, "compile"):
+                    code = compile(module, filename=fname, mode="exec")
+                if cache is not None:
+                    cache.put(key, code)
+
+            with profiled(fname, profile) as profiler, stage(timer, "exec"):
+                exec(code, namespace)
+            if memo_stats:
+                print_memo_stats(namespace)
+            if profiler:
+                print_profile(profiler, fname, profile_dir)
+            if timer is not None:
+                p.timings = None
+                file_timings.append(timer)
+                if timings_file is None:
+                    print(timer.report(), end="")
 
-            # Get the code into a string!
-            module = p.parse_file(fname)
-
-            # Write the translated Python to a savefile?
-            if savefile != None:
-                date = datetime.now()
-                with open(savefile, "wt") as sf:
-                    print(f"Saving translation to {savefile}")
-                    sf.write(f"# Translated from Linguis source file {fname} on {date}:\n")
-                    with open(fname, "r") as linfile:
-                        for line in linfile.readlines():
-                            sf.write(f"# {line}")
-                    sf.write("#\n\n")
-                    sf.writelines(ast.unparse(module))
-
-            code = compile(module, filename=fname, mode="exec")
-            localvars = {}
-            globalvars = globals() # Later ask parser to fill in globals
-            exec(code, globalvars, localvars)
+    if timings_file is not None:
+        write_timings(timings_file, file_timings, parser, engine, options)
 
 if __name__ == "__main__":
     main()
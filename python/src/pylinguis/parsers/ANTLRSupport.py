@@ -1,12 +1,61 @@
 import antlr4
+from antlr4.error.ErrorStrategy import DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
 import ast
+import logging
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
 from . import LinguisParserBase
+from . import Timings
+from .ANTLRVisitor import Visitor
+from .EvaluationError import EvaluationError
+from .IncrementalParse import IncrementalParse
+from .Languages import Language
+
+class ParseStats:
+    """Counts which stage of the two-stage parse each input finished in."""
+
+    def __init__(self) -> None:
+        self.sll = 0
+        self.ll = 0
+
+    @property
+    def total(self) -> int:
+        return self.sll + self.ll
+
+    @property
+    def sll_rate(self) -> float:
+        """Fraction of parses that finished in the fast (SLL) stage."""
+        return self.sll / self.total if self.total else 0.0
+
+    def __repr__(self) -> str:
+        return f"ParseStats(sll={self.sll}, ll={self.ll}, sll_rate={self.sll_rate:.3f})"
 
 class ANTLRParserBase(LinguisParserBase):
-    """A base class for parsers for Linguis that use ANTLR for their implementation."""
+    """
+    A base class for parsers for Linguis that use ANTLR for their implementation.
 
-    def __init__(self):
-        super().__init__()
+    Each instance keeps one lexer, token stream, parser and visitor, built on first use
+    and reset for each parse after that; so an instance must not be shared between
+    threads. (reuse=False builds fresh ones for every parse, as we used to.)
+    """
+
+    engine = "antlr"
+
+    def __init__(self, trace: Optional[str] = None, two_stage: bool = True, reuse: bool = True,
+                 memo_size: int = 0, optimize: bool = False,
+                 inline: bool = True, fast_locals: bool = False, memoize: bool = True,
+                 no_memoize: Iterable[str] = (), numpy_lists: bool = False) -> None:
+        super().__init__(trace=trace, memo_size=memo_size, optimize=optimize, inline=inline,
+                         fast_locals=fast_locals, memoize=memoize, no_memoize=no_memoize,
+                         numpy_lists=numpy_lists)
+        self.two_stage = two_stage
+        self.stats = ParseStats()
+        self.reuse = reuse
+        self.lexer = None
+        self.tokens = None
+        self.antlr_parser = None
+        self.visitor = None
 
     def getLexer(self, input_stream : antlr4.InputStream) -> antlr4.Lexer:
         raise Exception("E_NOTIMPL")
@@ -17,17 +66,83 @@ class ANTLRParserBase(LinguisParserBase):
     def getVisitor(self) -> antlr4.ParseTreeVisitor:
         raise Exception("E_NOTIMPL")
 
+    def recognizers(self, input_stream : antlr4.InputStream) -> Tuple[antlr4.CommonTokenStream, antlr4.Parser]:
+        """
+        Points our lexer/token stream/parser at input_stream, building them on first use.
+
+        Setting the lexer's input stream and the parser's token stream resets all of
+        their state, including whatever a parse that failed halfway left behind.
+        """
+
+        if self.lexer is None or not self.reuse:
+            self.lexer = self.getLexer(input_stream)
+            self.tokens = antlr4.CommonTokenStream(self.lexer)
+            self.antlr_parser = self.getParser(self.tokens)
+            self.visitor = self.getVisitor()
+        else:
+            self.lexer.inputStream = input_stream
+            self.tokens.setTokenSource(self.lexer)
+            self.antlr_parser.setTokenStream(self.tokens)
+            self.visitor.debugging = self.logger.isEnabledFor(logging.DEBUG)
+        return self.tokens, self.antlr_parser
+
+    def parse_tree(self, parser : antlr4.Parser, rule : Callable[[], antlr4.ParserRuleContext]) -> antlr4.ParserRuleContext:
+        """
+        Runs one grammar rule of parser, and returns its parse tree.
+
+        With two_stage on, the rule first runs with SLL prediction and an error strategy
+        that bails out on the first problem; that is much cheaper than full LL, and is
+        enough for any syntactically-valid input to this grammar. Only when that fails
+        do we rewind and run it again with full LL prediction and the usual error
+        reporting and recovery.
+        """
+
+        if not self.two_stage:
+            tree = rule()
+            self.stats.ll += 1
+            return tree
+
+        stream = parser.getTokenStream()
+        start = stream.index
+        listeners = parser._listeners
+        parser._interp.predictionMode = antlr4.PredictionMode.SLL
+        parser._errHandler = antlr4.BailErrorStrategy()
+        parser.removeErrorListeners()
+        try:
+            tree = rule()
+            self.stats.sll += 1
+            return tree
+        except ParseCancellationException:
+            self.logger.debug("SLL parse failed; retrying with full LL")
+        finally:
+            parser._interp.predictionMode = antlr4.PredictionMode.LL
+            parser._errHandler = DefaultErrorStrategy()
+            parser._listeners = listeners
+
+        parser.reset()
+        stream.seek(start)
+        tree = rule()
+        self.stats.ll += 1
+        return tree
+
     def parse_from_stream(self, input_stream : antlr4.InputStream) -> ast.Module:
         """Internal(ish) method that takes an ANTLR stream and parses it, then runs it"""
 
-        lexer = self.getLexer(input_stream)
-        stream = antlr4.CommonTokenStream(lexer)        
-        parser = self.getParser(stream)
-        tree = parser.block()
-        self.logger.info(f"Parse Tree:\n{tree.toStringTree(recog=parser)}")
+        timings = self.timings
+        stream, parser = self.recognizers(input_stream)
+        if timings is not None:
+            # Lexed up front, rather than as the parser goes, so that it can be timed on its own
+            with timings.stage("lex"):
+                stream.fill()
+            timings.count("tokens", len(stream.tokens) - 1)
+        with Timings.stage(timings, "parse"):
+            tree = self.parse_tree(parser, parser.block)
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Parse Tree:\n%s", tree.toStringTree(recog=parser))
 
-        visitor = self.getVisitor()
-        nodes = visitor.visit(tree)
+        with Timings.stage(timings, "visit"):
+            lists = self.visitor.lists
+            nodes = self.visitor.visit(tree)
 
         # Do I want to wrap the main body in a function call, so that we
         # can 'return' from it and hand the value back through here to the
@@ -35,26 +150,136 @@ class ANTLRParserBase(LinguisParserBase):
         # for Linguis?
         #
 
-        module = ast.Module(body=nodes, type_ignores=[])
-        ast.fix_missing_locations(module) 
-            # The above is absolutely necessary, to fixup line numbers and locations
-            # for the AST to be valid for compilation. Failure to fixup them yields errors.
-        self.logger.info(f"Python is:\n{ast.unparse(module)}")
+        with Timings.stage(timings, "transform"):
+            module = self.transform(ast.Module(body=nodes, type_ignores=[]), lists=self.visitor.lists > lists)
+        if timings is not None:
+            timings.count("parse_tree_nodes", Timings.tree_size(tree))
+            timings.count("ast_nodes", Timings.ast_size(module))
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Python is:\n%s", ast.unparse(module))
+        if self.trace is not None:
+            self.trace.write(getattr(input_stream, "fileName", None), tree.toStringTree(recog=parser), module)
 
         return module
 
+    def units_from_stream(self, input_stream : antlr4.InputStream) -> Iterator[ast.Module]:
+        """
+        Parses input_stream one top-level statement or functionDecl at a time, yielding a
+        Module holding each as soon as it is parsed.
+
+        Nothing of a unit is kept once the next one is asked for: not its parse tree, not
+        its AST, and not its tokens, which are dropped from the front of the token stream
+        as we go. So memory stays bounded by the largest single unit (plus the source
+        text itself, which ANTLR's input streams hold whole). Traces aren't written.
+        """
+
+        stream, parser = self.recognizers(input_stream)
+        while True:
+            # Drop the tokens of the units we're done with
+            if stream.index > 0:
+                del stream.tokens[:stream.index]
+                for idx, token in enumerate(stream.tokens):
+                    token.tokenIndex = idx
+                stream.index = 0
+
+            if stream.LA(1) == antlr4.Token.EOF:
+                return
+            lists = self.visitor.lists
+            nodes = self.parse_unit(parser, self.visitor)
+            if not nodes:
+                continue
+
+            # Later units may assign to any name, so there's no propagating constants into this one
+            module = self.transform(ast.Module(body=nodes, type_ignores=[]), whole=False, lists=self.visitor.lists > lists)
+            del nodes
+            yield module
+
+    def parse_unit(self, parser : antlr4.Parser, visitor : antlr4.ParseTreeVisitor) -> List[ast.stmt]:
+        """
+        Parses the top-level statement or functionDecl at parser's current token, and
+        visits it into Python statements.
+
+        If error recovery gives up without consuming anything, the offending token is
+        skipped, and there are no statements.
+        """
+
+        stream = parser.getTokenStream()
+        start = stream.index
+        kind = stream.LA(1)
+        if kind == parser.Def:
+            tree = self.parse_tree(parser, parser.functionDecl)
+        elif kind == parser.Return:
+            # 'return' expression ';' can only end the block; let that rule take it
+            tree = self.parse_tree(parser, parser.block)
+        else:
+            tree = self.parse_tree(parser, parser.statement)
+        if stream.index == start:
+            stream.consume()
+            return []
+
+        nodes = visitor.visit(tree)
+        return nodes if isinstance(nodes, list) else [ nodes ]
+
+    def incremental(self, code : str) -> IncrementalParse:
+        """Parses code, keeping what it takes to re-parse it cheaply after edits; see IncrementalParse."""
+
+        return IncrementalParse(self, code)
+
+    def units_from_file(self, filename : str) -> Iterator[ast.Module]:
+        """Parses filename one top-level unit at a time; see units_from_stream()."""
+
+        return self.units_from_stream(antlr4.FileStream(filename, encoding="utf-8"))
+
     def parse_file(self, filename : str) -> ast.Module:
         """Takes filename and dumps it into self.parse()"""
 
-        filestream = antlr4.FileStream(filename)
+        # FileStream reads ASCII unless told otherwise, and some languages' keywords aren't
+        with Timings.stage(self.timings, "read"):
+            filestream = antlr4.FileStream(filename, encoding="utf-8")
         return self.parse_from_stream(filestream)
 
-    def parse(self, code: str) -> ast.Module:
+    def parse_code(self, code: str) -> ast.Module:
         """Parses the entire code into a Python Module node."""
 
         # TODO: Need to figure out if/how ANTLR4 supports Unicode
 
-        code_stream = antlr4.InputStream(code)
-        return self.parse_from_stream(code_stream)
+        return self.parse_from_stream(antlr4.InputStream(code))
+
+
+class ANTLRLanguageParser(ANTLRParserBase):
+    """
+    An ANTLR parser for one of the languages in Languages.
+
+    Subclasses only name their Language and the lexer and parser classes ANTLR generated
+    from its grammar; the shared Visitor does the rest.
+    """
+
+    language: Language
+    lexer_cls: type
+    parser_cls: type
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        cls.name = cls.language.name
+
+    def __init__(self, **options: Any) -> None:
+        super().__init__(**options)
+        self.logger = logging.getLogger(self.language.logger_name)
+        self.logger.info("%s::__init__", type(self).__name__)
+
+    def getLexer(self, input_stream : antlr4.InputStream) -> antlr4.Lexer:
+        return self.lexer_cls(input_stream)
+
+    def getParser(self, stream : antlr4.CommonTokenStream) -> antlr4.Parser:
+        return self.parser_cls(stream)
+
+    def getVisitor(self) -> Visitor:
+        return Visitor(self, self.parser_cls)
 
+    def getTruthy(self, text : str) -> bool:
+        """Take the text and determine if it is a True or False literal value."""
 
+        value = self.language.booleans.get(text)
+        if value is None:
+            raise EvaluationError(f"{text} not recognized as a boolean value")
+        return value
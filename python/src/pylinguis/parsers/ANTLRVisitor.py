@@ -0,0 +1,335 @@
+"""
+The one visitor that turns a Linguis parse tree (from any language's generated ANTLR
+parser) into a Python AST.
+
+All the languages share one parser grammar, so their generated parsers have the same
+rules, the same labeled alternatives and the same token types; only the classes are
+different. Rather than ANTLR's accept()/visitXxx double dispatch, plus a chain of
+`ctx.xxx() != None` tests inside each visit method, the Visitor looks the handler for
+each context class up in a table built once per generated parser, and the handlers
+pick their operands straight out of ctx.children by position (every alternative of the
+grammar fixes where they are) and their operators out of tables keyed by token type.
+
+Every node is located in the source as it's built: visit() gives the node a handler
+returns the span of the context it came from (its first token to its last), and the
+handlers locate the few other nodes they make (the Name a call calls, say) at the
+tokens those come from. So tracebacks, profiles and coverage point at the line of the
+Linguis source that did it, and there's no fix_missing_locations() pass to make after.
+(Columns count characters, as ANTLR does; Python counts UTF-8 bytes, so carets under
+lines with accented letters before the error fall a little short.)
+"""
+
+import ast
+import logging
+from typing import Any, Callable, Dict, List
+
+import antlr4
+from antlr4.tree.Tree import TerminalNode
+
+from .Operators import BINARY_OPS, COMPARE_OPS, LOAD, STORE, POW, AND, OR, IN, NOT, USUB
+from .Runtime import MAKE_LIST
+
+class Tables:
+    """ The dispatch and operator tables for one generated parser class. """
+
+    def __init__(self, parser_cls: type) -> None:
+        # Context class -> handler, for every rule and labeled alternative we handle
+        self.dispatch: Dict[type, Callable[["Visitor", antlr4.ParserRuleContext], Any]] = {}
+        for attr, value in vars(parser_cls).items():
+            if attr.endswith("Context") and isinstance(value, type):
+                handler = getattr(Visitor, "visit" + attr[:-len("Context")], None)
+                if handler is not None:
+                    self.dispatch[value] = handler
+
+        # Token type -> operator
+        self.binary_ops = { getattr(parser_cls, name): op for name, op in BINARY_OPS.items() }
+        self.compare_ops = { getattr(parser_cls, name): op for name, op in COMPARE_OPS.items() }
+        self.return_type = parser_cls.Return
+
+def at(node: ast.AST, token: antlr4.Token) -> ast.AST:
+    """ node, located at token. """
+
+    node.lineno = node.end_lineno = token.line
+    node.col_offset = token.column
+    node.end_col_offset = token.column + len(token.text)
+    return node
+
+def spanning(node: ast.AST, start: antlr4.Token, stop: antlr4.Token) -> ast.AST:
+    """ node, located from the start of token start to the end of token stop. """
+
+    node.lineno = start.line
+    node.col_offset = start.column
+    node.end_lineno = stop.line
+    node.end_col_offset = stop.column + len(stop.text)
+    return node
+
+_tables: Dict[type, Tables] = {}
+
+def tables_for(parser_cls: type) -> Tables:
+    """The (shared) tables for a generated parser class, built on first use."""
+
+    tables = _tables.get(parser_cls)
+    if tables is None:
+        tables = _tables[parser_cls] = Tables(parser_cls)
+    return tables
+
+class Visitor:
+    """
+    Visits the parse tree from one language's generated parser, and returns the Python AST for it.
+
+    parser is the LinguisParserBase we work for; we take its logger and the boolean
+    literals of its language from it.
+    """
+
+    def __init__(self, parser: Any, parser_cls: type) -> None:
+        self.parser = parser
+        self.logger = parser.logger
+        # Checked once per visitor, so that the per-node dumps below cost nothing when DEBUG is off
+        self.debugging = self.logger.isEnabledFor(logging.DEBUG)
+        self.booleans = parser.language.booleans
+
+        tables = tables_for(parser_cls)
+        self.dispatch = tables.dispatch
+        self.binary_ops = tables.binary_ops
+        self.compare_ops = tables.compare_ops
+        self.return_type = tables.return_type
+        # How many list displays we've visited, all told (a Module with any has to import MAKE_LIST)
+        self.lists = 0
+
+    def visit(self, ctx: antlr4.ParserRuleContext) -> Any:
+        handler = self.dispatch.get(type(ctx))
+        if handler is None:
+            raise Exception(f"Unrecognized {type(ctx).__name__}: {ctx.getText()}")
+        node = handler(self, ctx)
+        if type(node) is not list:
+            start, stop = ctx.start, ctx.stop
+            node.lineno = start.line
+            node.col_offset = start.column
+            if stop is None or stop.tokenIndex < start.tokenIndex:
+                # Nothing matched (error recovery)
+                stop = start
+            node.end_lineno = stop.line
+            node.end_col_offset = stop.column + len(stop.text)
+        if self.debugging:
+            dump = [ ast.dump(n) for n in node ] if isinstance(node, list) else ast.dump(node)
+            self.logger.debug(f"{type(ctx).__name__[:-len('Context')]} \"{ctx.getText()}\" -> {dump}")
+        return node
+
+    ########################################
+    ## Blocks and statements
+    ##
+
+    # block : ( statement | functionDecl )* ( Return expression ';' )?
+    def visitBlock(self, ctx: antlr4.ParserRuleContext) -> List[ast.stmt]:
+        statements = []
+        children = ctx.children
+        if children is None:
+            return statements
+
+        for idx, child in enumerate(children):
+            if isinstance(child, TerminalNode):
+                # Only 'return' expression ';' (or whatever error recovery left behind)
+                if child.symbol.type == self.return_type:
+                    value = children[idx + 1]
+                    statements.append(spanning(ast.Return(value=self.visit(value)), child.symbol,
+                                               children[idx + 2].symbol if idx + 2 < len(children) else value.stop))
+                    break
+            else:
+                statements.append(self.visit(child))
+        return statements
+
+    # statement : assignment ';' | functionCall ';' | ifStatement | forStatement | whileStatement
+    def visitStatement(self, ctx: antlr4.ParserRuleContext) -> ast.stmt:
+        node = self.visit(ctx.children[0])
+        if isinstance(node, ast.expr):
+            # A function called for its side effects
+            node = ast.Expr(value=node)
+        return node
+
+    # assignment : Identifier '=' expression
+    def visitAssignment(self, ctx: antlr4.ParserRuleContext) -> ast.Assign:
+        children = ctx.children
+        return ast.Assign(targets=[ at(ast.Name(id=children[0].getText(), ctx=STORE), children[0].symbol) ],
+                          value=self.visit(children[2]))
+
+    # ifStatement : ifStat elseIfStat* elseStat? End
+    def visitIfStatement(self, ctx: antlr4.ParserRuleContext) -> ast.If:
+        children = ctx.children
+        retval = current = self.visit(children[0])
+        for child in children[1:-1]:
+            node = self.visit(child)
+            if isinstance(node, list):
+                # The else block; nothing can follow it
+                current.orelse = node
+            else:
+                current.orelse = [ node ]
+                current = node
+        return retval
+
+    # ifStat : If expression Do block
+    def visitIfStat(self, ctx: antlr4.ParserRuleContext) -> ast.If:
+        children = ctx.children
+        return ast.If(test=self.visit(children[1]), body=self.visit(children[3]), orelse=[])
+
+    # elseIfStat : Else If expression Do block
+    def visitElseIfStat(self, ctx: antlr4.ParserRuleContext) -> ast.If:
+        children = ctx.children
+        return ast.If(test=self.visit(children[2]), body=self.visit(children[4]), orelse=[])
+
+    # elseStat : Else Do block
+    def visitElseStat(self, ctx: antlr4.ParserRuleContext) -> List[ast.stmt]:
+        return self.visit(ctx.children[2])
+
+    # functionDecl : Def Identifier '(' idList? ')' block End
+    def visitFunctionDecl(self, ctx: antlr4.ParserRuleContext) -> ast.FunctionDef:
+        children = ctx.children
+        args = self.visit(children[3]) if len(children) == 7 else []
+        return ast.FunctionDef(name=children[1].getText(),
+                               args=ast.arguments(posonlyargs=[], args=args, kwonlyargs=[], kw_defaults=[], defaults=[]),
+                               body=self.visit(children[-2]), decorator_list=[], type_params=[])
+
+    # forStatement : For Identifier '=' expression To expression Do block End
+    def visitForStatement(self, ctx: antlr4.ParserRuleContext) -> ast.For:
+        children = ctx.children
+        # "for a = 0 to 3 do" -> "for a in range(0,3):"
+        args = [ self.visit(children[3]), self.visit(children[5]) ]
+        start, stop = children[3].start, children[5].stop
+        rangecall = spanning(ast.Call(func=spanning(ast.Name(id="range", ctx=LOAD), start, stop), args=args, keywords=[]),
+                             start, stop)
+        return ast.For(target=at(ast.Name(id=children[1].getText(), ctx=STORE), children[1].symbol), iter=rangecall,
+                       body=self.visit(children[7]), orelse=[])
+
+    # whileStatement : While expression Do block End
+    def visitWhileStatement(self, ctx: antlr4.ParserRuleContext) -> ast.While:
+        children = ctx.children
+        return ast.While(test=self.visit(children[1]), body=self.visit(children[3]), orelse=[])
+
+    # idList : Identifier ( ',' Identifier )*
+    def visitIdList(self, ctx: antlr4.ParserRuleContext) -> List[ast.arg]:
+        return [ at(ast.arg(arg=child.getText()), child.symbol) for child in ctx.children[::2] ]
+
+    # exprList : expression ( ',' expression )*
+    def visitExprList(self, ctx: antlr4.ParserRuleContext) -> List[ast.expr]:
+        return [ self.visit(child) for child in ctx.children[::2] ]
+
+    ########################################
+    ## Function calls
+    ##
+
+    # Identifier '(' exprList? ')'
+    def visitIdentifierFunctionCall(self, ctx: antlr4.ParserRuleContext) -> ast.Call:
+        children = ctx.children
+        args = self.visit(children[2]) if len(children) == 4 else []
+        return ast.Call(func=at(ast.Name(id=children[0].getText(), ctx=LOAD), children[0].symbol), args=args, keywords=[])
+
+    # Println '(' expression ')'
+    def visitPrintlnFunctionCall(self, ctx: antlr4.ParserRuleContext) -> ast.Call:
+        return ast.Call(func=at(ast.Name(id="print", ctx=LOAD), ctx.start), args=[ self.visit(ctx.children[2]) ], keywords=[])
+
+    # Print '(' expression ')'
+    def visitPrintFunctionCall(self, ctx: antlr4.ParserRuleContext) -> ast.Call:
+        return ast.Call(func=at(ast.Name(id="print", ctx=LOAD), ctx.start), args=[ self.visit(ctx.children[2]) ],
+                        keywords=[ at(ast.keyword(arg="end", value=at(ast.Constant(value=""), ctx.start)), ctx.start) ])
+
+    # Assert '(' expression ')'
+    def visitAssertFunctionCall(self, ctx: antlr4.ParserRuleContext) -> ast.Assert:
+        expr = ctx.children[2]
+        return ast.Assert(test=self.visit(expr),
+                          msg=spanning(ast.Constant(value=f"Assertion Failure: {expr.getText()}"), expr.start, expr.stop))
+
+    # Size '(' expression ')'
+    def visitSizeFunctionCall(self, ctx: antlr4.ParserRuleContext) -> ast.Call:
+        return ast.Call(func=at(ast.Name(id="len", ctx=LOAD), ctx.start), args=[ self.visit(ctx.children[2]) ], keywords=[])
+
+    ########################################
+    ## Expressions
+    ##
+
+    # '-' expression
+    def visitUnaryMinusExpression(self, ctx: antlr4.ParserRuleContext) -> ast.UnaryOp:
+        return ast.UnaryOp(op=USUB, operand=self.visit(ctx.children[1]))
+
+    # '!' expression
+    def visitNotExpression(self, ctx: antlr4.ParserRuleContext) -> ast.UnaryOp:
+        return ast.UnaryOp(op=NOT, operand=self.visit(ctx.children[1]))
+
+    # base=expression '^' expo=expression
+    def visitPowerExpression(self, ctx: antlr4.ParserRuleContext) -> ast.BinOp:
+        return ast.BinOp(left=self.visit(ctx.base), op=POW, right=self.visit(ctx.expo))
+
+    # left=expression op=( '*' | '/' | '%' ) right=expression
+    def visitMultExpression(self, ctx: antlr4.ParserRuleContext) -> ast.BinOp:
+        return ast.BinOp(left=self.visit(ctx.left), op=self.binary_ops[ctx.op.type], right=self.visit(ctx.right))
+
+    # left=expression op=( '+' | '-' ) right=expression
+    visitAddExpression = visitMultExpression
+
+    # left=expression op=( '>=' | '<=' | '>' | '<' ) right=expression
+    def visitCompExpression(self, ctx: antlr4.ParserRuleContext) -> ast.Compare:
+        return ast.Compare(left=self.visit(ctx.left), ops=[ self.compare_ops[ctx.op.type] ],
+                           comparators=[ self.visit(ctx.right) ])
+
+    # left=expression op=( '==' | '!=' ) right=expression
+    visitEqExpression = visitCompExpression
+
+    # left=expression '&&' right=expression
+    def visitAndExpression(self, ctx: antlr4.ParserRuleContext) -> ast.BoolOp:
+        return ast.BoolOp(op=AND, values=[ self.visit(ctx.left), self.visit(ctx.right) ])
+
+    # left=expression '||' right=expression
+    def visitOrExpression(self, ctx: antlr4.ParserRuleContext) -> ast.BoolOp:
+        return ast.BoolOp(op=OR, values=[ self.visit(ctx.left), self.visit(ctx.right) ])
+
+    # left=expression In right=expression
+    def visitInExpression(self, ctx: antlr4.ParserRuleContext) -> ast.Compare:
+        return ast.Compare(left=self.visit(ctx.left), ops=[ IN ], comparators=[ self.visit(ctx.right) ])
+
+    # Number
+    def visitNumberExpression(self, ctx: antlr4.ParserRuleContext) -> ast.Constant:
+        text = ctx.start.text
+        return ast.Constant(value=float(text) if "." in text else int(text))
+
+    # Bool
+    def visitBoolExpression(self, ctx: antlr4.ParserRuleContext) -> ast.Constant:
+        return ast.Constant(value=self.booleans[ctx.start.text])
+
+    # Null
+    def visitNullExpression(self, ctx: antlr4.ParserRuleContext) -> ast.Constant:
+        return ast.Constant(value=None)
+
+    # String
+    def visitStringExpression(self, ctx: antlr4.ParserRuleContext) -> ast.Constant:
+        return ast.Constant(value=ctx.start.text[1:-1])
+
+    # Identifier
+    def visitIdentifierExpression(self, ctx: antlr4.ParserRuleContext) -> ast.Name:
+        return ast.Name(id=ctx.start.text, ctx=LOAD)
+
+    # Identifier '[' expression ']'
+    def visitSubscriptExpression(self, ctx: antlr4.ParserRuleContext) -> ast.Subscript:
+        children = ctx.children
+        return ast.Subscript(value=at(ast.Name(id=children[0].getText(), ctx=LOAD), children[0].symbol),
+                             slice=self.visit(children[2]), ctx=LOAD)
+
+    # functionCall
+    def visitFunctionCallExpression(self, ctx: antlr4.ParserRuleContext) -> ast.expr:
+        return self.visit(ctx.children[0])
+
+    # '[' exprList? ']'
+    def visitListExpression(self, ctx: antlr4.ParserRuleContext) -> ast.Call:
+        children = ctx.children
+        self.lists += 1
+        items = spanning(ast.List(elts=self.visit(children[1]) if len(children) == 3 else [], ctx=LOAD), ctx.start, ctx.stop)
+        return ast.Call(func=spanning(ast.Name(id=MAKE_LIST, ctx=LOAD), ctx.start, ctx.stop), args=[ items ], keywords=[])
+
+    # '(' expression ')'
+    def visitExpressionExpression(self, ctx: antlr4.ParserRuleContext) -> ast.expr:
+        return self.visit(ctx.children[1])
+
+    # Input '(' String? ')'
+    def visitInputExpression(self, ctx: antlr4.ParserRuleContext) -> ast.Call:
+        children = ctx.children
+        prompt = children[2].getText()[1:-1] if len(children) == 4 else ""
+        where = children[2].symbol if len(children) == 4 else ctx.start
+        return ast.Call(func=at(ast.Name(id="input", ctx=LOAD), ctx.start), args=[ at(ast.Constant(value=prompt), where) ],
+                        keywords=[])
@@ -0,0 +1,42 @@
+import ast
+import hashlib
+import os
+from typing import Optional
+
+class Trace:
+    """
+    Writes diagnostic dumps for each parse into a directory.
+
+    Every parse produces three files, named after the source file and a short hash
+    of its full path, so that files of the same name in different directories don't
+    overwrite each other's (or a running counter for code parsed from a string):
+    `name.tree.txt` holds the parse tree,
+    `name.ast.txt` the Python AST, and `name.py` the unparsed Python. Nothing is
+    rendered at all unless a Trace is attached to the parser.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self.count = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def name_for(self, source: Optional[str]) -> str:
+        """Picks the base name for the dump files of one parse."""
+
+        self.count += 1
+        if source:
+            path = hashlib.sha256(os.path.abspath(source).encode("utf-8")).hexdigest()[:8]
+            return f"{os.path.basename(source)}-{path}"
+        return f"parse-{self.count}"
+
+    def write(self, source: Optional[str], tree: str, module: ast.Module) -> str:
+        """Writes the dumps for one parse; returns the base path the files share."""
+
+        base = os.path.join(self.directory, self.name_for(source))
+        with open(base + ".tree.txt", "wt") as f:
+            f.write(tree)
+        with open(base + ".ast.txt", "wt") as f:
+            f.write(ast.dump(module, indent="  "))
+        with open(base + ".py", "wt") as f:
+            f.write(ast.unparse(module))
+        return base
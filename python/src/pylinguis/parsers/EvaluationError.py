@@ -1,4 +1,4 @@
 class EvaluationError(Exception):
     def __init__(self, message):
-        super.__init__(self)
+        super().__init__(message)
         self.message = message
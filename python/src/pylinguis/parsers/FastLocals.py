@@ -0,0 +1,51 @@
+"""
+Fast-locals mode: running a program's top level as the body of a function.
+
+Python looks the names of a module's top level up in dicts (its globals, or the locals
+exec() was given), on every access; a function's locals live in an array, at fixed
+slots. So wrap() turns
+
+    total = 0
+    for i in range(1, 10001):
+        total = total + i
+
+into
+
+    def __linguis_main__():
+        total = 0
+        for i in range(1, 10001):
+            total = total + i
+    __linguis_main__()
+
+and the loop's i and total become fast locals. The functions the program declares
+become locals of the wrapper too, which its functions reach through closure cells; so
+they see each other, and the program's top-level names, whatever namespace the Module
+is exec()'d in. (A cell is no quicker to call through than a global, which CPython
+caches well, so programs that are mostly function calls gain little; deep recursion
+runs a few percent slower.) Names the program only reads (print, len, range) are
+still globals, from that namespace.
+
+The catch is that the program's top-level names are gone once it finishes: nothing is
+left in the namespace but __linguis_main__. A top-level name read before it's assigned
+raises UnboundLocalError (a NameError, as before).
+"""
+
+import ast
+
+MAIN = "__linguis_main__"
+
+def wrap(module: ast.Module) -> ast.Module:
+    """ Moves module's statements into the body of a function, which the module then calls. """
+
+    if not module.body:
+        return module
+    main = ast.FunctionDef(name=MAIN, args=ast.arguments(posonlyargs=[], args=[], vararg=None, kwonlyargs=[],
+                                                         kw_defaults=[], kwarg=None, defaults=[]),
+                           body=module.body, decorator_list=[], returns=None, type_params=[])
+    last = module.body[-1]
+    call = ast.Expr(value=ast.copy_location(ast.Call(func=ast.copy_location(ast.Name(id=MAIN, ctx=ast.Load()), last),
+                                                     args=[], keywords=[]), last))
+    ast.copy_location(main, module.body[0])
+    main.end_lineno, main.end_col_offset = last.end_lineno, last.end_col_offset
+    ast.copy_location(call, last)
+    return ast.Module(body=[ main, call ], type_ignores=module.type_ignores)
@@ -0,0 +1,550 @@
+"""
+A hand-written front end for Linguis: a regular-expression scanner, and a recursive-
+descent parser (with a Pratt parser for expressions) for the grammar in
+syntax/LinguisParser.g4, building the same Python AST as the ANTLR parsers' Visitor.
+
+It runs any language in Languages off that language's keyword and boolean tables,
+without the ANTLR runtime or any generated code. Select it with
+find_parser(language, engine="fast") (or `--engine=fast`).
+
+Unlike the ANTLR parsers, it makes no attempt to recover from syntax errors: the
+first one raises a SyntaxError that says where it is.
+
+Nodes are located in the source as they're built, spanning the same tokens as the
+ANTLR Visitor's do, so that both engines' ASTs come out alike down to their locations.
+"""
+
+import ast
+import bisect
+import logging
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import Timings
+from .LinguisParserBase import LinguisParserBase
+from .Languages import Language, SYMBOLS
+from .Operators import BINARY_OPS, COMPARE_OPS, LOAD, STORE, POW, AND, OR, IN, NOT, USUB
+from .Runtime import MAKE_LIST
+
+IDENTIFIER = re.compile(r"[a-zA-Z_][a-zA-Z_0-9]*")
+NEWLINE = re.compile(r"\n")
+
+class Scanner:
+    """
+    Splits source into tokens the way the language's ANTLR lexer would.
+
+    Tokens come back as three parallel lists: their kinds (the lexer's token names,
+    a la "Identifier" or "Add"), their text, and their offsets into the source.
+    """
+
+    def __init__(self, language: Language) -> None:
+        self.words: Dict[str, str] = { word: kind for kind, word in language.keywords.items() }
+        self.words.update((word, "Bool") for word in language.booleans)
+        self.symbols: Dict[str, str] = { text: kind for kind, text in SYMBOLS.items() }
+
+        # Like ANTLR's lexer, we take the longest match, and a keyword over an identifier
+        # of the same length. Most keywords are spelled like identifiers, so we scan an
+        # identifier and then look it up; but a keyword the Identifier rule can't match
+        # all of (a la "définir") always outruns an identifier, so it is tried first.
+        odd = sorted((w for w in self.words if not IDENTIFIER.fullmatch(w)), key=len, reverse=True)
+        patterns = [ r"(?P<skip>[ \t\r\n\f]+|//[^\r\n]*|/\*.*?\*/)" ]
+        if odd:
+            patterns.append("(?P<keyword>" + "|".join(map(re.escape, odd)) + ")")
+        patterns += [
+            r"(?P<Identifier>[a-zA-Z_][a-zA-Z_0-9]*)",
+            r"(?P<Number>(?:[1-9][0-9]*|0)(?:\.[0-9]*)?)",
+            r"""(?P<String>"(?:[^"\r\n\\]|\\[^\r\n])*"|'(?:[^'\r\n\\]|\\[^\r\n])*')""",
+            "(?P<symbol>" + "|".join(map(re.escape, sorted(self.symbols, key=len, reverse=True))) + ")",
+        ]
+        self.regex = re.compile("|".join(patterns), re.DOTALL)
+
+    def scan(self, code: str, filename: Optional[str] = None) -> Tuple[List[str], List[str], List[int]]:
+        kinds: List[str] = []
+        texts: List[str] = []
+        starts: List[int] = []
+        words = self.words
+        symbols = self.symbols
+
+        pos = 0
+        for m in self.regex.finditer(code):
+            start = m.start()
+            if start != pos:
+                raise syntax_error(f"unexpected character {code[pos]!r}", code, pos, filename)
+            pos = m.end()
+            group = m.lastgroup
+            if group == "skip":
+                continue
+            text = m.group()
+            if group == "Identifier":
+                kind = words.get(text, "Identifier")
+            elif group == "symbol":
+                kind = symbols[text]
+            elif group == "keyword":
+                kind = words[text]
+            else:
+                kind = group
+            kinds.append(kind)
+            texts.append(text)
+            starts.append(start)
+        if pos != len(code):
+            raise syntax_error(f"unexpected character {code[pos]!r}", code, pos, filename)
+
+        kinds.append("EOF")
+        texts.append("")
+        starts.append(len(code))
+        return kinds, texts, starts
+
+_scanners: Dict[str, Scanner] = {}
+
+def scanner_for(language: Language) -> Scanner:
+    """The (shared) scanner for a language, built on first use."""
+
+    scanner = _scanners.get(language.name)
+    if scanner is None:
+        scanner = _scanners[language.name] = Scanner(language)
+    return scanner
+
+def syntax_error(message: str, code: str, pos: int, filename: Optional[str]) -> SyntaxError:
+    line_start = code.rfind("\n", 0, pos) + 1
+    line_end = code.find("\n", pos)
+    text = code[line_start:line_end if line_end >= 0 else len(code)]
+    return SyntaxError(message, (filename or "<linguis>", code.count("\n", 0, pos) + 1, pos - line_start + 1, text))
+
+# Binary operators: token kind -> precedence. Higher binds tighter; these are the
+# precedences ANTLR gives the alternatives of the (left-recursive) expression rule,
+# so that we group exactly as the ANTLR parsers do.
+BINARY_PRECEDENCE = {
+    "Pow": 18,
+    "Multiply": 17, "Divide": 17, "Modulus": 17,
+    "Add": 16, "Subtract": 16,
+    "GTEquals": 15, "LTEquals": 15, "GT": 15, "LT": 15,
+    "Equals": 14, "NEquals": 14,
+    "And": 13,
+    "Or": 12,
+    "In": 11,
+}
+# Unary '-' and '!' come first in the rule, so they bind tighter than anything ("-2 ^ 2" is 4)
+UNARY_PRECEDENCE = 20
+
+# Where a block stops (and whatever holds it takes over)
+BLOCK_END = frozenset([ "End", "Else", "EOF" ])
+
+class Parser:
+    """ Parses one source's tokens into the body of a Python Module. """
+
+    def __init__(self, language: Language, code: str, tokens: Tuple[List[str], List[str], List[int]],
+                 filename: Optional[str] = None) -> None:
+        self.language = language
+        self.booleans = language.booleans
+        self.code = code
+        self.filename = filename
+        self.kinds, self.texts, self.starts = tokens
+        self.i = 0
+        # How many list displays we've parsed, all told (a Module with any has to import MAKE_LIST)
+        self.lists = 0
+        # Where each line of code starts, to turn token offsets into lines and columns
+        self.line_starts = [ 0 ]
+        self.line_starts.extend(m.end() for m in NEWLINE.finditer(code))
+
+    def located(self, node: ast.AST, first: int, last: Optional[int] = None) -> ast.AST:
+        """ node, located from the start of token first to the end of token last (the last one consumed). """
+
+        if last is None:
+            last = self.i - 1
+        line_starts = self.line_starts
+        start = self.starts[first]
+        line = bisect.bisect_right(line_starts, start)
+        node.lineno = line
+        node.col_offset = start - line_starts[line - 1]
+        start = self.starts[last]
+        line = bisect.bisect_right(line_starts, start)
+        node.end_lineno = line
+        node.end_col_offset = start - line_starts[line - 1] + len(self.texts[last])
+        return node
+
+    def error(self, expected: str) -> SyntaxError:
+        kind = self.kinds[self.i]
+        found = "end of input" if kind == "EOF" else repr(self.texts[self.i])
+        return syntax_error(f"expected {expected}, found {found}", self.code, self.starts[self.i], self.filename)
+
+    def spelling(self, kind: str) -> str:
+        """How the source spells a token kind, for error messages."""
+
+        word = self.language.keywords.get(kind) or SYMBOLS.get(kind)
+        return repr(word) if word else kind
+
+    def expect(self, kind: str) -> str:
+        """Consumes a token of the given kind, and returns its text."""
+
+        i = self.i
+        if self.kinds[i] != kind:
+            raise self.error(self.spelling(kind))
+        self.i = i + 1
+        return self.texts[i]
+
+    ########################################
+    ## Blocks and statements
+    ##
+
+    def program(self) -> List[ast.stmt]:
+        body = self.block()
+        if self.kinds[self.i] != "EOF":
+            raise self.error("a statement")
+        return body
+
+    def units(self) -> Iterator[ast.stmt]:
+        """Parses the program like program(), but hands back each top-level statement as soon as it's parsed."""
+
+        kinds = self.kinds
+        while True:
+            kind = kinds[self.i]
+            if kind == "EOF":
+                return
+            if kind == "Return":
+                # Can only end the program; let block() take it
+                yield from self.block()
+                if kinds[self.i] != "EOF":
+                    raise self.error("end of input")
+                return
+            elif kind in BLOCK_END:
+                raise self.error("a statement")
+            else:
+                yield self.statement(kind)
+
+    # block : ( statement | functionDecl )* ( Return expression ';' )?
+    def block(self) -> List[ast.stmt]:
+        statements = []
+        kinds = self.kinds
+        while True:
+            kind = kinds[self.i]
+            if kind in BLOCK_END:
+                return statements
+            if kind == "Return":
+                first = self.i
+                self.i += 1
+                node = ast.Return(value=self.expression())
+                self.expect("SColon")
+                statements.append(self.located(node, first))
+                return statements
+            statements.append(self.statement(kind))
+
+    # statement : assignment ';' | functionCall ';' | ifStatement | forStatement | whileStatement
+    # (plus functionDecl, which can go wherever a statement can)
+    def statement(self, kind: str) -> ast.stmt:
+        first = self.i
+        if kind == "Identifier":
+            if self.kinds[first + 1] == "Assign":
+                # assignment : Identifier '=' expression
+                name = self.texts[first]
+                self.i += 2
+                target = self.located(ast.Name(id=name, ctx=STORE), first, first)
+                node = ast.Assign(targets=[ target ], value=self.expression())
+                self.expect("SColon")
+                return self.located(node, first)
+            node = self.function_call(kind)
+        elif kind in ("Println", "Print", "Assert", "Size"):
+            node = self.function_call(kind)
+        elif kind == "If":
+            return self.if_statement()
+        elif kind == "For":
+            return self.for_statement()
+        elif kind == "While":
+            return self.while_statement()
+        elif kind == "Def":
+            return self.function_decl()
+        else:
+            raise self.error("a statement")
+
+        self.expect("SColon")
+        if isinstance(node, ast.expr):
+            # A function called for its side effects
+            node = ast.Expr(value=node)
+        return self.located(node, first)
+
+    # ifStatement : ifStat elseIfStat* elseStat? End
+    def if_statement(self) -> ast.If:
+        first = self.i
+        self.i += 1
+        retval = current = self.conditional()
+        while self.kinds[self.i] == "Else":
+            start = self.i
+            self.i += 1
+            if self.kinds[self.i] == "If":
+                self.i += 1
+                node = self.located(self.conditional(), start)
+                current.orelse = [ node ]
+                current = node
+            else:
+                self.expect("Do")
+                current.orelse = self.block()
+                break
+        self.expect("End")
+        return self.located(retval, first)
+
+    # expression Do block, of ifStat and elseIfStat
+    def conditional(self) -> ast.If:
+        test = self.expression()
+        self.expect("Do")
+        return ast.If(test=test, body=self.block(), orelse=[])
+
+    # functionDecl : Def Identifier '(' idList? ')' block End
+    def function_decl(self) -> ast.FunctionDef:
+        first = self.i
+        self.i += 1
+        name = self.expect("Identifier")
+        self.expect("OParen")
+        args = []
+        if self.kinds[self.i] != "CParen":
+            # idList : Identifier ( ',' Identifier )*
+            args.append(self.located(ast.arg(arg=self.expect("Identifier")), self.i - 1))
+            while self.kinds[self.i] == "Comma":
+                self.i += 1
+                args.append(self.located(ast.arg(arg=self.expect("Identifier")), self.i - 1))
+        self.expect("CParen")
+        body = self.block()
+        self.expect("End")
+        return self.located(ast.FunctionDef(name=name,
+                                            args=ast.arguments(posonlyargs=[], args=args, kwonlyargs=[], kw_defaults=[],
+                                                               defaults=[]),
+                                            body=body, decorator_list=[], type_params=[]), first)
+
+    # forStatement : For Identifier '=' expression To expression Do block End
+    def for_statement(self) -> ast.For:
+        first = self.i
+        self.i += 1
+        name = self.expect("Identifier")
+        self.expect("Assign")
+        bounds = self.i
+        start = self.expression()
+        self.expect("To")
+        end = self.expression()
+        # "for a = 0 to 3 do" -> "for a in range(0,3):"
+        rangecall = self.located(ast.Call(func=self.located(ast.Name(id="range", ctx=LOAD), bounds),
+                                          args=[ start, end ], keywords=[]), bounds)
+        self.expect("Do")
+        body = self.block()
+        self.expect("End")
+        return self.located(ast.For(target=self.located(ast.Name(id=name, ctx=STORE), first + 1, first + 1),
+                                    iter=rangecall, body=body, orelse=[]), first)
+
+    # whileStatement : While expression Do block End
+    def while_statement(self) -> ast.While:
+        first = self.i
+        self.i += 1
+        test = self.expression()
+        self.expect("Do")
+        body = self.block()
+        self.expect("End")
+        return self.located(ast.While(test=test, body=body, orelse=[]), first)
+
+    ########################################
+    ## Function calls
+    ##
+
+    # functionCall : Identifier '(' exprList? ')' | (Println | Print | Assert | Size) '(' expression ')'
+    def function_call(self, kind: str) -> ast.AST:
+        first = self.i
+        name = self.texts[first]
+        self.i += 1
+        self.expect("OParen")
+
+        if kind == "Identifier":
+            args = self.expression_list("CParen")
+            self.expect("CParen")
+            return self.located(ast.Call(func=self.located(ast.Name(id=name, ctx=LOAD), first, first), args=args,
+                                         keywords=[]), first)
+
+        start = self.i
+        arg = self.expression()
+        text = "".join(self.texts[start:self.i])
+        end = self.i - 1
+        self.expect("CParen")
+        if kind == "Println":
+            node = ast.Call(func=self.located(ast.Name(id="print", ctx=LOAD), first, first), args=[ arg ], keywords=[])
+        elif kind == "Print":
+            end_arg = self.located(ast.keyword(arg="end", value=self.located(ast.Constant(value=""), first, first)),
+                                   first, first)
+            node = ast.Call(func=self.located(ast.Name(id="print", ctx=LOAD), first, first), args=[ arg ],
+                            keywords=[ end_arg ])
+        elif kind == "Assert":
+            node = ast.Assert(test=arg, msg=self.located(ast.Constant(value=f"Assertion Failure: {text}"), start, end))
+        else:
+            node = ast.Call(func=self.located(ast.Name(id="len", ctx=LOAD), first, first), args=[ arg ], keywords=[])
+        return self.located(node, first)
+
+    # exprList? : ( expression ( ',' expression )* )?, ended by closer
+    def expression_list(self, closer: str) -> List[ast.expr]:
+        if self.kinds[self.i] == closer:
+            return []
+        items = [ self.expression() ]
+        while self.kinds[self.i] == "Comma":
+            self.i += 1
+            items.append(self.expression())
+        return items
+
+    ########################################
+    ## Expressions
+    ##
+
+    def expression(self, precedence: int = 0) -> ast.expr:
+        """Parses an expression, consuming binary operators that bind at least as tightly as precedence."""
+
+        first = self.i
+        left = self.operand()
+        kinds = self.kinds
+        while True:
+            kind = kinds[self.i]
+            p = BINARY_PRECEDENCE.get(kind)
+            if p is None or p < precedence:
+                return left
+            self.i += 1
+            if kind == "Pow":
+                # The one right-associative operator: "2 ^ 3 ^ 2" is "2 ^ (3 ^ 2)"
+                left = self.located(ast.BinOp(left=left, op=POW, right=self.expression(p)), first)
+                continue
+            right = self.expression(p + 1)
+            if kind in BINARY_OPS:
+                left = ast.BinOp(left=left, op=BINARY_OPS[kind], right=right)
+            elif kind in COMPARE_OPS:
+                left = ast.Compare(left=left, ops=[ COMPARE_OPS[kind] ], comparators=[ right ])
+            elif kind == "And":
+                left = ast.BoolOp(op=AND, values=[ left, right ])
+            elif kind == "Or":
+                left = ast.BoolOp(op=OR, values=[ left, right ])
+            else:
+                left = ast.Compare(left=left, ops=[ IN ], comparators=[ right ])
+            self.located(left, first)
+
+    def operand(self) -> ast.expr:
+        """Parses a unary-operator expression or a primary."""
+
+        i = self.i
+        kind = self.kinds[i]
+        text = self.texts[i]
+
+        if kind == "Number":
+            self.i = i + 1
+            return self.located(ast.Constant(value=float(text) if "." in text else int(text)), i)
+        elif kind == "Identifier":
+            next = self.kinds[i + 1]
+            if next == "OParen":
+                return self.function_call(kind)
+            self.i = i + 1
+            if next == "OBracket":
+                # Identifier '[' expression ']'
+                self.i += 1
+                index = self.expression()
+                self.expect("CBracket")
+                return self.located(ast.Subscript(value=self.located(ast.Name(id=text, ctx=LOAD), i, i), slice=index,
+                                                  ctx=LOAD), i)
+            return self.located(ast.Name(id=text, ctx=LOAD), i)
+        elif kind == "String":
+            self.i = i + 1
+            return self.located(ast.Constant(value=text[1:-1]), i)
+        elif kind == "Bool":
+            self.i = i + 1
+            return self.located(ast.Constant(value=self.booleans[text]), i)
+        elif kind == "Null":
+            self.i = i + 1
+            return self.located(ast.Constant(value=None), i)
+        elif kind == "Subtract":
+            self.i = i + 1
+            return self.located(ast.UnaryOp(op=USUB, operand=self.expression(UNARY_PRECEDENCE)), i)
+        elif kind == "Excl":
+            self.i = i + 1
+            return self.located(ast.UnaryOp(op=NOT, operand=self.expression(UNARY_PRECEDENCE)), i)
+        elif kind == "OParen":
+            self.i = i + 1
+            node = self.expression()
+            self.expect("CParen")
+            return self.located(node, i)
+        elif kind == "OBracket":
+            self.i = i + 1
+            items = self.expression_list("CBracket")
+            self.expect("CBracket")
+            self.lists += 1
+            func = self.located(ast.Name(id=MAKE_LIST, ctx=LOAD), i)
+            return self.located(ast.Call(func=func, args=[ self.located(ast.List(elts=items, ctx=LOAD), i) ], keywords=[]), i)
+        elif kind in ("Println", "Print", "Assert", "Size"):
+            return self.function_call(kind)
+        elif kind == "Input":
+            # Input '(' String? ')'
+            self.i = i + 1
+            self.expect("OParen")
+            prompt = ""
+            where = i
+            if self.kinds[self.i] == "String":
+                prompt = self.texts[self.i][1:-1]
+                where = self.i
+                self.i += 1
+            self.expect("CParen")
+            return self.located(ast.Call(func=self.located(ast.Name(id="input", ctx=LOAD), i, i),
+                                         args=[ self.located(ast.Constant(value=prompt), where, where) ], keywords=[]), i)
+        raise self.error("an expression")
+
+class FastParser(LinguisParserBase):
+    """ The hand-written parser, for any language in Languages. """
+
+    engine = "fast"
+
+    def __init__(self, language: Language, trace: Optional[str] = None, memo_size: int = 0,
+                 optimize: bool = False,
+                 inline: bool = True, fast_locals: bool = False, memoize: bool = True,
+                 no_memoize: Iterable[str] = (), numpy_lists: bool = False) -> None:
+        super().__init__(trace=trace, memo_size=memo_size, optimize=optimize, inline=inline,
+                         fast_locals=fast_locals, memoize=memoize, no_memoize=no_memoize,
+                         numpy_lists=numpy_lists)
+        self.language = language
+        self.name = language.name
+        self.logger = logging.getLogger(language.logger_name)
+        self.scanner = scanner_for(language)
+
+    def parse_source(self, code: str, filename: Optional[str] = None) -> ast.Module:
+        """Parses code (read from filename, if it was) into a Python Module node."""
+
+        timings = self.timings
+        with Timings.stage(timings, "lex"):
+            tokens = self.scanner.scan(code, filename)
+        # The AST is built as it parses; there's no parse tree, or visit, of its own
+        with Timings.stage(timings, "parse"):
+            parser = Parser(self.language, code, tokens, filename)
+            body = parser.program()
+        with Timings.stage(timings, "transform"):
+            module = self.transform(ast.Module(body=body, type_ignores=[]), lists=parser.lists > 0)
+        if timings is not None:
+            timings.count("tokens", len(tokens[0]) - 1)
+            timings.count("ast_nodes", Timings.ast_size(module))
+        if self.logger.isEnabledFor(logging.INFO):
+            self.logger.info("Python is:\n%s", ast.unparse(module))
+        if self.trace is not None:
+            # There's no parse tree to dump, so dump the tokens in its place
+            kinds, texts, _ = tokens
+            self.trace.write(filename, "\n".join(f"{k} {t}" for k, t in zip(kinds, texts)), module)
+        return module
+
+    def parse_code(self, code: str) -> ast.Module:
+        return self.parse_source(code)
+
+    def parse_file(self, filename: str) -> ast.Module:
+        with Timings.stage(self.timings, "read"):
+            with open(filename, "rt", encoding="utf-8") as f:
+                code = f.read()
+        return self.parse_source(code, filename)
+
+    def units_from_file(self, filename: str) -> Iterator[ast.Module]:
+        """
+        Parses filename one top-level statement at a time, yielding a Module for each.
+
+        The tokens of the whole file are scanned up front (they take a fraction of the
+        space of the trees built from them); each statement's AST is built only when
+        it's asked for, and nothing keeps it after that. Traces aren't written.
+        """
+
+        with open(filename, "rt", encoding="utf-8") as f:
+            code = f.read()
+        parser = Parser(self.language, code, self.scanner.scan(code, filename), filename)
+        lists = 0
+        for statement in parser.units():
+            module = self.transform(ast.Module(body=[ statement ], type_ignores=[]), whole=False, lists=parser.lists > lists)
+            lists = parser.lists
+            yield module
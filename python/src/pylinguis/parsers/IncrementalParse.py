@@ -0,0 +1,383 @@
+"""
+Incremental re-parsing, for REPLs and editors that re-run a source after every edit.
+
+An IncrementalParse keeps, between edits, every token of the source (along with how
+far past its end the lexer had to look to make it) and the statements of each of its
+top-level units (statements and functionDecls). An edit then re-lexes from the first
+token whose lexing looked at the edited text, only until the new tokens fall back into
+step with the old ones; re-parses from the unit before the first re-lexed token, only
+until a unit ends where one of the old units past the edit began; and splices the new
+units' statements into the Module in place of the old ones. Everything else is reused
+as it was, down to the very same AST nodes (moved along to the lines and columns their
+tokens moved to, if the edit moved them).
+
+For valid code, the Module is the same as a full parse would give. Code with syntax
+errors is recovered from a unit at a time, as units_from_stream() does, rather than
+across the whole block.
+
+The passes the parser was asked for (optimize, fast_locals) work on the whole program,
+and change its nodes in place, so module itself is left as the visitor made it, and
+edit() runs them over a copy of it, as parse() would; that copy and those passes cost
+an edit as much as they cost a full parse. Otherwise, all edit() adds to module is the
+import of what builds its lists (see Runtime), if it has any, in a Module of its own.
+"""
+
+import ast
+import bisect
+import copy
+from operator import attrgetter
+from typing import TYPE_CHECKING, Iterator, List, Optional, Tuple
+
+import antlr4
+
+if TYPE_CHECKING:
+    from .ANTLRSupport import ANTLRParserBase
+
+# How far past its end the lexer looks for all but a few tokens (the '/' of a '/*'
+# that never got closed, say, whose lexer looked all the way to the end of the source)
+NEAR = 4
+
+token_start = attrgetter("start")
+token_stop = attrgetter("stop")
+
+class TrackingInputStream(antlr4.InputStream):
+    """
+    An InputStream that keeps track of the furthest character the lexer has looked at.
+
+    It reads characters straight out of the string, rather than out of the list of code
+    points InputStream makes of it, so that load()ing the edited text costs nothing.
+    """
+
+    __slots__ = ("reach",)
+
+    def _loadString(self) -> None:
+        self._index = 0
+        self._size = len(self.strdata)
+        self.reach = 0
+
+    def load(self, data: str) -> None:
+        self.strdata = data
+        self._loadString()
+
+    def consume(self) -> None:
+        if self._index >= self._size:
+            raise Exception("cannot consume EOF")
+        self._index += 1
+        if self._index > self.reach:
+            self.reach = self._index
+
+    def LA(self, offset: int) -> int:
+        if offset == 0:
+            return 0 # undefined
+        if offset < 0:
+            offset += 1
+        pos = self._index + offset - 1
+        if pos < 0 or pos >= self._size:
+            return antlr4.Token.EOF
+        return ord(self.strdata[pos])
+
+class Unit:
+    """ One top-level statement or functionDecl: how many tokens it spans, and what it visited to. """
+
+    __slots__ = ("size", "body", "lists", "error", "token", "line", "column")
+
+    def __init__(self, size: int, body: List[ast.stmt], lists: int, error: Optional[Exception], token: antlr4.Token) -> None:
+        self.size = size
+        self.body = body
+        # How many list displays there are in body
+        self.lists = lists
+        # What visiting it raised, if anything (and then body is empty)
+        self.error = error
+        # Its first token, and where that was when body was located
+        self.token = token
+        self.line = token.line
+        self.column = token.column
+
+    def follow(self) -> bool:
+        """ Moves body's locations along with the unit's first token, if relex() moved it; returns whether it had. """
+
+        lines, columns = self.token.line - self.line, self.token.column - self.column
+        if not lines and not columns:
+            return False
+        line = self.line
+        for statement in self.body:
+            for node in ast.walk(statement):
+                if "lineno" not in node._attributes:
+                    continue
+                # Only what's on the unit's first line moves across; that's the line the edit ended on
+                if node.lineno == line:
+                    node.col_offset += columns
+                if node.end_lineno == line:
+                    node.end_col_offset += columns
+                node.lineno += lines
+                node.end_lineno += lines
+        self.line, self.column = self.token.line, self.token.column
+        return True
+
+class IncrementalParse:
+    """
+    The parse of one source, kept up to date as it is edited; see the module docstring.
+
+    Unlike parse(), this doesn't raise for code that doesn't parse (so that it can be
+    edited into shape); the errors are in errors, and edit() raises the first of them.
+    It has a lexer and parser of its own, so it doesn't disturb the parser it came from,
+    other than adding to its stats. Traces aren't written.
+    """
+
+    def __init__(self, parser: "ANTLRParserBase", code: str) -> None:
+        self.parser = parser
+        self.code = code
+        self.chars = TrackingInputStream(code)
+        self.lexer = parser.getLexer(self.chars)
+
+        # Every token of code, EOF included, and how far past its end each one's lexer looked
+        self.tokens: List[antlr4.Token] = []
+        self.reach: List[int] = []
+        for token, reach in self.scan(0, 1, 0):
+            token.tokenIndex = len(self.tokens)
+            self.tokens.append(token)
+            self.reach.append(reach)
+        # The tokens (and reach) of those that looked further than NEAR
+        self.far: List[Tuple[antlr4.Token, int]] = \
+            [ (token, reach) for token, reach in zip(self.tokens, self.reach) if reach > NEAR ]
+
+        # The parser reads self.tokens in place, and never asks the lexer for more
+        self.stream = antlr4.CommonTokenStream(self.lexer)
+        self.stream.tokens = self.tokens
+        self.stream.fetchedEOF = True
+        self.stream.index = 0
+        self.antlr_parser = parser.getParser(self.stream)
+        self.visitor = parser.getVisitor()
+
+        self.units: List[Unit] = []
+        self.failures = 0
+        self.lists = 0
+        self.module = ast.Module(body=[], type_ignores=[])
+        self.reparse(0, len(self.tokens), 0, 0)
+
+    @property
+    def errors(self) -> List[Exception]:
+        """ What visiting each of the units that failed raised, in order. """
+        return [ unit.error for unit in self.units if unit.error is not None ] if self.failures else []
+
+    def transformed(self) -> ast.Module:
+        """ The Module a full parse of code would give: module, after the parser's passes, if it has any. """
+
+        parser, lists = self.parser, self.lists > 0
+        if parser.optimize or parser.fast_locals:
+            return parser.transform(copy.deepcopy(self.module), lists=lists)
+        if not lists:
+            return self.module
+        # Only the import goes in, which leaves the statements as they are
+        return parser.transform(ast.Module(body=list(self.module.body), type_ignores=[]), lists=True)
+
+    def edit(self, start: int, end: int, text: str) -> ast.Module:
+        """ Replaces code[start:end] with text, and returns the Module (see transformed()) for the code that makes. """
+
+        if not 0 <= start <= end <= len(self.code):
+            raise ValueError(f"Edit {start}:{end} is outside the code (0:{len(self.code)})")
+
+        self.code = self.code[:start] + text + self.code[end:]
+        self.chars.load(self.code)
+        first, count, delta, resync = self.relex(start, end, len(text))
+        self.reparse(first, count, delta, resync)
+
+        if self.failures:
+            raise self.errors[0]
+        return self.transformed()
+
+    def update(self, code: str) -> ast.Module:
+        """ Brings the parse up to date with code, as a single edit of everything that differs. """
+
+        old = self.code
+        prefix = common_prefix(old, code)
+        suffix = common_suffix(old[prefix:], code[prefix:])
+        return self.edit(prefix, len(old) - suffix, code[prefix:len(code) - suffix])
+
+    def scan(self, pos: int, line: int, column: int) -> Iterator[Tuple[antlr4.Token, int]]:
+        """ Lexes the code from character pos (at line/column), yielding each token and its reach, up to EOF. """
+
+        lexer, chars = self.lexer, self.chars
+        lexer.inputStream = chars       # Resets the lexer
+        chars.seek(pos)
+        lexer.line = line
+        lexer.column = column
+        while True:
+            chars.reach = chars.index
+            token = lexer.nextToken()
+            # Tokens outlive the text they were lexed from, so their text has to go with them
+            token.text = token.text
+            yield token, chars.reach - token.stop
+            if token.type == antlr4.Token.EOF:
+                return
+
+    def relex(self, start: int, end: int, length: int) -> Tuple[int, int, int, int]:
+        """
+        Re-lexes after code[start:end] was replaced with length characters, and splices
+        the new tokens in. Returns the index of the first new token, how many there are,
+        how the number of tokens changed, and the (old) index of the first old one kept
+        after them.
+        """
+
+        tokens, reaches = self.tokens, self.reach
+        delta = length - (end - start)
+
+        # The first token whose lexing looked at the edited text
+        first = bisect.bisect_left(tokens, start - NEAR, key=token_stop)
+        while tokens[first].stop + reaches[first] < start:
+            first += 1
+        for token, reach in self.far:
+            if token.stop + reach >= start and token.start < tokens[first].start:
+                first = bisect.bisect_left(tokens, token.start, key=token_start)
+
+        # Take up where the lexer was after the token before it
+        if first == 0:
+            pos, line, column = 0, 1, 0
+        else:
+            before = tokens[first - 1]
+            pos = before.stop + 1
+            lines = before.text.count("\n")
+            line = before.line + lines
+            column = len(before.text) - before.text.rfind("\n") - 1 if lines else before.column + len(before.text)
+
+        # Lex until a token starts (past the edit) right where an old one did, and is the
+        # same kind; the lexer starts afresh at each token, so from there on the old ones hold
+        resync = bisect.bisect_left(tokens, end, lo=first, key=token_start)
+        new: List[antlr4.Token] = []
+        new_reach: List[int] = []
+        for token, reach in self.scan(pos, line, column):
+            if token.start >= start + length:
+                while tokens[resync].start + delta < token.start:
+                    resync += 1
+                old = tokens[resync]
+                if old.start + delta == token.start and old.type == token.type:
+                    break
+            new.append(token)
+            new_reach.append(reach)
+
+        if self.far:
+            gone = set(map(id, tokens[first:resync]))
+            self.far = [ (t, r) for t, r in self.far if id(t) not in gone ]
+        self.far.extend((t, r) for t, r in zip(new, new_reach) if r > NEAR)
+
+        tokens[first:resync] = new
+        reaches[first:resync] = new_reach
+        shift = len(new) - (resync - first)
+
+        # Move the old tokens after the new ones along to where they are now
+        lines, columns, on_line = token.line - old.line, token.column - old.column, old.line
+        for idx in range(first, first + len(new)):
+            tokens[idx].tokenIndex = idx
+        # (One pass per field that changed: the common edits change only one or two)
+        tail = tokens[first + len(new):]
+        if delta:
+            for t in tail:
+                t.start += delta
+                t.stop += delta
+        if shift:
+            for idx, t in enumerate(tail, first + len(new)):
+                t.tokenIndex = idx
+        if columns:
+            for t in tail:
+                if t.line != on_line:
+                    break
+                t.column += columns
+        if lines:
+            for t in tail:
+                t.line += lines
+
+        return first, len(new), shift, resync
+
+    def reparse(self, first: int, count: int, shift: int, resync: int) -> None:
+        """
+        Re-parses after relex() replaced count tokens from first, and splices the new units'
+        statements into module. shift and resync are as relex() returns them.
+        """
+
+        units = self.units
+
+        # Start at the unit holding the token before the first new one
+        target = max(first - 1, 0)
+        u = 0               # The unit
+        start = 0           # Its first token
+        body = 0            # Its first statement
+        while u < len(units) and start + units[u].size <= target:
+            start += units[u].size
+            body += len(units[u].body)
+            u += 1
+
+        # Parse units until one ends where an old one past the new tokens began
+        stream, parser = self.stream, self.antlr_parser
+        parser.reset()
+        stream.seek(start)
+        first_unit, old_start, old_statements, old_failures, old_lists = u, start, 0, 0, 0
+        new_units: List[Unit] = []
+        while stream.LA(1) != antlr4.Token.EOF:
+            new_units.append(self.parse_unit())
+            pos = stream.index
+            if pos < first + count:
+                continue
+            while u < len(units) and (old_start < resync or old_start + shift < pos):
+                old_start += units[u].size
+                old_statements += len(units[u].body)
+                old_failures += units[u].error is not None
+                old_lists += units[u].lists
+                u += 1
+            if u < len(units) and old_start + shift == pos:
+                break
+        else:
+            for unit in units[u:]:
+                old_statements += len(unit.body)
+                old_failures += unit.error is not None
+                old_lists += unit.lists
+            u = len(units)
+
+        units[first_unit:u] = new_units
+        # The old units after the new ones are where their tokens are now; once one hasn't moved, none after it has
+        for unit in units[first_unit + len(new_units):]:
+            if not unit.follow():
+                break
+        self.module.body[body:body + old_statements] = [ node for unit in new_units for node in unit.body ]
+        self.failures += sum(unit.error is not None for unit in new_units) - old_failures
+        self.lists += sum(unit.lists for unit in new_units) - old_lists
+
+    def parse_unit(self) -> Unit:
+        """ Parses the unit at the current token. """
+
+        start, lists = self.stream.index, self.visitor.lists
+        try:
+            body = self.parser.parse_unit(self.antlr_parser, self.visitor)
+            error = None
+        except Exception as e:
+            # The visitor has no patience for error-recovered trees; keep going, so
+            # that we're ready for the edit that fixes this one
+            body, error = [], e
+            if self.stream.index == start:
+                self.stream.consume()
+        lists = self.visitor.lists - lists if error is None else 0
+        return Unit(self.stream.index - start, body, lists, error, self.tokens[start])
+
+def common_prefix(a: str, b: str) -> int:
+    """ How many characters a and b start with in common. """
+
+    # Comparing slices runs at C speed; a loop over characters wouldn't
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+def common_suffix(a: str, b: str) -> int:
+    """ How many characters a and b end with in common. """
+
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[len(a) - mid:] == b[len(b) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
@@ -0,0 +1,269 @@
+"""
+Inlining small functions at their call sites, as part of the Optimizer.
+
+Linguis programs are full of little helpers:
+
+    def squared(n)
+      return n*n;
+    end
+
+and every call to one pays for a Python function call. inline() replaces calls to
+such functions with their bodies' expressions, the arguments substituted for the
+parameters: `squared(x + 1)` becomes `(x + 1) * (x + 1)`, which the Optimizer can then
+go on to fold when x is a constant.
+
+A function is inlined if it's defined at the top level, its name is never assigned
+anything else there, and its body is a few assignments to locals (each assigned once)
+and then a return, which substituting the locals into the return turns into one
+expression of at most MAX_BODY_NODES nodes, calling nothing that (by now) calls the
+function itself. A call is only inlined if it passes exactly the function's parameters,
+positionally, and isn't somewhere that has a local by the name of the function or of
+any global its body reads.
+
+No temporaries are introduced (in CPython, binding one with := and throwing away a
+tuple costs more than the call saved), so an argument (or a local's value) is only
+substituted where that can't change what happens, or in what order:
+
+  * names and constants, which can be read again at any time, go anywhere;
+  * anything else must be used, unconditionally (not on the right of a && or ||), and
+    before the expression does anything else, in the order the arguments were given;
+    just as a call would have evaluated them;
+  * and can only be used more than once if it's plain arithmetic on names and constants
+    of at most MAX_DUPLICATED_NODES nodes, which comes to the same every time.
+
+Inlining repeats, up to MAX_ROUNDS times, folding constants in between, so that
+helpers of helpers are inlined too.
+The functions themselves are kept, since the program may still call them by name.
+"""
+
+import ast
+import copy
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from . import Optimizer
+
+# The most nodes a function's expression may have, to be inlined
+MAX_BODY_NODES = 40
+# The most nodes an argument may have, to be substituted more than once
+MAX_DUPLICATED_NODES = 6
+# Inline at most this many times over
+MAX_ROUNDS = 3
+
+class Unsupported(Exception):
+    """ An expression with something in it we don't reason about. """
+
+class Inlinable:
+    """ A function we can inline: its parameters, its expression, and the globals it reads. """
+
+    def __init__(self, name: str, params: List[str], expression: ast.expr) -> None:
+        self.name = name
+        self.params = params
+        # A copy: inlining goes on inside the function itself as well
+        self.expression = copy.deepcopy(expression)
+        self.globals = { n.id for n in ast.walk(expression) if isinstance(n, ast.Name) } - set(params)
+
+def size(node: ast.AST) -> int:
+    return sum(1 for _ in ast.walk(node))
+
+def trivial(node: ast.expr) -> bool:
+    return isinstance(node, (ast.Name, ast.Constant))
+
+def arithmetic(node: ast.expr) -> bool:
+    """ Whether node is only arithmetic on names and constants. """
+
+    return all(isinstance(n, (ast.Name, ast.Constant, ast.BinOp, ast.UnaryOp, ast.Load, ast.operator, ast.unaryop))
+               for n in ast.walk(node))
+
+def evaluation(node: ast.expr, conditional: bool, events: List[Optional[Tuple[str, bool]]]) -> None:
+    """
+    Lists what evaluating node does, in the order it does it: (name, conditional) for
+    reading a name (conditional if it might not be read at all), None for anything else.
+    Raises Unsupported for expressions other than the few the visitors build.
+    """
+
+    if isinstance(node, ast.Name):
+        events.append((node.id, conditional))
+        return
+    if isinstance(node, ast.Constant):
+        return
+    if isinstance(node, ast.BoolOp):
+        evaluation(node.values[0], conditional, events)
+        events.append(None)
+        for value in node.values[1:]:
+            evaluation(value, True, events)
+        return
+    if isinstance(node, ast.IfExp):
+        evaluation(node.test, conditional, events)
+        events.append(None)
+        evaluation(node.body, True, events)
+        evaluation(node.orelse, True, events)
+        return
+    if isinstance(node, ast.Compare):
+        evaluation(node.left, conditional, events)
+        for idx, comparator in enumerate(node.comparators):
+            # Chained comparisons stop at the first that's false
+            evaluation(comparator, conditional or idx > 0, events)
+            events.append(None)
+        return
+
+    if isinstance(node, ast.BinOp):
+        children: Iterable[ast.expr] = (node.left, node.right)
+    elif isinstance(node, ast.UnaryOp):
+        children = (node.operand,)
+    elif isinstance(node, ast.Call) and not node.keywords and not any(isinstance(a, ast.Starred) for a in node.args):
+        children = (node.func, *node.args)
+    elif isinstance(node, ast.Subscript) and not isinstance(node.slice, ast.Slice):
+        children = (node.value, node.slice)
+    elif isinstance(node, (ast.List, ast.Tuple)) and not any(isinstance(e, ast.Starred) for e in node.elts):
+        children = node.elts
+    else:
+        raise Unsupported(type(node).__name__)
+    for child in children:
+        evaluation(child, conditional, events)
+    events.append(None)
+
+def substitute(expression: ast.expr, bindings: List[Tuple[str, ast.expr]]) -> Optional[ast.expr]:
+    """
+    expression with the names in bindings replaced by their values (copies of them), or
+    None if that might change what it does; see the module docstring.
+    """
+
+    try:
+        events: List[Optional[Tuple[str, bool]]] = []
+        evaluation(expression, False, events)
+    except Unsupported:
+        return None
+
+    values = dict(bindings)
+    uses: Dict[str, int] = {}
+    for event in events:
+        if event is not None and event[0] in values:
+            uses[event[0]] = uses.get(event[0], 0) + 1
+
+    # The ones that have to be evaluated when and as often as a call would have
+    pending = [ name for name, value in bindings if not trivial(value) ]
+    for name in pending:
+        if name not in uses:
+            return None
+        if uses[name] > 1 and not (arithmetic(values[name]) and size(values[name]) <= MAX_DUPLICATED_NODES):
+            return None
+    for event in events:
+        if not pending:
+            break
+        if event is None or event[1]:
+            # Something else happens first, or the next one might never be evaluated
+            return None
+        if event[0] == pending[0]:
+            pending.pop(0)
+        elif event[0] in pending:
+            return None
+
+    class Substituter(ast.NodeTransformer):
+        def visit_Name(self, node: ast.Name) -> ast.expr:
+            value = values.get(node.id)
+            return node if value is None else copy.deepcopy(value)
+
+    return Substituter().visit(copy.deepcopy(expression))
+
+def inlinable(function: ast.FunctionDef) -> Optional[Inlinable]:
+    """ function as an Inlinable, if it can be inlined. """
+
+    args = function.args
+    if function.decorator_list or args.posonlyargs or args.vararg or args.kwonlyargs or args.kwarg or args.defaults:
+        return None
+    if not function.body or not isinstance(function.body[-1], ast.Return) or function.body[-1].value is None:
+        return None
+
+    params = [ arg.arg for arg in args.args ]
+    assignments = function.body[:-1]
+    locals_ = Optimizer.stored_names(function.body)
+    for statement in assignments:
+        if not (isinstance(statement, ast.Assign) and len(statement.targets) == 1
+                and isinstance(statement.targets[0], ast.Name)):
+            return None
+        if locals_[statement.targets[0].id] != 1 or statement.targets[0].id in params:
+            return None
+
+    # Substitute the locals into the return, last first; each is like a parameter of what follows it
+    expression = function.body[-1].value
+    for statement in reversed(assignments):
+        expression = substitute(expression, [ (statement.targets[0].id, statement.value) ])
+        if expression is None:
+            return None
+
+    if size(expression) > MAX_BODY_NODES:
+        return None
+    inlined = Inlinable(function.name, params, expression)
+    if function.name in inlined.globals:
+        return None     # Recursive
+    return inlined
+
+def inlinables(module: ast.Module) -> Dict[str, Inlinable]:
+    """ The functions of module that can be inlined, by name. """
+
+    stores = Optimizer.stored_names(module.body)
+    found = {}
+    for statement in module.body:
+        if isinstance(statement, ast.FunctionDef) and stores.get(statement.name) == 1:
+            function = inlinable(statement)
+            if function is not None:
+                found[function.name] = function
+    return found
+
+class Inliner(ast.NodeTransformer):
+    """ Inlines calls to the functions in functions, wherever that's safe. """
+
+    def __init__(self, functions: Dict[str, Inlinable]) -> None:
+        self.functions = functions
+        # The locals of the function we're in, if we're in one
+        self.scope: Set[str] = set()
+        self.count = 0
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+        # A function nested in another sees the other's locals too
+        outer = self.scope
+        self.scope = outer | set(Optimizer.stored_names(node.body)) | { arg.arg for arg in node.args.args }
+        self.generic_visit(node)
+        self.scope = outer
+        return node
+
+    def visit_Lambda(self, node: ast.Lambda) -> ast.AST:
+        return node
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        # Arguments first, so that helpers of helpers come out inside out
+        self.generic_visit(node)
+        if not isinstance(node.func, ast.Name) or node.func.id not in self.functions:
+            return node
+        function = self.functions[node.func.id]
+        if node.keywords or len(node.args) != len(function.params) or any(isinstance(a, ast.Starred) for a in node.args):
+            return node
+        if node.func.id in self.scope or function.globals & self.scope:
+            return node
+
+        inlined = substitute(function.expression, list(zip(function.params, node.args)))
+        if inlined is None:
+            return node
+        self.count += 1
+        # Whatever it raises, it raises from here
+        for child in ast.walk(inlined):
+            if "lineno" in child._attributes:
+                ast.copy_location(child, node)
+        return inlined
+
+def inline(module: ast.Module) -> int:
+    """ Inlines what calls in module can be (see the module docstring), in place; returns how many were. """
+
+    count = 0
+    for _ in range(MAX_ROUNDS):
+        functions = inlinables(module)
+        if not functions:
+            break
+        inliner = Inliner(functions)
+        inliner.visit(module)
+        if not inliner.count:
+            break
+        count += inliner.count
+        # squared(squared(2)) is squared(2 * 2) now; make that squared(4), which can be inlined again
+        Optimizer.fold(module)
+    return count
@@ -0,0 +1,69 @@
+"""
+The per-language tables for Linguis: everything that differs between one natural
+language's Linguis and another's.
+
+Every language shares the one parser grammar (syntax/LinguisParser.g4); only the
+lexer's keywords and boolean literals change. So a language is nothing more than
+a Language entry here, plus (for the ANTLR engine) the lexer/parser that ANTLR
+generates from its syntax/Linguis*Lexer.g4. Keep the keyword tables in step with
+those lexer grammars.
+"""
+
+from typing import Dict
+
+# The tokens that every language spells the same way: lexer token name -> its text
+SYMBOLS = {
+    "Or": "||", "And": "&&", "Equals": "==", "NEquals": "!=", "GTEquals": ">=", "LTEquals": "<=",
+    "Pow": "^", "Excl": "!", "GT": ">", "LT": "<", "Add": "+", "Subtract": "-", "Multiply": "*",
+    "Divide": "/", "Modulus": "%", "OBrace": "{", "CBrace": "}", "OBracket": "[", "CBracket": "]",
+    "OParen": "(", "CParen": ")", "SColon": ";", "Assign": "=", "Comma": ",", "QMark": "?", "Colon": ":",
+}
+
+class Language:
+    """ The keywords and boolean literals of one language's Linguis. """
+
+    def __init__(self, name: str, package: str, keywords: Dict[str, str], booleans: Dict[str, bool]) -> None:
+        # The name parsers for this language are registered under (a la "en-us")
+        self.name = name
+        # The subpackage of pylinguis.parsers that holds its generated ANTLR code
+        self.package = package
+        # Lexer token name (a la "Println") -> the word that spells it
+        self.keywords = keywords
+        # Boolean literal -> its value
+        self.booleans = booleans
+
+    @property
+    def logger_name(self) -> str:
+        return f"parsers.{self.package}"
+
+    def __repr__(self) -> str:
+        return f"Language({self.name!r})"
+
+ENUS = Language("en-us", "enus",
+    keywords = {
+        "Println": "println", "Print": "print", "Input": "input", "Assert": "assert",
+        "Size": "size", "Def": "def", "If": "if", "Else": "else", "Return": "return",
+        "For": "for", "While": "while", "To": "to", "Do": "do", "End": "end",
+        "In": "in", "Null": "null",
+    },
+    booleans = { "true": True, "false": False })
+
+ENPL = Language("en-pl", "enpl",
+    keywords = {
+        "Println": "intlnpray", "Print": "intpray", "Input": "inputway", "Assert": "assertway",
+        "Size": "izesay", "Def": "efday", "If": "ifway", "Else": "elseway", "Return": "eturnray",
+        "For": "orfay", "While": "ilewhay", "To": "otay", "Do": "oday", "End": "endway",
+        "In": "inway", "Null": "ullnay",
+    },
+    booleans = { "uetray": True, "alsefay": False })
+
+FR = Language("fr", "fr",
+    keywords = {
+        "Println": "imprimerdb", "Print": "imprimer", "Input": "saisir", "Assert": "affirmer",
+        "Size": "taille", "Def": "définir", "If": "si", "Else": "autre", "Return": "retour",
+        "For": "pour", "While": "alors", "To": "to", "Do": "à", "End": "fin",
+        "In": "dans", "Null": "nulle",
+    },
+    booleans = { "vrai": True, "faux": False })
+
+languages: Dict[str, Language] = { lang.name: lang for lang in [ ENUS, ENPL, FR ] }
@@ -1,23 +1,147 @@
 import ast
-from typing import Any, Dict, List
+import hashlib
+import pickle
+from types import CodeType
+from typing import Any, Dict, Hashable, Iterable, Iterator, List, Optional
+
+from . import FastLocals, Inliner, Memoize, NumericList, Optimizer, TailCalls
+from .Diagnostics import Trace
+from .LRUCache import LRUCache
+from .Runtime import BUILTINS, RuntimeContext, import_lists
+from .Timings import FileTimings
 
 class LinguisParserBase:
-    """ A base class for parsers for Linguis. """
-    def __init__(self) -> None:
-        pass
+    """
+    A base class for parsers for Linguis.
+
+    With memo_size > 0, parse() and compile_code() remember the results for the last
+    memo_size sources they saw (see memo for its hit/miss counts). Cached modules are
+    kept pickled, and every hit unpickles a fresh copy (several times quicker than
+    copy.deepcopy), so callers are free to mutate what they get back.
+
+    With optimize on, the Python AST goes through the Optimizer pass before it's handed
+    back (or compiled): small functions inlined (unless inline is off; see Inliner),
+    constants folded and propagated, dead branches pruned, self tail calls turned into
+    loops (see TailCalls), and pure functions that recurse or loop memoized (unless
+    memoize is off, or they're named in no_memoize; see Memoize). With numpy_lists on,
+    lists of numbers are kept in NumPy arrays (see NumericList). With fast_locals on,
+    the program's top level is wrapped in a function (see FastLocals).
+
+    With a FileTimings set as timings, parsing times each stage of it (reading, lexing,
+    parsing, visiting, the passes) into that; see Timings.
+    """
+
+    # The name the parser is registered under (a la "en-us")
+    name = ""
+
+    # The front end that does the parsing (see find_parser)
+    engine = ""
+
+    def __init__(self, trace: Optional[str] = None, memo_size: int = 0, optimize: bool = False,
+                 inline: bool = True, fast_locals: bool = False, memoize: bool = True,
+                 no_memoize: Iterable[str] = (), numpy_lists: bool = False) -> None:
+        # Diagnostic dumps are only ever rendered when a trace directory is given
+        self.trace = Trace(trace) if trace else None
+        self.memo = LRUCache(memo_size) if memo_size > 0 else None
+        self.optimize = optimize
+        self.inline = inline
+        self.fast_locals = fast_locals
+        self.memoize = memoize
+        self.no_memoize = frozenset(no_memoize)
+        self.numpy_lists = numpy_lists
+        self._runtime: Optional[RuntimeContext] = None
+        self.timings: Optional[FileTimings] = None
 
     def builtins(self) -> Dict[str, Any]:
         """ Returns a dictionary of built-in functions available in this parser's environment. """
-        return { }
+        return dict(BUILTINS)
 
-    def parse(self, code: str) -> ast.Module:
-        """ Parses the entire code into a Python Module node. """
+    @property
+    def runtime(self) -> RuntimeContext:
+        """ The namespace template (built from builtins(), on first use) this parser's programs run in. """
+
+        if self._runtime is None:
+            self._runtime = RuntimeContext(self.builtins())
+        return self._runtime
+
+    def transform(self, module: ast.Module, whole: bool = True, lists: bool = False) -> ast.Module:
+        """
+        Runs the passes this parser was asked for (optimize, inline, memoize, numpy_lists,
+        fast_locals) over module. Only a whole program can have its functions inlined or memoized, its
+        constants propagated or its top level wrapped; a part of one (whole=False) is only folded
+        and pruned. If module has list displays in it (lists), it's made to import what they
+        call: LinguisList, or with numpy_lists, NumericList.make_list().
+        """
+
+        if self.optimize and whole:
+            if self.inline:
+                Inliner.inline(module)
+            module = Optimizer.optimize(module)
+            TailCalls.eliminate(module)
+            if self.memoize:
+                Memoize.memoize(module, self.no_memoize)
+        elif self.optimize:
+            module = Optimizer.fold(module)
+        if lists:
+            if self.numpy_lists:
+                NumericList.import_make_list(module)
+            else:
+                import_lists(module)
+        if self.fast_locals and whole:
+            module = FastLocals.wrap(module)
+        return module
+
+    def parse_code(self, code: str) -> ast.Module:
+        """ Parses the entire code into a Python Module node, every time; parse() memoizes it. """
 
         # For simplicity, this is a stub implementation.
         # A real parser would tokenize and parse the input properly.
         raise Exception("E_NOTIMPL")
-    
+
     def parse_file(self, filename: str) -> ast.Module:
         """ Takes  file and dumps its contents into self.parse()"""
 
         raise Exception("E_NOTIMPL")
+
+    def units_from_file(self, filename: str) -> Iterator[ast.Module]:
+        """
+        Parses filename one top-level statement or function at a time, yielding a Module
+        for each as it goes, so that the caller can run each before the next is parsed.
+
+        Parsers that can't do any better yield the whole file as one Module.
+        """
+
+        yield self.parse_file(filename)
+
+    def memo_key(self, code: str, *parts: str) -> Hashable:
+        """The memo key for code as read by this parser; parts tell apart different products of it."""
+
+        return (self.name, hashlib.sha256(code.encode()).digest(), *parts)
+
+    def parse(self, code: str) -> ast.Module:
+        """ Parses the entire code into a Python Module node. """
+
+        # Traces are written as a side effect of parsing, so tracing always parses
+        if self.memo is None or self.trace is not None:
+            return self.parse_code(code)
+
+        key = self.memo_key(code)
+        snapshot = self.memo.get(key)
+        if snapshot is None:
+            module = self.parse_code(code)
+            self.memo.put(key, pickle.dumps(module, protocol=pickle.HIGHEST_PROTOCOL))
+            return module
+        return pickle.loads(snapshot)
+
+    def compile_code(self, code: str, filename: str = "<linguis>") -> CodeType:
+        """Parses and compiles code, ready to exec(); code objects are immutable, so hits are shared."""
+
+        if self.memo is None or self.trace is not None:
+            return compile(self.parse(code), filename=filename, mode="exec")
+
+        key = self.memo_key(code, filename)
+        compiled = self.memo.get(key)
+        if compiled is None:
+            compiled = compile(self.parse_code(code), filename=filename, mode="exec")
+            self.memo.put(key, compiled)
+        return compiled
@@ -0,0 +1,220 @@
+"""
+Memoizing pure functions, as part of the Optimizer.
+
+Naive recursion, as Linguis programs are apt to write it,
+
+    def fib(n)
+      if n < 2 do
+        return n;
+      end
+      return fib(n-1) + fib(n-2);
+    end
+
+takes exponential time, working out the same calls over and over. memoize() finds the
+functions that are pure, whose result depends on nothing but their arguments, and
+wraps each in memoized(), which remembers what it returned for each set of arguments,
+so that fib(n) takes n calls rather than some 1.6^n.
+
+A function is pure if it's defined at the top level (and its name is never assigned
+anything else there), and its body
+
+  * prints nothing, reads no input and asserts nothing;
+  * reads no names but its own parameters and locals, the functions len and range, and
+    other pure functions;
+  * calls nothing but those functions, by name;
+  * assigns nothing to a subscript (which might be a list it was passed, or that some
+    other caller holds on to), and defines no functions of its own.
+
+Of those, only the ones that could be worth it are memoized: those that call
+themselves (directly or through other pure functions), and those with a loop in them.
+A function that does a little arithmetic once costs less to run again than to look up.
+
+memoized() keeps at most MAX_ENTRIES results per function, forgetting the oldest first.
+It only keeps results that are numbers, strings, booleans or null; a list could be
+changed by whoever it's returned to, so a function that returns one is called every
+time (and, being pure, builds it afresh every time). Calls with a list among their
+arguments, which can't be looked up, are passed straight on, too. Arguments are told
+apart by type as well as value, since 1, 1.0 and true are all equal.
+
+A memoized function takes an extra frame per call, so a program that recurses
+(non-memoized) nearly as deep as Python allows may find it can't; pass a function's
+name in no_memoize to leave it as it is. Each memoized function's cache_info() gives
+its hits, misses and size; and memos() finds those of a namespace a program ran in.
+"""
+
+import ast
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Set
+
+from . import Optimizer
+from .Runtime import MAKE_LIST
+
+# The most results memoized() keeps for any one function
+MAX_ENTRIES = 4096
+
+# What generated code calls memoized() by (it imports it, so it runs in any namespace)
+MEMOIZED = "__linguis_memoized__"
+
+# Where memoized() records the functions it wraps, in their globals
+MEMOS = "__linguis_memos__"
+
+# The builtins a pure function may call (and what builds its lists)
+PURE_BUILTINS = frozenset([ "len", "range", MAKE_LIST ])
+
+# The results that can't change once they're cached
+IMMUTABLE = frozenset([ int, float, str, bool, type(None) ])
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+# memoized()'s wrapper, written out for the function's parameters (a0, a1, ...): taking
+# them as *args, and building the key with map(), would make a hit several times slower
+WRAPPER = """
+def wrap(function, cache, immutable, maxsize):
+    hits = misses = 0
+
+    def wrapper({params}):
+        nonlocal hits, misses
+        key = ({key})
+        try:
+            result = cache[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable: a list among the arguments
+            misses += 1
+            return function({params})
+        else:
+            hits += 1
+            return result
+        misses += 1
+        result = function({params})
+        if type(result) in immutable:
+            if len(cache) >= maxsize:
+                del cache[next(iter(cache))]
+            cache[key] = result
+        return result
+
+    def cache_info():
+        return hits, misses
+
+    def cache_clear():
+        nonlocal hits, misses
+        cache.clear()
+        hits = misses = 0
+
+    return wrapper, cache_info, cache_clear
+"""
+
+def memoized(function: Callable[..., Any]) -> Callable[..., Any]:
+    """ function, remembering what it returns; see the module docstring. """
+
+    params = [ f"a{i}" for i in range(function.__code__.co_argcount) ]
+    # The arguments, and then their types
+    key = "".join(f"{param}, " for param in params) + "".join(f"type({param}), " for param in params)
+    namespace: Dict[str, Any] = {}
+    exec(WRAPPER.format(params=", ".join(params), key=key), namespace)
+    cache: Dict[Any, Any] = {}
+    wrapper, counts, cache_clear = namespace["wrap"](function, cache, IMMUTABLE, MAX_ENTRIES)
+
+    def cache_info() -> CacheInfo:
+        return CacheInfo(*counts(), MAX_ENTRIES, len(cache))
+
+    wrapper.__name__ = function.__name__
+    wrapper.__qualname__ = function.__qualname__
+    wrapper.__wrapped__ = function
+    wrapper.cache_info = cache_info
+    wrapper.cache_clear = cache_clear
+    function.__globals__.setdefault(MEMOS, {})[function.__name__] = wrapper
+    return wrapper
+
+def memos(namespace: Dict[str, Any]) -> Dict[str, CacheInfo]:
+    """ The cache_info() of each function memoized in the program that ran in namespace, by name. """
+    return { name: wrapper.cache_info() for name, wrapper in namespace.get(MEMOS, {}).items() }
+
+def global_reads(function: ast.FunctionDef) -> Set[str]:
+    """ The globals function reads, if it might be pure (see the module docstring); raises ValueError if it isn't. """
+
+    args = function.args
+    if function.decorator_list or args.posonlyargs or args.vararg or args.kwonlyargs or args.kwarg or args.defaults:
+        raise ValueError("signature")
+    own = set(Optimizer.stored_names(function.body)) | { arg.arg for arg in args.args }
+    called: Set[str] = set()
+    for statement in function.body:
+        for node in ast.walk(statement):
+            if isinstance(node, (ast.Assert, ast.Global, ast.Nonlocal, ast.FunctionDef, ast.AsyncFunctionDef,
+                                 ast.Lambda, ast.ClassDef, ast.Attribute, ast.Await, ast.Yield, ast.YieldFrom)):
+                raise ValueError(type(node).__name__)
+            if isinstance(node, ast.Subscript) and not isinstance(node.ctx, ast.Load):
+                raise ValueError("subscript store")
+            if isinstance(node, ast.Call) and not isinstance(node.func, ast.Name):
+                raise ValueError("call")
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load) and node.id not in own:
+                # A global: fine if it's a function we can vouch for, which is checked later
+                called.add(node.id)
+    return called
+
+def pure_functions(module: ast.Module) -> Dict[str, ast.FunctionDef]:
+    """ The top-level functions of module that are pure (see the module docstring), by name. """
+
+    stores = Optimizer.stored_names(module.body)
+    candidates: Dict[str, ast.FunctionDef] = {}
+    globals_: Dict[str, Set[str]] = {}
+    for statement in module.body:
+        if isinstance(statement, ast.FunctionDef) and stores.get(statement.name) == 1:
+            try:
+                globals_[statement.name] = global_reads(statement) - PURE_BUILTINS
+            except ValueError:
+                continue
+            candidates[statement.name] = statement
+    for name in PURE_BUILTINS:
+        if name in stores:
+            # The program has its own len or range, which we know nothing about
+            return {}
+
+    # Strike out those that use anything that isn't pure, until there are none left to strike
+    pure = set(candidates)
+    changed = True
+    while changed:
+        changed = False
+        for name in list(pure):
+            if not globals_[name] <= pure:
+                pure.discard(name)
+                changed = True
+    return { name: candidates[name] for name in candidates if name in pure }
+
+def worthwhile(function: ast.FunctionDef, pure: Dict[str, ast.FunctionDef], globals_: Dict[str, Set[str]]) -> bool:
+    """ Whether function recurses (through pure functions) or loops; see the module docstring. """
+
+    if any(isinstance(node, (ast.For, ast.While)) for statement in function.body for node in ast.walk(statement)):
+        return True
+    seen: Set[str] = set()
+    pending = list(globals_[function.name])
+    while pending:
+        name = pending.pop()
+        if name == function.name:
+            return True
+        if name in seen or name not in pure:
+            continue
+        seen.add(name)
+        pending.extend(globals_[name])
+    return False
+
+def memoize(module: ast.Module, exclude: Iterable[str] = ()) -> List[str]:
+    """ Memoizes module's pure functions that are worth it, but for those in exclude, in place; returns their names. """
+
+    pure = pure_functions(module)
+    globals_ = { name: global_reads(function) for name, function in pure.items() }
+    skipped = set(exclude)
+    names = [ name for name, function in pure.items() if name not in skipped and worthwhile(function, pure, globals_) ]
+    if not names:
+        return names
+    for name in names:
+        function = pure[name]
+        function.decorator_list.append(ast.copy_location(ast.Name(id=MEMOIZED, ctx=ast.Load()), function))
+    first = module.body[0]
+    alias = ast.copy_location(ast.alias(name="memoized", asname=MEMOIZED), first)
+    module.body.insert(0, ast.copy_location(ast.ImportFrom(module=__name__, names=[ alias ], level=0), first))
+    return names
@@ -0,0 +1,194 @@
+"""
+NumPy-backed lists, for programs that build large lists of numbers.
+
+A Linguis list is a Python list (a LinguisList), which holds a pointer to a boxed int
+or float object for each element: 8 bytes for the pointer, and 24 or more for the
+object. With numpy_lists on, each list display the program builds goes through
+make_list(), which makes one whose elements are all ints (that fit in 64 bits) or all
+floats a NumericList, holding them in a NumPy array, 8 bytes apiece, side by side. Any
+other list (empty, mixed, or of strings, booleans or lists) is a LinguisList, as before.
+
+A NumericList behaves exactly as the LinguisList would, so that turning numpy_lists on
+never changes what a program computes: size() is its length, subscripting it gives back
+a Python int or float, it prints as the list does, `in` looks through it, it compares
+(==, <, ...) as the list would, and it's == to a list (or NumericList) with equal
+elements, in the same order. It has Linguis's list operators (see Runtime), done by
+NumPy over the whole array at once: `list + x` appends and `list + list` concatenates,
+`list - x` takes out every element equal to x (or to one of a list's), and `list * n`
+repeats; whatever a LinguisList rejects (`list * 1.5`, `x - list`, an index out of
+range) raises just what it would have. (Linguis has no way to change a list once it's
+built, so neither does a NumericList.)
+
+Appending or concatenating anything that doesn't fit its array's type (ints with
+floats, strings, lists) gives an array of Python objects, so the elements come back as
+they went in.
+
+NumPy is optional: without it, make_list() always hands back the Python list.
+"""
+
+import ast
+import operator
+from typing import Any, Callable, List, Union
+
+from .Runtime import LinguisList, elements, import_lists, removed
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# The range of ints an int64 array can hold
+INT64_MIN = -2 ** 63
+INT64_MAX = 2 ** 63 - 1
+
+def available() -> bool:
+    """ Whether NumPy is installed, so that make_list() can make NumericLists at all. """
+    return numpy is not None
+
+def array_of(values: List[Any]) -> Any:
+    """ values as an int64 or float64 array, if they're all ints or all floats (and there are some), else None. """
+
+    if not values or numpy is None:
+        return None
+    kinds = set(map(type, values))
+    if kinds == { int }:
+        if min(values) >= INT64_MIN and max(values) <= INT64_MAX:
+            return numpy.array(values, dtype=numpy.int64)
+    elif kinds == { float }:
+        return numpy.array(values, dtype=numpy.float64)
+    return None
+
+def make_list(values: List[Any]) -> Union["NumericList", LinguisList]:
+    """ values as a NumericList, if they're all ints or all floats, else a LinguisList; see the module docstring. """
+
+    array = array_of(values)
+    return LinguisList(values) if array is None else NumericList(array)
+
+class NumericList:
+    """ A Linguis list of numbers in a NumPy array; see the module docstring. """
+
+    __slots__ = ("items",)
+
+    def __init__(self, items: Any) -> None:
+        self.items = items
+
+    def tolist(self) -> List[Any]:
+        return self.items.tolist()
+
+    def aslist(self) -> LinguisList:
+        """ The LinguisList this stands in for. """
+        return LinguisList(self.items.tolist())
+
+    def exactly(self, value: Any) -> bool:
+        """ Whether NumPy compares value with the elements exactly as Python would: ints with ints, floats with floats. """
+
+        kind = self.items.dtype.kind
+        return (kind == "i" and type(value) is int and INT64_MIN <= value <= INT64_MAX) or (kind == "f" and type(value) is float)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __getitem__(self, index: int) -> Any:
+        try:
+            # item() gives back a Python int or float, as the list would have
+            return self.items.item(index)
+        except (IndexError, TypeError):
+            # Whatever the list would make of it (true as an index), or raise
+            return self.items.tolist()[index]
+
+    def __iter__(self) -> Any:
+        return iter(self.items.tolist())
+
+    def __contains__(self, value: Any) -> bool:
+        if self.exactly(value):
+            return bool((self.items == value).any())
+        return value in self.items.tolist()
+
+    def __eq__(self, other: Any) -> bool:
+        if isinstance(other, NumericList):
+            if self.items.dtype == other.items.dtype != object:
+                return bool(numpy.array_equal(self.items, other.items))
+            return self.items.tolist() == other.items.tolist()
+        if isinstance(other, list):
+            return self.items.tolist() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __str__(self) -> str:
+        return str(self.items.tolist())
+
+    def __repr__(self) -> str:
+        return repr(self.items.tolist())
+
+    def joined(self, other: List[Any]) -> "NumericList":
+        """ A NumericList of self's elements and then other's; an array of objects, unless they're all of a type. """
+
+        array = array_of(other)
+        if array is not None and array.dtype == self.items.dtype:
+            return NumericList(numpy.concatenate([ self.items, array ]))
+        if not other:
+            return NumericList(self.items.copy())
+        return NumericList(numpy.concatenate([ self.items.astype(object), objects(other) ]))
+
+    def __add__(self, other: Any) -> Any:
+        if isinstance(other, NumericList):
+            if other.items.dtype == self.items.dtype:
+                return NumericList(numpy.concatenate([ self.items, other.items ]))
+            return self.joined(other.items.tolist())
+        more = elements(other)
+        return self.joined(more if more is not None else [ other ])
+
+    def __radd__(self, other: Any) -> Any:
+        more = elements(other)
+        return make_list(more if more is not None else [ other ]) + self
+
+    def __sub__(self, other: Any) -> Any:
+        if self.exactly(other):
+            return NumericList(self.items[self.items != other])
+        more = elements(other)
+        if more is not None and self.items.dtype != object:
+            array = array_of(more)
+            if array is not None and array.dtype == self.items.dtype:
+                return NumericList(self.items[~numpy.isin(self.items, array)])
+        return make_list(removed(self.items.tolist(), other))
+
+    def __mul__(self, other: Any) -> Any:
+        if isinstance(other, int):
+            return NumericList(numpy.tile(self.items, max(int(other), 0)))
+        # Raises what the list would
+        return self.aslist() * plain(other)
+
+    __rmul__ = __mul__
+
+    def __neg__(self) -> Any:
+        return -self.aslist()
+
+def as_list(operator: Callable[[Any, Any], Any], reflected: bool = False) -> Callable[[NumericList, Any], Any]:
+    """ A NumericList's operator method that does what the LinguisList would (raise, mostly). """
+
+    if reflected:
+        return lambda self, other: operator(plain(other), self.aslist())
+    return lambda self, other: operator(self.aslist(), plain(other))
+
+def plain(value: Any) -> Any:
+    """ value, or if it's a NumericList, the LinguisList it stands in for. """
+    return value.aslist() if isinstance(value, NumericList) else value
+
+for name in [ "truediv", "floordiv", "mod", "pow", "lt", "le", "gt", "ge" ]:
+    setattr(NumericList, f"__{name}__", as_list(getattr(operator, name)))
+for name in [ "sub", "truediv", "floordiv", "mod", "pow" ]:
+    setattr(NumericList, f"__r{name}__", as_list(getattr(operator, name), reflected=True))
+
+def objects(values: List[Any]) -> Any:
+    """ values as an array of Python objects (one by one, so that a list among them stays a list). """
+
+    array = numpy.empty(len(values), dtype=object)
+    for idx, value in enumerate(values):
+        array[idx] = value
+    return array
+
+def import_make_list(module: ast.Module) -> None:
+    """ Has module's list displays built by make_list(), in place (the visitors have them all call MAKE_LIST). """
+
+    import_lists(module, __name__, "make_list")
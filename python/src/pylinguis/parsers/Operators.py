@@ -0,0 +1,25 @@
+"""
+The pieces of Python AST that every Linguis front end builds its trees from.
+
+Operators are keyed by the token names the lexer grammar gives them, which every
+language (and every engine) shares. Like ast.parse, we share one instance of each
+operator (and expression context) between all the nodes that use it.
+"""
+
+import ast
+
+BINARY_OPS = {
+    "Add": ast.Add(), "Subtract": ast.Sub(), "Multiply": ast.Mult(), "Divide": ast.Div(), "Modulus": ast.Mod(),
+}
+COMPARE_OPS = {
+    "Equals": ast.Eq(), "NEquals": ast.NotEq(),
+    "GT": ast.Gt(), "GTEquals": ast.GtE(), "LT": ast.Lt(), "LTEquals": ast.LtE(),
+}
+LOAD = ast.Load()
+STORE = ast.Store()
+POW = ast.Pow()
+AND = ast.And()
+OR = ast.Or()
+IN = ast.In()
+NOT = ast.Not()
+USUB = ast.USub()
@@ -0,0 +1,362 @@
+"""
+An optimization pass over the Python AST the visitors build, run before compile().
+
+The visitors turn the source into Python as it stands, so `666^2` is computed every
+time it runs, and `if true do ... end` tests its condition every time. optimize():
+
+  * folds arithmetic, comparisons and boolean operators on constants into constants;
+  * propagates constants: a name assigned exactly once in its scope, to a constant, is
+    replaced by that constant wherever it's read after the assignment (in that scope,
+    and in any function defined after it that doesn't have a local of that name);
+  * prunes if/while statements whose condition is a constant, keeping only the branch
+    that would run, and asserts that are sure to pass;
+  * turns `i^2` into `i*i` where i is the counter of a for loop over range(), and
+    assigned nowhere else, so it can only ever be an int (a multiply is several times
+    cheaper than a power, and gives the same result for ints; not for floats, whose
+    `**` raises OverflowError where `*` comes to inf, nor for an expression, which
+    would be evaluated twice).
+
+It repeats these until propagation finds nothing more to do. Nothing is folded that
+would raise (`1/0` is left to raise at run time, where it always did), nor anything
+whose result would be huge (`10^10^10` is left to take as long as it ever did, rather
+than hanging the parse), nor lists, which are mutable. Assignments are always kept,
+even when every read of the name was replaced, since whatever runs the Module may look
+the name up afterwards.
+"""
+
+import ast
+import operator
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+# The largest int (in bits) and str (in characters) a fold may produce
+MAX_INT_BITS = 128
+MAX_STR_LEN = 4096
+
+# Fold and propagate at most this many times over
+MAX_ROUNDS = 8
+
+BINARY: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul,
+    ast.Div: operator.truediv, ast.FloorDiv: operator.floordiv, ast.Mod: operator.mod,
+    ast.Pow: operator.pow,
+}
+UNARY: Dict[type, Callable[[Any], Any]] = {
+    ast.USub: operator.neg, ast.UAdd: operator.pos, ast.Not: operator.not_,
+}
+COMPARE: Dict[type, Callable[[Any, Any], Any]] = {
+    ast.Eq: operator.eq, ast.NotEq: operator.ne, ast.Lt: operator.lt, ast.LtE: operator.le,
+    ast.Gt: operator.gt, ast.GtE: operator.ge, ast.Is: operator.is_, ast.IsNot: operator.is_not,
+    ast.In: lambda a, b: a in b, ast.NotIn: lambda a, b: a not in b,
+}
+
+# The only constants we'll compute with (not bytes, Ellipsis or complex, which Linguis never makes)
+SIMPLE = (bool, int, float, str, type(None))
+
+def small(value: Any) -> bool:
+    """ Whether value is small enough to be a folded constant. """
+
+    if isinstance(value, int):
+        return value.bit_length() <= MAX_INT_BITS
+    if isinstance(value, str):
+        return len(value) <= MAX_STR_LEN
+    return True
+
+def safe_binary(op: ast.operator, left: Any, right: Any) -> bool:
+    """ Whether computing left op right is sure to be cheap (its result may still be too big to keep). """
+
+    if isinstance(left, str) or isinstance(right, str):
+        # Only concatenation and repetition; '%' is formatting, and unlikely to be meant
+        if isinstance(op, ast.Add):
+            return isinstance(left, str) and isinstance(right, str)
+        if isinstance(op, ast.Mult):
+            text, count = (left, right) if isinstance(left, str) else (right, left)
+            return isinstance(text, str) and isinstance(count, int) and len(text) * count <= MAX_STR_LEN
+        return False
+    if isinstance(op, ast.Pow) and isinstance(left, int) and isinstance(right, int) and right > 0:
+        return max(left.bit_length(), 1) * right <= MAX_INT_BITS * 2
+    if isinstance(op, ast.Mult) and isinstance(left, int) and isinstance(right, int):
+        return left.bit_length() + right.bit_length() <= MAX_INT_BITS * 2
+    return True
+
+def evaluate(compute: Callable[[], Any]) -> Optional[ast.Constant]:
+    """ The Constant compute() comes to, or None if it raises or comes to something we won't fold. """
+
+    try:
+        value = compute()
+    except (ArithmeticError, TypeError, ValueError):
+        return None
+    if not isinstance(value, SIMPLE) or not small(value):
+        return None
+    return ast.Constant(value=value)
+
+def constant(node: ast.AST) -> bool:
+    return isinstance(node, ast.Constant) and isinstance(node.value, SIMPLE)
+
+def truthy(node: ast.AST) -> Optional[bool]:
+    """ Whether node is a constant that is true (or false); None if it isn't a constant. """
+
+    return bool(node.value) if constant(node) else None
+
+class Folder(ast.NodeTransformer):
+    """ Folds constant expressions, and prunes constant branches. """
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        left, right, op = node.left, node.right, node.op
+        if constant(left) and constant(right) and type(op) in BINARY and safe_binary(op, left.value, right.value):
+            folded = evaluate(lambda: BINARY[type(op)](left.value, right.value))
+            if folded is not None:
+                return ast.copy_location(folded, node)
+        return node
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.AST:
+        self.generic_visit(node)
+        if constant(node.operand) and type(node.op) in UNARY:
+            folded = evaluate(lambda: UNARY[type(node.op)](node.operand.value))
+            if folded is not None:
+                return ast.copy_location(folded, node)
+        return node
+
+    def visit_Compare(self, node: ast.Compare) -> ast.AST:
+        self.generic_visit(node)
+        operands = [ node.left, *node.comparators ]
+        if all(map(constant, operands)) and all(type(op) in COMPARE for op in node.ops):
+            def compare() -> bool:
+                return all(COMPARE[type(op)](a.value, b.value) for op, a, b in zip(node.ops, operands, operands[1:]))
+            folded = evaluate(compare)
+            if folded is not None:
+                return ast.copy_location(folded, node)
+        return node
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.AST:
+        self.generic_visit(node)
+        # Leading constants either decide the result (a false one, for 'and') or drop out
+        values = list(node.values)
+        deciding = isinstance(node.op, ast.Or)
+        while len(values) > 1 and truthy(values[0]) is not None:
+            if truthy(values[0]) == deciding:
+                return values[0]
+            values.pop(0)
+        if len(values) == 1:
+            return values[0]
+        node.values = values
+        return node
+
+    def visit_If(self, node: ast.If) -> Any:
+        self.generic_visit(node)
+        test = truthy(node.test)
+        if test is not None:
+            # Its statements are spliced in place of it (and none, for a dead if without an else)
+            return node.body if test else node.orelse
+        filled(node)
+        return node
+
+    def visit_While(self, node: ast.While) -> Any:
+        self.generic_visit(node)
+        if truthy(node.test) is False:
+            return node.orelse
+        filled(node)
+        return node
+
+    def visit_Assert(self, node: ast.Assert) -> Any:
+        self.generic_visit(node)
+        return None if truthy(node.test) else node
+
+    def visit_For(self, node: ast.For) -> ast.AST:
+        self.generic_visit(node)
+        filled(node)
+        return node
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+        self.generic_visit(node)
+        filled(node)
+        return node
+
+def filled(node: Any) -> None:
+    """ Puts a pass in node's body, if pruning left nothing there; Python won't have an empty one. """
+
+    if not node.body:
+        node.body = [ ast.copy_location(ast.Pass(), node) ]
+
+def stored_names(statements: Iterable[ast.stmt]) -> Dict[str, int]:
+    """
+    How many times each name is assigned in the scope of statements (not counting those
+    in the functions they define, other than the functions' own names).
+    """
+
+    counts: Dict[str, int] = {}
+    pending: List[ast.AST] = list(statements)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            counts[node.name] = counts.get(node.name, 0) + 1
+            pending.extend(node.decorator_list)
+            continue
+        if isinstance(node, ast.Lambda):
+            continue
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            counts[node.id] = counts.get(node.id, 0) + 1
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            # Not ours to reason about
+            for name in node.names:
+                counts[name] = counts.get(name, 0) + 2
+        pending.extend(ast.iter_child_nodes(node))
+    return counts
+
+class Substituter(ast.NodeTransformer):
+    """ Replaces reads of the names in constants with their values, in one statement of a scope. """
+
+    def __init__(self, constants: Dict[str, ast.Constant]) -> None:
+        self.constants = constants
+        self.count = 0
+
+    def visit_Name(self, node: ast.Name) -> ast.AST:
+        value = self.constants.get(node.id)
+        if value is None or not isinstance(node.ctx, ast.Load):
+            return node
+        self.count += 1
+        return ast.copy_location(ast.Constant(value=value.value), node)
+
+    def visit_Call(self, node: ast.Call) -> ast.AST:
+        # Leave what's called as it is (the error calling a constant gives names the name)
+        node.args = [ self.visit(arg) for arg in node.args ]
+        node.keywords = [ self.visit(keyword) for keyword in node.keywords ]
+        if not isinstance(node.func, ast.Name):
+            node.func = self.visit(node.func)
+        return node
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+        # Its defaults and decorators are evaluated here; its body is a scope of its own
+        node.args.defaults = [ self.visit(default) for default in node.args.defaults ]
+        node.decorator_list = [ self.visit(decorator) for decorator in node.decorator_list ]
+        params = [ arg.arg for arg in (*node.args.posonlyargs, *node.args.args, *node.args.kwonlyargs) ]
+        params += [ arg.arg for arg in (node.args.vararg, node.args.kwarg) if arg is not None ]
+        self.count += propagate(node.body, self.constants, params)
+        return node
+
+    def visit_Lambda(self, node: ast.Lambda) -> ast.AST:
+        return node
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> ast.AST:
+        return node
+
+def propagate(body: List[ast.stmt], outer: Dict[str, ast.Constant], params: Iterable[str] = ()) -> int:
+    """
+    Propagates constants through the scope whose statements are body, given the constants
+    of the scope around it; returns how many names were replaced.
+    """
+
+    stores = stored_names(body)
+    for param in params:
+        stores[param] = stores.get(param, 0) + 2
+    # Any name assigned here is local here, so hides the outer scope's
+    known = { name: value for name, value in outer.items() if name not in stores }
+
+    count = 0
+    for idx, statement in enumerate(body):
+        substituter = Substituter(known)
+        body[idx] = statement = substituter.visit(statement)
+        count += substituter.count
+        # Only an assignment at the top of the scope is sure to have run before what follows it
+        if isinstance(statement, ast.Assign) and len(statement.targets) == 1 \
+                and isinstance(statement.targets[0], ast.Name) and constant(statement.value) \
+                and stores.get(statement.targets[0].id) == 1:
+            known = { **known, statement.targets[0].id: statement.value }
+    return count
+
+def counters(body: List[ast.stmt], stores: Dict[str, int], shared: Set[str]) -> Set[str]:
+    """
+    The names in the scope of body that can only ever hold ints: the counters of for
+    loops over range(), assigned nowhere else in the scope, nor declared global or
+    nonlocal anywhere (shared).
+    """
+
+    names: Set[str] = set()
+    pending: List[ast.AST] = list(body)
+    while pending:
+        node = pending.pop()
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            continue
+        if isinstance(node, ast.For) and isinstance(node.target, ast.Name) and node.target.id not in shared \
+                and stores.get(node.target.id) == 1 and isinstance(node.iter, ast.Call) \
+                and isinstance(node.iter.func, ast.Name) and node.iter.func.id == "range":
+            names.add(node.target.id)
+        pending.extend(ast.iter_child_nodes(node))
+    return names
+
+class Squarer(ast.NodeTransformer):
+    """ Turns squares of the names in ints (which only ever hold ints) into multiplies, in one statement of a scope. """
+
+    def __init__(self, ints: Set[str], shared: Set[str]) -> None:
+        self.ints = ints
+        self.shared = shared
+
+    def visit_BinOp(self, node: ast.BinOp) -> ast.AST:
+        self.generic_visit(node)
+        left, right = node.left, node.right
+        if isinstance(node.op, ast.Pow) and isinstance(left, ast.Name) and left.id in self.ints \
+                and constant(right) and type(right.value) is int and right.value == 2:
+            right = ast.copy_location(ast.Name(id=left.id, ctx=ast.Load()), left)
+            return ast.copy_location(ast.BinOp(left=left, op=ast.Mult(), right=right), node)
+        return node
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+        # Its defaults and decorators are evaluated here; its body is a scope of its own
+        node.args.defaults = [ self.visit(default) for default in node.args.defaults ]
+        node.decorator_list = [ self.visit(decorator) for decorator in node.decorator_list ]
+        params = [ arg.arg for arg in (*node.args.posonlyargs, *node.args.args, *node.args.kwonlyargs) ]
+        params += [ arg.arg for arg in (node.args.vararg, node.args.kwarg) if arg is not None ]
+        square(node.body, self.shared, params)
+        return node
+
+    def visit_Lambda(self, node: ast.Lambda) -> ast.AST:
+        return node
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> ast.AST:
+        return node
+
+def square(body: List[ast.stmt], shared: Set[str], params: Iterable[str] = ()) -> None:
+    """ Turns squares of the for loop counters of the scope whose statements are body into multiplies. """
+
+    stores = stored_names(body)
+    for param in params:
+        stores[param] = stores.get(param, 0) + 2
+    squarer = Squarer(counters(body, stores, shared), shared)
+    body[:] = [ squarer.visit(statement) for statement in body ]
+
+def bound(module: ast.Module) -> Set[str]:
+    """ The names module assigns, takes as parameters, or declares global or nonlocal, anywhere in it. """
+
+    names: Set[str] = set()
+    for node in ast.walk(module):
+        if isinstance(node, ast.Name) and not isinstance(node.ctx, ast.Load):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            names.update(node.names)
+    return names
+
+def shared_names(module: ast.Module) -> Set[str]:
+    """ The names module declares global or nonlocal anywhere in it. """
+
+    return { name for node in ast.walk(module) if isinstance(node, (ast.Global, ast.Nonlocal)) for name in node.names }
+
+def fold(module: ast.Module) -> ast.Module:
+    """ Folds and prunes module, without propagating; safe for part of a program. """
+
+    return Folder().visit(module)
+
+def optimize(module: ast.Module) -> ast.Module:
+    """ Runs the whole pass (see the module docstring) over module, a whole program, in place. """
+
+    for _ in range(MAX_ROUNDS):
+        module = Folder().visit(module)
+        if not propagate(module.body, {}):
+            break
+    # Only while range is the builtin is a loop over range() sure to count in ints
+    if "range" not in bound(module):
+        square(module.body, shared_names(module))
+    return module
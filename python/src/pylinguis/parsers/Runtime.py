@@ -0,0 +1,139 @@
+"""
+The namespace Linguis programs run in.
+
+A RuntimeContext is built once per parser, from its builtins(): a template globals
+dict holding those, `__name__` and `__builtins__`, and nothing else (none of the
+driver's own modules and functions). Nor is `__builtins__` Python's builtins module:
+it's a dict of the one name the compiled code looks up there, `__import__`, which the
+passes' imports of their helpers (memoized(), make_list()) need, and which imports
+nothing but pylinguis' own modules. namespace() clones the template (and its
+`__builtins__`) for each program, which is two small dict copies; so thousands of
+small programs can each run in a namespace of their own, none of them seeing what the
+one before left behind.
+
+Linguis lists are LinguisLists: Python lists, but for what `+`, `-` and `*` do with
+them, which is what examples/maths.lin has them do:
+
+  * `list + x` appends x (`[1] + 1 == [1, 1]`), and `x + list` puts it in front;
+    `list + list` concatenates;
+  * `list - x` takes out every element equal to x (`[1, 2, 3, 4, 5] - 4 == [1, 2, 3, 5]`);
+    `list - list` takes out every element equal to one of the other's;
+  * `list * n` (or `n * list`) repeats it n times (`[1, 2, 3] * 2 == [1, 2, 3, 1, 2, 3]`).
+
+Each gives a new list; nothing changes the lists it's given. The visitors build each
+list display by calling MAKE_LIST (LinguisList itself, or with numpy_lists, the
+NumericList module's make_list(), which vectorizes the same operators), and the
+Module imports it, so it runs in any namespace.
+"""
+
+import ast
+import builtins
+from types import CodeType
+from typing import Any, Dict, List, Optional
+
+# What the visitors' Python calls for the language's built-in statements and functions
+# (println/print, input and size), and for its for loops
+BUILTINS: Dict[str, Any] = {
+    "print": print,
+    "input": input,
+    "len": len,
+    "range": range,
+}
+
+def import_helper(name: str, globals: Any = None, locals: Any = None, fromlist: Any = (), level: int = 0) -> Any:
+    """ __import__, for pylinguis' own modules only. """
+
+    if level != 0 or name.partition(".")[0] != "pylinguis":
+        raise ImportError(f"Linguis programs can't import {name}")
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+# All of Python's builtins the compiled code sees
+RUNTIME_BUILTINS: Dict[str, Any] = {
+    "__import__": import_helper,
+}
+
+# What the visitors' Python calls to build each list display
+MAKE_LIST = "__linguis_list__"
+
+def elements(value: Any) -> Optional[List[Any]]:
+    """ value's elements, if it's a Linguis list (a list, or a NumericList), else None. """
+
+    if isinstance(value, list):
+        return value
+    tolist = getattr(value, "tolist", None)
+    return None if tolist is None else tolist()
+
+def added(values: List[Any], other: Any) -> "LinguisList":
+    """ values + other: values' elements, and then other's, if it's a list, or else other itself. """
+
+    result = LinguisList(values)
+    more = elements(other)
+    if more is None:
+        result.append(other)
+    else:
+        result.extend(more)
+    return result
+
+def removed(values: List[Any], other: Any) -> "LinguisList":
+    """ values - other: values' elements, but for those equal to other (or, if it's a list, to any of its). """
+
+    more = elements(other)
+    if more is None:
+        more = [ other ]
+    return LinguisList([ value for value in values if value not in more ])
+
+class LinguisList(list):
+    """ A Linguis list: a Python list, with Linguis's list operators; see the module docstring. """
+
+    __slots__ = ()
+
+    def __add__(self, other: Any) -> "LinguisList":
+        return added(self, other)
+
+    def __radd__(self, other: Any) -> "LinguisList":
+        more = elements(other)
+        result = LinguisList(more if more is not None else [ other ])
+        result.extend(self)
+        return result
+
+    def __sub__(self, other: Any) -> "LinguisList":
+        return removed(self, other)
+
+    def __mul__(self, other: Any) -> "LinguisList":
+        # Raises what a list would, for anything but an int
+        return list.__imul__(LinguisList(self), other)
+
+    __rmul__ = __mul__
+
+def import_lists(module: ast.Module, source: str = __name__, name: str = "LinguisList") -> None:
+    """ Has module import what its list displays call (source's name, as MAKE_LIST), in place. """
+
+    first = module.body[0]
+    alias = ast.copy_location(ast.alias(name=name, asname=MAKE_LIST), first)
+    module.body.insert(0, ast.copy_location(ast.ImportFrom(module=source, names=[ alias ], level=0), first))
+
+def imports_lists(statement: ast.stmt) -> bool:
+    """ Whether statement is the import import_lists() puts in. """
+
+    return isinstance(statement, ast.ImportFrom) and statement.names[0].asname == MAKE_LIST
+
+class RuntimeContext:
+    """ The template globals for a parser's programs; see the module docstring. """
+
+    def __init__(self, language_builtins: Dict[str, Any]) -> None:
+        # Without a __builtins__ of its own, exec() would give each namespace the whole builtins module
+        self.template: Dict[str, Any] = { "__name__": "__main__", "__builtins__": RUNTIME_BUILTINS, **language_builtins }
+
+    def namespace(self) -> Dict[str, Any]:
+        """ A fresh namespace for one program. """
+
+        namespace = self.template.copy()
+        namespace["__builtins__"] = namespace["__builtins__"].copy()
+        return namespace
+
+    def run(self, code: CodeType) -> Dict[str, Any]:
+        """ Runs code in a fresh namespace, and returns that namespace. """
+
+        namespace = self.namespace()
+        exec(code, namespace)
+        return namespace
@@ -0,0 +1,155 @@
+"""
+Sources that switch language partway through, with `#parser` lines:
+
+    println("Hello");
+    #parser fr
+    imprimerdb("Bonjour");
+
+Each `#parser` line (alone on its line) starts a segment read by the parser of that
+name, up to the next one; the segment before the first is read by the default parser.
+The segments are parsed separately, then put back together into one Module, so they
+share a single top-level namespace. A `#parser` line inside a string or a comment
+still counts, since finding them doesn't parse anything.
+
+A SegmentParser parses the segments that aren't in its cache one after another, keeping
+one parser for each name. (Not on threads: the GIL leaves nothing to gain, and ANTLR's
+parsers share their DFAs and prediction contexts between instances. Compile whole files
+in worker processes, with Batch, for parallelism.) Each segment's statements are cached
+under a hash of its parser and its text (not its position), so editing one segment leaves
+the others to come from the cache, even when the edit moves them up or down the file.
+"""
+
+import ast
+import hashlib
+import pickle
+import re
+from typing import Any, Dict, List, Optional
+
+from . import find_parser
+from .LinguisParserBase import LinguisParserBase
+from .LRUCache import LRUCache
+from .Runtime import imports_lists
+
+PRAGMA = "#parser"
+PRAGMA_LINE = re.compile(r"^[ \t]*#parser[ \t]+(\S+)[ \t]*\r?$", re.MULTILINE)
+
+# The parser options for passes that are run over the whole Module, rather than each segment
+WHOLE_PROGRAM = ("optimize", "inline", "fast_locals", "memoize", "no_memoize", "numpy_lists")
+
+class Segment:
+    """ One stretch of a source, read by one parser. """
+
+    def __init__(self, parser: str, code: str, line: int) -> None:
+        self.parser = parser
+        self.code = code
+        # The line of the source the segment's first line is
+        self.line = line
+
+    def __repr__(self) -> str:
+        return f"Segment({self.parser!r}, line {self.line})"
+
+def has_pragmas(code: str) -> bool:
+    """ Whether code switches parsers anywhere; a quick check, for sources that almost never do. """
+
+    return PRAGMA in code and PRAGMA_LINE.search(code) is not None
+
+def split_segments(code: str, default: str) -> List[Segment]:
+    """ Splits code at its `#parser` lines (which belong to no segment) into segments. """
+
+    segments = []
+    parser, start, line = default, 0, 1
+    for m in PRAGMA_LINE.finditer(code):
+        segments.append(Segment(parser, code[start:m.start()], line))
+        line += code.count("\n", start, m.end()) + 1
+        parser, start = m.group(1), m.end() + 1
+    segments.append(Segment(parser, code[start:], line))
+    return segments
+
+class SegmentParser:
+    """
+    Parses sources with `#parser` lines in them; see the module docstring.
+
+    Segments are parsed with find_parser(name, engine, **options) parsers, one at a time,
+    and the last cache_size of them are cached.
+    Only sources that have `#parser` lines need one of these; other sources parse just
+    as well (and a little quicker) with their parser alone.
+
+    The passes that need the whole program (optimize, inline, memoize, numpy_lists and fast_locals; see
+    LinguisParserBase.transform()) run over the Module once it's put together, not over
+    each segment: the segments after one may assign its names, or call its functions.
+    """
+
+    def __init__(self, default: str = "en-us", engine: str = "antlr", cache_size: int = 256,
+                 **options: Any) -> None:
+        self.default = default
+        self.engine = engine
+        self.passes = LinguisParserBase(**{ option: options.pop(option) for option in WHOLE_PROGRAM if option in options })
+        self.options = options
+        self.cache = LRUCache(cache_size)
+        # The parsers made so far, by name
+        self.parsers: Dict[str, LinguisParserBase] = {}
+
+    def parser(self, name: str, line: int) -> LinguisParserBase:
+        parser = self.parsers.get(name)
+        if parser is None:
+            parser = find_parser(name, engine=self.engine, **self.options)
+            if parser is None:
+                raise SyntaxError(f"No parser named '{name}' for {PRAGMA}", (None, line - 1, 1, f"{PRAGMA} {name}"))
+            self.parsers[name] = parser
+        return parser
+
+    def key(self, segment: Segment) -> Any:
+        return (segment.parser, self.engine, hashlib.sha256(segment.code.encode()).digest())
+
+    def parse_segment(self, segment: Segment) -> List[ast.stmt]:
+        """ Parses one segment (that wasn't in the cache), and caches its statements. """
+
+        parser = self.parser(segment.parser, segment.line)
+        # Padded out to where it sits in the source, so that the parser's line numbers
+        # (in its AST, its error messages, and its SyntaxErrors) are the source's
+        module = parser.parse_code("\n" * (segment.line - 1) + segment.code)
+        self.cache.put(self.key(segment), (segment.line, pickle.dumps(module.body, protocol=pickle.HIGHEST_PROTOCOL)))
+        return module.body
+
+    def cached(self, segment: Segment) -> Optional[List[ast.stmt]]:
+        """ The statements of segment from the cache (moved to where it is now), if it's there. """
+
+        entry = self.cache.get(self.key(segment))
+        if entry is None:
+            return None
+        line, snapshot = entry
+        body = pickle.loads(snapshot)
+        if line != segment.line:
+            for node in body:
+                ast.increment_lineno(node, segment.line - line)
+        return body
+
+    def parse(self, code: str, filename: Optional[str] = None) -> ast.Module:
+        """ Parses code, segment by segment, into one Module. """
+
+        segments = split_segments(code, self.default)
+        bodies: List[List[ast.stmt]] = []
+        try:
+            for segment in segments:
+                body = self.cached(segment)
+                bodies.append(body if body is not None else self.parse_segment(segment))
+        except SyntaxError as e:
+            # The segment's parser only ever saw a string
+            if filename is not None and (e.filename is None or e.filename.startswith("<")):
+                e.filename = filename
+            raise
+
+        # Each segment that built lists imported what builds them; the Module imports it once, up front
+        lists = False
+        for i, body in enumerate(bodies):
+            if body and imports_lists(body[0]):
+                bodies[i] = body[1:]
+                lists = True
+        module = ast.Module(body=[ node for body in bodies for node in body ], type_ignores=[])
+        if self.passes.optimize or self.passes.fast_locals or lists:
+            module = self.passes.transform(module, lists=lists)
+        return module
+
+    def parse_file(self, filename: str) -> ast.Module:
+        with open(filename, "rt", encoding="utf-8") as f:
+            return self.parse(f.read(), filename)
@@ -0,0 +1,124 @@
+"""
+Tail-call elimination for self-recursive functions, as part of the Optimizer.
+
+Linguis has no loops with accumulators beyond while and for, so it's natural to write
+
+    def count(n, total)
+      if n == 0 do
+        return total;
+      end
+      return count(n - 1, total + n);
+    end
+
+which, as Python, takes a frame per call, and hits the recursion limit (about a
+thousand calls deep) long before it runs out of anything else. eliminate() turns each
+`return f(...)` in f itself into reassigning f's parameters and going round again:
+
+    def count(n, total):
+        while True:
+            if n == 0:
+                return total
+            n, total = n - 1, total + n
+            continue
+
+so the stack stays one frame deep however far it recurses, and each time round costs a
+jump rather than a call. (A function that could fall off its end gets a return at the
+end of the loop, since falling off the end of that would go round again.)
+
+Only functions defined at the top level, and never assigned anything else there, are
+rewritten (so that f is sure to be the function itself); and not those that define
+functions of their own, which could keep hold of the parameters we reassign. A call in
+a for or while loop of the function's is left as it is, since `continue` there would
+go round that loop instead. Calls that aren't returned straight away (`return
+f(n - 1) + 1`) aren't tail calls, and are left as they are too.
+"""
+
+import ast
+from typing import List, Optional
+
+from . import Optimizer
+
+class TailCalls(ast.NodeTransformer):
+    """ Rewrites the tail calls of one function to itself; see the module docstring. """
+
+    def __init__(self, function: ast.FunctionDef) -> None:
+        self.name = function.name
+        self.params = [ arg.arg for arg in function.args.args ]
+        self.count = 0
+
+    def tail_call(self, node: ast.Return) -> Optional[ast.Call]:
+        call = node.value
+        if isinstance(call, ast.Call) and isinstance(call.func, ast.Name) and call.func.id == self.name \
+                and not call.keywords and len(call.args) == len(self.params) \
+                and not any(isinstance(arg, ast.Starred) for arg in call.args):
+            return call
+        return None
+
+    def visit_Return(self, node: ast.Return) -> ast.AST:
+        call = self.tail_call(node)
+        if call is None:
+            return node
+        self.count += 1
+        statements: List[ast.stmt] = []
+        if self.params:
+            # All the arguments are evaluated before any parameter changes, as for the call
+            # (The parameters are located where the call is, as are the tuples of them and of its arguments)
+            names = [ ast.copy_location(ast.Name(id=param, ctx=ast.Store()), call) for param in self.params ]
+            if len(self.params) == 1:
+                target: ast.expr = names[0]
+                value = call.args[0]
+            else:
+                target = ast.copy_location(ast.Tuple(elts=names, ctx=ast.Store()), call)
+                value = ast.copy_location(ast.Tuple(elts=call.args, ctx=ast.Load()), call)
+            statements.append(ast.Assign(targets=[ target ], value=value))
+        statements.append(ast.Continue())
+        for statement in statements:
+            ast.copy_location(statement, node)
+        return statements
+
+    def visit_For(self, node: ast.For) -> ast.AST:
+        return node
+
+    def visit_While(self, node: ast.While) -> ast.AST:
+        return node
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> ast.AST:
+        return node
+
+    def visit_Lambda(self, node: ast.Lambda) -> ast.AST:
+        return node
+
+def eliminable(function: ast.FunctionDef) -> bool:
+    """ Whether function's tail calls to itself can be rewritten at all. """
+
+    args = function.args
+    if function.decorator_list or args.posonlyargs or args.vararg or args.kwonlyargs or args.kwarg or args.defaults:
+        return False
+    if function.name in Optimizer.stored_names(function.body) or function.name in (arg.arg for arg in args.args):
+        return False    # A local by the same name; the calls aren't to the function
+    return not any(isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda, ast.ClassDef))
+                   for statement in function.body for node in ast.walk(statement))
+
+def eliminate(module: ast.Module) -> int:
+    """ Rewrites the self tail calls of module's top-level functions into loops, in place; returns how many. """
+
+    stores = Optimizer.stored_names(module.body)
+    count = 0
+    for function in module.body:
+        if not isinstance(function, ast.FunctionDef) or stores.get(function.name) != 1 or not eliminable(function):
+            continue
+        rewriter = TailCalls(function)
+        body = [ rewriter.visit(statement) for statement in function.body ]
+        if not rewriter.count:
+            continue
+        flat: List[ast.stmt] = []
+        for statement in body:
+            flat.extend(statement if isinstance(statement, list) else [ statement ])
+        if not isinstance(flat[-1], (ast.Return, ast.Continue)):
+            # Falling off the end of the loop has to return, as falling off the end of the function did
+            flat.append(ast.copy_location(ast.Return(value=None), function.body[-1]))
+        loop = ast.While(test=ast.copy_location(ast.Constant(value=True), function.body[0]), body=flat, orelse=[])
+        function.body = [ ast.copy_location(loop, function.body[0]) ]
+        loop.end_lineno, loop.end_col_offset = flat[-1].end_lineno, flat[-1].end_col_offset
+        count += rewriter.count
+    return count
@@ -0,0 +1,153 @@
+"""
+Where the time (and memory) of compiling and running a Linguis program goes, stage by stage.
+
+A FileTimings, set as a parser's timings, has it time each stage of what it does with
+a file separately:
+
+  * read: reading the source file;
+  * lex: turning it into tokens (the ANTLR lexer is lazy, so the token stream is filled
+    up front, rather than as the parser asks for tokens);
+  * parse: building the parse tree (the fast engine builds the Python AST as it
+    parses, so for it, this is the visit too);
+  * visit: building the Python AST from the parse tree;
+  * transform: the passes the parser was asked for (optimize, numpy_lists, fast_locals);
+
+and run_file() adds compile and exec (as does the driver, which also times looking in
+__lincache__, as cache). A file parsed a #parser segment at a time has one parse
+stage, for all of them. For each stage it records the wall-clock and CPU time, the
+process's peak RSS (its high-water mark so far, so it only ever grows), and, if
+tracemalloc is tracing (python -X tracemalloc, or PYTHONTRACEMALLOC=1), the most the
+stage had allocated at once, over what there was when it started. Nothing here turns
+tracemalloc on, since it makes everything several times slower.
+
+It counts the tokens, the nodes of the parse tree, and the nodes of the Python AST,
+too; as_dict() gives the lot in a form json.dumps() takes, and report() as text.
+"""
+
+import ast
+import contextlib
+import os
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+class Stage:
+    """ How long one stage took, and the memory it left the process with. """
+
+    __slots__ = ("name", "wall", "cpu", "max_rss", "traced_peak")
+
+    def __init__(self, name: str, wall: float, cpu: float, max_rss: Optional[int], traced_peak: Optional[int]) -> None:
+        self.name = name
+        self.wall = wall
+        self.cpu = cpu
+        self.max_rss = max_rss
+        self.traced_peak = traced_peak
+
+    def as_dict(self) -> Dict[str, Any]:
+        return { name: getattr(self, name) for name in self.__slots__ }
+
+def max_rss() -> Optional[int]:
+    """ The process's peak resident set size so far, in bytes (None where there's no telling). """
+
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux counts it in kilobytes, macOS in bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+class FileTimings:
+    """ The stages of compiling and running one file, and its counts; see the module docstring. """
+
+    def __init__(self, filename: str) -> None:
+        self.filename = filename
+        self.stages: List[Stage] = []
+        self.counts: Dict[str, Optional[int]] = { "tokens": None, "parse_tree_nodes": None, "ast_nodes": None }
+
+    @contextlib.contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """ Times what runs inside it as the stage name. """
+
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        cpu = time.process_time()
+        wall = time.perf_counter()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - wall
+            cpu = time.process_time() - cpu
+            peak = tracemalloc.get_traced_memory()[1] - before if tracing else None
+            self.stages.append(Stage(name, wall, cpu, max_rss(), peak))
+
+    def count(self, name: str, value: int) -> None:
+        self.counts[name] = value
+
+    @property
+    def wall(self) -> float:
+        return sum(stage.wall for stage in self.stages)
+
+    @property
+    def cpu(self) -> float:
+        return sum(stage.cpu for stage in self.stages)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return { "file": self.filename, "wall": self.wall, "cpu": self.cpu, **self.counts,
+                 "stages": [ stage.as_dict() for stage in self.stages ] }
+
+    def report(self) -> str:
+        counts = ", ".join(f"{value:,} {name.replace('_', ' ')}" for name, value in self.counts.items() if value is not None)
+        out = [ f"Timings for {os.path.basename(self.filename)}" + (f" ({counts})" if counts else ""),
+                "  stage          wall ms     cpu ms   max RSS MB  traced peak MB" ]
+        megabytes = lambda size: "-" if size is None else f"{size / 2 ** 20:.1f}"
+        for stage in self.stages + [ Stage("total", self.wall, self.cpu, None, None) ]:
+            out.append(f"  {stage.name:10} {stage.wall * 1e3:11.2f} {stage.cpu * 1e3:10.2f} "
+                       f"{megabytes(stage.max_rss):>12} {megabytes(stage.traced_peak):>15}")
+        return "\n".join(out) + "\n"
+
+def stage(timings: Optional[FileTimings], name: str) -> Any:
+    """ timings.stage(name), or (when there are no timings to keep) a context that does nothing. """
+
+    return contextlib.nullcontext() if timings is None else timings.stage(name)
+
+def run_file(parser: Any, filename: str) -> FileTimings:
+    """ Parses, compiles and runs filename with parser, in a fresh namespace, timing each stage. """
+
+    timings = FileTimings(filename)
+    parser.timings = timings
+    try:
+        module = parser.parse_file(filename)
+    finally:
+        parser.timings = None
+    with timings.stage("compile"):
+        code = compile(module, filename=filename, mode="exec")
+    namespace = parser.runtime.namespace()
+    with timings.stage("exec"):
+        exec(code, namespace)
+    return timings
+
+def tree_size(tree: Any) -> int:
+    """ How many nodes (rule contexts and tokens) there are in an ANTLR parse tree. """
+
+    size = 0
+    pending = [ tree ]
+    while pending:
+        node = pending.pop()
+        size += 1
+        children = getattr(node, "children", None)
+        if children:
+            pending.extend(children)
+    return size
+
+def ast_size(module: ast.AST) -> int:
+    """ How many nodes there are in a Python AST. """
+
+    return sum(1 for _ in ast.walk(module))
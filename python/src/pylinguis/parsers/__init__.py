@@ -1,35 +1,103 @@
-from typing import Dict, Optional
+import importlib
+from typing import Any, Dict, List, Optional, Union
 
 from .LinguisParserBase import LinguisParserBase
-from .ANTLRSupport import ANTLRParserBase # Used by other files importing this one; do not remove
 
-parsers : Dict[str, LinguisParserBase] = {}
+# Third-party language packs advertise their parsers under this entry-point group, as
+# `name = "package.module:ParserClass"`; see discover_parsers()
+ENTRY_POINT_GROUP = "pylinguis.parsers"
 
-def register_parser(name: str, parser_cls: type[LinguisParserBase]) -> None:
-    """ Registers a parser class under a given name/nationality. """
+# Name -> parser class, or the "module:Class" path to import it from on first use
+parsers : Dict[str, Union[type[LinguisParserBase], str]] = {}
+
+# Engine name -> "module:Class" of a parser that runs any language in Languages on it.
+# (The default engine, "antlr", has one generated parser per language instead; see parsers.)
+engines : Dict[str, Union[type[LinguisParserBase], str]] = {
+    "fast": "pylinguis.parsers.FastParser:FastParser",
+}
+
+_discovered = False
+
+def register_parser(name: str, parser_cls: Union[type[LinguisParserBase], str]) -> None:
+    """
+    Registers a parser class under a given name/nationality.
+
+    parser_cls is either the class itself, or a "module:Class" path naming it; a path
+    isn't imported until somebody asks find_parser() for that name.
+    """
 
     # TODO: Verify parser_cls is a class and inherits from LinguisParserBase
 
     parsers[name] = parser_cls
 
-def find_parser(language: str) -> Optional[LinguisParserBase]:
+def discover_parsers() -> None:
+    """Registers (lazily) every parser installed under the ENTRY_POINT_GROUP entry-point group."""
+
+    global _discovered
+    _discovered = True
+
+    from importlib.metadata import entry_points
+    for ep in entry_points(group=ENTRY_POINT_GROUP):
+        # Our own parsers win over anybody else's of the same name
+        parsers.setdefault(ep.name, ep.value)
+
+def parser_names() -> List[str]:
+    """The names of every parser we know of, installed language packs included."""
+
+    if not _discovered:
+        discover_parsers()
+    return sorted(parsers)
+
+def resolve(registry: Dict[str, Any], name: str) -> Optional[type[LinguisParserBase]]:
+    """Looks name up in registry, importing (and remembering) the class if it's registered by path."""
+
+    parser_cls = registry.get(name)
+    if isinstance(parser_cls, str):
+        module, _, attr = parser_cls.partition(":")
+        parser_cls = getattr(importlib.import_module(module), attr)
+        registry[name] = parser_cls
+    return parser_cls
+
+def load_parser(language: str) -> Optional[type[LinguisParserBase]]:
+    """ Finds a parser class by name/nationality, importing it if it hasn't been yet. Returns None if not found. """
+
+    if language not in parsers and not _discovered:
+        discover_parsers()
+    return resolve(parsers, language)
+
+def find_parser(language: str, engine: str = "antlr", **options: Any) -> Optional[LinguisParserBase]:
     """ 
     Finds a parser by name/nationality. If found, instantiates an instance and returns it. 
+    Any options (such as `trace=`) are handed to the parser's constructor.
+
+    engine picks the front end: "antlr" (the default) for the parser generated from the
+    language's grammar, or "fast" for the hand-written one (which takes no ANTLR options).
 
     If not found, returns None.
     """
-    parser_cls = parsers.get(language)
+    if engine != "antlr":
+        from .Languages import languages
+        engine_cls = resolve(engines, engine)
+        if engine_cls is None:
+            raise ValueError(f"Unknown parser engine '{engine}'")
+        lang = languages.get(language)
+        return engine_cls(lang, **options) if lang else None
+
+    parser_cls = load_parser(language)
     if parser_cls:
         # Instantiate and return
-        return parser_cls()
+        return parser_cls(**options)
     return None
 
-# Register parser *classes* here (not instances)
-from pylinguis.parsers.enus import ENUSParser
-register_parser("en-us", ENUSParser)
-from pylinguis.parsers.enpl import ENPLParser
-register_parser("en-pl", ENPLParser)
-from pylinguis.parsers.fr import FRParser
-register_parser("fr", FRParser)
-#from pylinguis.parsers.de import DEParser
-#register_parser("de", DEParser)
+def __getattr__(name: str) -> Any:
+    # The ANTLR support (and the ANTLR runtime with it) only loads once some parser needs it
+    if name in ("ANTLRParserBase", "ANTLRLanguageParser"):
+        from . import ANTLRSupport
+        return getattr(ANTLRSupport, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Register parser *classes* here (not instances), by path, so that only the one asked for gets imported
+register_parser("en-us", "pylinguis.parsers.enus:ENUSParser")
+register_parser("en-pl", "pylinguis.parsers.enpl:ENPLParser")
+register_parser("fr", "pylinguis.parsers.fr:FRParser")
+#register_parser("de", "pylinguis.parsers.de:DEParser")
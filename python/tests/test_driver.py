@@ -0,0 +1,309 @@
+# Tests for the pylinguis driver (command line) and the machinery behind it
+#
+
+import os
+import sys
+
+import pytest
+
+import pylinguis
+from pylinguis.CodeCache import CodeCache, cache_dir_for, codegen_version
+
+# Runs the driver on args as if from the command line
+#
+def run_main(monkeypatch, *args) -> None:
+    monkeypatch.setattr(sys, "argv", [ "pylinguis", *args ])
+    pylinguis.main()
+
+########################################
+## __lincache__
+##
+def test_codecache_round_trip(tmp_path) -> None:
+    cache = CodeCache(str(tmp_path))
+    key = cache.key(b"a = 1;", "en-us", "0.2")
+    assert cache.get(key, "a.lin") is None
+
+    cache.put(key, compile("def f(): return 1\nx = f()", "old.lin", "exec"))
+    code = cache.get(key, "new.lin")
+    assert code.co_filename == "new.lin"
+    assert all(c.co_filename == "new.lin" for c in code.co_consts if hasattr(c, "co_filename"))
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_codecache_key_covers_parser_and_version(tmp_path) -> None:
+    cache = CodeCache(str(tmp_path))
+    keys = { cache.key(b"a = 1;", "en-us", "0.2"), cache.key(b"a = 1;", "fr", "0.2"),
+             cache.key(b"a = 1;", "en-us", "0.3"), cache.key(b"a = 2;", "en-us", "0.2") }
+    assert len(keys) == 4
+
+def test_codecache_key_covers_the_translator(tmp_path, monkeypatch) -> None:
+    cache = CodeCache(str(tmp_path))
+    before = pylinguis.cache_key(cache, b"a = 1;", "en-us", "antlr", {})
+    assert codegen_version() == codegen_version()
+    # A build whose parsers or passes differ compiles to different code, so gets its own entries
+    monkeypatch.setattr(pylinguis, "codegen_version", lambda: "0.1.0+0123456789abcdef")
+    assert pylinguis.cache_key(cache, b"a = 1;", "en-us", "antlr", {}) != before
+
+def test_codecache_evicts_least_recently_used(tmp_path) -> None:
+    cache = CodeCache(str(tmp_path), max_entries=2)
+    code = compile("x = 1", "x.lin", "exec")
+    for i, key in enumerate([ "a", "b", "c" ]):
+        cache.put(key, code)
+        os.utime(cache.path(key), (i, i))
+        if key == "b":
+            os.utime(cache.path("a"), (10, 10))   # 'a' was used since
+
+    cache.evict()
+    assert sorted(os.listdir(tmp_path)) == [ "a.linc", "c.linc" ]
+
+def test_codecache_corrupt_entry_is_a_miss(tmp_path) -> None:
+    cache = CodeCache(str(tmp_path))
+    with open(cache.path("bad"), "wb") as f:
+        f.write(b"\x00 not marshal")
+    assert cache.get("bad", "x.lin") is None
+
+def test_codecache_blocked_directory_is_skipped(tmp_path, monkeypatch, capsys) -> None:
+    source = tmp_path / "prog.lin"
+    source.write_text("println(\"Howdy\");")
+    # A file where the cache directory would go, so that it can't be made
+    (tmp_path / "__lincache__").write_text("not a directory")
+
+    assert not CodeCache(cache_dir_for(str(source))).put("a", compile("x = 1", "x.lin", "exec"))
+    run_main(monkeypatch, str(source))
+    assert "Howdy" in capsys.readouterr().out
+
+def test_main_uses_lincache(tmp_path, monkeypatch, capsys) -> None:
+    source = tmp_path / "prog.lin"
+    source.write_text("println(\"Howdy\");")
+
+    run_main(monkeypatch, str(source))
+    assert os.listdir(cache_dir_for(str(source)))
+
+    # Second time around never gets as far as the parser
+    def no_parse(self, filename):
+        raise AssertionError("should have come from __lincache__")
+    monkeypatch.setattr(pylinguis.parsers.ANTLRParserBase, "parse_file", no_parse)
+    run_main(monkeypatch, str(source))
+    assert capsys.readouterr().out.count("Howdy") == 2
+
+    with pytest.raises(AssertionError):
+        run_main(monkeypatch, "--no-cache", str(source))
+
+def test_main_runs_each_file_in_its_own_namespace(tmp_path, monkeypatch, capsys) -> None:
+    first, second = tmp_path / "first.lin", tmp_path / "second.lin"
+    first.write_text("a = 1;\n")
+    second.write_text("println(a);\n")
+
+    # Neither the first program's names, nor the driver's own, are there for the second
+    with pytest.raises(NameError):
+        run_main(monkeypatch, "--no-cache", str(first), str(second))
+    second.write_text("println(sys);\n")
+    with pytest.raises(NameError):
+        run_main(monkeypatch, "--no-cache", str(second))
+
+########################################
+## --engine
+##
+def test_main_runs_fast_engine(tmp_path, monkeypatch, capsys) -> None:
+    source = tmp_path / "prog.lin"
+    source.write_text("imprimerdb(\"Bonjour\");", encoding="utf-8")
+
+    def no_parse(self, filename):
+        raise AssertionError("should have used the fast engine")
+    monkeypatch.setattr(pylinguis.parsers.ANTLRParserBase, "parse_file", no_parse)
+    run_main(monkeypatch, "--parser=fr", "--engine=fast", "--no-cache", str(source))
+    assert "Bonjour" in capsys.readouterr().out
+
+def test_main_rejects_unknown_engine(tmp_path, monkeypatch, capsys) -> None:
+    with pytest.raises(SystemExit):
+        run_main(monkeypatch, "--engine=warp", str(tmp_path / "prog.lin"))
+    assert "Unknown parser engine 'warp'" in capsys.readouterr().out
+
+########################################
+## --optimize
+##
+def test_main_optimizes_into_its_own_cache_entry(tmp_path, monkeypatch, capsys) -> None:
+    source = tmp_path / "prog.lin"
+    source.write_text("a = 6;\nif a > 5 do\n    println(a * 7);\nend\n")
+
+    run_main(monkeypatch, str(source))
+    run_main(monkeypatch, "-O", str(source))
+    assert capsys.readouterr().out.count("42") == 2
+    assert len(os.listdir(cache_dir_for(str(source)))) == 2
+
+    # Both come from __lincache__ now, each from its own entry
+    def no_parse(self, filename):
+        raise AssertionError("should have come from __lincache__")
+    monkeypatch.setattr(pylinguis.parsers.ANTLRParserBase, "parse_file", no_parse)
+    run_main(monkeypatch, "--optimize", str(source))
+    assert "42" in capsys.readouterr().out
+
+def test_main_prints_memo_stats(tmp_path, monkeypatch, capsys) -> None:
+    source = tmp_path / "prog.lin"
+    source.write_text("def fib(n)\n    if n < 2 do\n        return n;\n    end\n    return fib(n-1) + fib(n-2);\nend\n"
+                      "println(fib(30));\n")
+
+    run_main(monkeypatch, "-O", "--memo-stats", str(source))
+    assert capsys.readouterr().out.endswith("832040\nmemoized fib(): 28 hits, 31 misses, 31 of 4096 results kept\n")
+    run_main(monkeypatch, "-O", "--memo-stats", "--no-memoize=fib", str(source))
+    assert capsys.readouterr().out.endswith("832040\n")
+    # Memoizing changes the code, so each gets a __lincache__ entry of its own
+    assert len(os.listdir(cache_dir_for(str(source)))) == 2
+
+def test_main_runs_fast_locals(tmp_path, monkeypatch, capsys) -> None:
+    source = tmp_path / "prog.lin"
+    source.write_text("def f(x)\n    return g(x) + a;\nend\ndef g(x)\n    return x * 2;\nend\na = 2;\nprintln(f(20));\n")
+
+    for engine in [ "antlr", "fast" ]:
+        run_main(monkeypatch, "--fast-locals", f"--engine={engine}", str(source))
+        assert capsys.readouterr().out.endswith("42\n")
+
+########################################
+## --profile
+##
+HOT = """def work(n)
+    total = 0;
+    for i = 0 to n do
+        total = total + i * i;
+    end
+    return total;
+end
+println(work(400000));
+"""
+
+def test_profile_counts_linguis_lines(tmp_path) -> None:
+    from pylinguis.Profile import Profile
+
+    source = tmp_path / "hot.lin"
+    source.write_text(HOT)
+    p = pylinguis.parsers.find_parser("en-us")
+    namespace = p.runtime.namespace()
+    with Profile(str(source), interval=0.0005) as profile:
+        exec(p.compile_code(HOT, str(source)), namespace)
+
+    # Only the program's own frames: none of Python's, or pytest's, beneath them
+    assert profile.samples > 0
+    assert all(frames[0] == ("(top level)", 8) for frames in profile.stacks)
+    functions = profile.functions()
+    assert functions["(top level)"][1] == profile.samples
+    assert max(functions, key=lambda name: functions[name][0]) == "work"
+    assert "hot.lin:4  work: total = total + i * i;" in profile.report()
+    assert "(top level) (hot.lin:8);work (hot.lin:4) " in profile.collapsed()
+
+def test_main_profiles_each_file(tmp_path, monkeypatch, capsys) -> None:
+    source = tmp_path / "hot.lin"
+    source.write_text(HOT)
+
+    for args in [ [ "--profile" ], [ f"--profile={tmp_path / 'profiles'}", "--fast-locals" ] ]:
+        run_main(monkeypatch, *args, str(source))
+        assert "Profile of hot.lin: " in capsys.readouterr().out
+    for path in [ tmp_path / "hot.lin.collapsed", tmp_path / "profiles" / "hot.lin.collapsed" ]:
+        assert all(line.startswith("(top level) (hot.lin:8)") for line in path.read_text().splitlines())
+
+########################################
+## --timings
+##
+def test_main_writes_timings(tmp_path, monkeypatch, capsys) -> None:
+    import json
+
+    source = tmp_path / "prog.lin"
+    source.write_text("a = 6;\nprintln(a * 7);\n")
+    path = tmp_path / "timings.json"
+
+    # The first run compiles it; the second finds it in __lincache__
+    run_main(monkeypatch, "--timings", str(source))
+    assert "Timings for prog.lin (11 tokens, " in capsys.readouterr().out
+    run_main(monkeypatch, "-O", f"--timings={path}", str(source), str(source))
+    run = json.loads(path.read_text())
+    assert (run["parser"], run["engine"], run["options"]) == ("en-us", "antlr", { "optimize": True })
+    assert [ [ stage["name"] for stage in timings["stages"] ] for timings in run["files"] ] == [
+        [ "cache", "read", "lex", "parse", "visit", "transform", "compile", "exec" ], [ "cache", "exec" ] ]
+    assert run["files"][0]["tokens"] == 11 and run["files"][1]["tokens"] is None
+
+def test_main_warns_that_timings_turns_off_streaming(tmp_path, monkeypatch, capsys) -> None:
+    source = tmp_path / "prog.lin"
+    source.write_text("a = 6;\nprintln(a * 7);\n")
+
+    run_main(monkeypatch, "--stream", "--timings", str(source))
+    out = capsys.readouterr().out
+    assert "WARNING: --stream doesn't apply with --timings; ignoring it" in out
+    assert "42\n" in out and "Timings for prog.lin" in out
+
+########################################
+## --stream
+##
+def test_main_streams_into_one_namespace(tmp_path, monkeypatch, capsys) -> None:
+    source = tmp_path / "prog.lin"
+    source.write_text("a = 40;\ndef f(x)\n    return x + a;\nend\nprintln(f(2));\n")
+
+    for engine in [ "antlr", "fast" ]:
+        run_main(monkeypatch, "--stream", f"--engine={engine}", str(source))
+        assert capsys.readouterr().out.endswith("42\n")
+    assert not os.path.exists(cache_dir_for(str(source)))
+
+
+########################################
+## #parser segments
+##
+def test_main_runs_mixed_languages(tmp_path, monkeypatch, capsys) -> None:
+    source = tmp_path / "mixed.lin"
+    source.write_text("a = 40;\n#parser fr\nb = a + 2;\nimprimerdb(b);\n", encoding="utf-8")
+
+    for engine in [ "antlr", "fast" ]:
+        run_main(monkeypatch, f"--engine={engine}", "--no-cache", str(source))
+        assert capsys.readouterr().out.endswith("42\n")
+
+    from pylinguis.Batch import compile_files
+    assert compile_files([ str(source) ], jobs=1)[0].code is not None
+
+########################################
+## --jobs and --check (Batch)
+##
+def write_programs(tmp_path, broken=()) -> list:
+    fnames = []
+    for i in range(6):
+        source = tmp_path / f"prog{i}.lin"
+        source.write_text("b = * 2;\n" if i in broken else f"println({i} * 10);\n")
+        fnames.append(str(source))
+    return fnames
+
+def test_compile_files_in_order_with_errors(tmp_path) -> None:
+    from pylinguis.Batch import compile_files
+
+    fnames = write_programs(tmp_path, broken=(1, 4))
+    for jobs in [ 1, 2 ]:
+        results = compile_files(fnames, jobs=jobs)
+        assert [ r.filename for r in results ] == fnames
+        assert [ r.code is None for r in results ] == [ i in (1, 4) for i in range(6) ]
+        assert results[1].error.startswith("ValueError") and "line 1:4" in results[1].messages
+        namespace = {}
+        exec(results[3].code, namespace)
+        assert results[3].code.co_filename == fnames[3]
+
+def test_compile_files_rejects_unknown_parser(tmp_path) -> None:
+    from pylinguis.Batch import compile_files
+
+    with pytest.raises(ValueError):
+        compile_files(write_programs(tmp_path), parser="xx", jobs=2)
+
+def test_main_jobs_runs_in_order(tmp_path, monkeypatch, capsys) -> None:
+    fnames = write_programs(tmp_path)
+    run_main(monkeypatch, "--jobs=2", *fnames)
+    out = capsys.readouterr().out
+    assert [ line for line in out.splitlines() if line.isdigit() ] == [ str(i * 10) for i in range(6) ]
+    assert os.listdir(cache_dir_for(fnames[0]))
+
+    # Now from __lincache__, still in order
+    run_main(monkeypatch, "--jobs=2", *reversed(fnames))
+    out = capsys.readouterr().out
+    assert [ line for line in out.splitlines() if line.isdigit() ] == [ str(i * 10) for i in reversed(range(6)) ]
+
+def test_main_check_reports_every_failure(tmp_path, monkeypatch, capsys) -> None:
+    fnames = write_programs(tmp_path, broken=(2, 3))
+    with pytest.raises(SystemExit) as e:
+        run_main(monkeypatch, "--check", "--jobs=2", *fnames)
+    assert e.value.code == 1
+    out = capsys.readouterr().out
+    errors = [ line for line in out.splitlines() if line.startswith("ERROR") ]
+    assert [ e.split(":")[1].strip() for e in errors ] == [ fnames[2], fnames[3] ]
+    assert "4 of 6 file(s) compiled" in out
+    assert "Processing file" not in out     # Nothing ran
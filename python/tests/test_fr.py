@@ -1,7 +1,7 @@
 # Tests for the en-us parser/lexer
 #
 
-#import pytest  # Don't think I need this, but let's keep it here just the same for now
+import pytest
 
 from pylinguis.parsers import find_parser
 
@@ -11,10 +11,18 @@ import ast
 ## Utilities and setup
 ##
 
-# Set up our parser once, so we don't have to keep finding it
+# Set up our parsers once, so we don't have to keep finding them; every
+# test runs against each engine in turn
 #
-parser = find_parser("fr")
-assert parser is not None
+parsers = { engine: find_parser("fr", engine=engine) for engine in [ "antlr", "fast" ] }
+assert all(parsers.values())
+parser = parsers["antlr"]
+
+@pytest.fixture(autouse=True, params=parsers.keys())
+def engine(request) -> str:
+    global parser
+    parser = parsers[request.param]
+    return request.param
 
 # Helper method to do the parse/compile/exec cycle 
 #
@@ -164,6 +172,46 @@ b = 2 ^ 5;
     assert local_vars['a'] == 25
     assert local_vars['b'] == 2 ** 5
 
+def test_unary_minus() -> None:
+    code = """
+a = -5;
+b = -(2 + 3);
+c = 2 - -1;
+"""
+    local_vars = run(code)
+    assert local_vars['a'] == -5
+    assert local_vars['b'] == -5
+    assert local_vars['c'] == 3
+
+def test_not() -> None:
+    code = """
+a = !vrai;
+b = !(1 > 2);
+"""
+    local_vars = run(code)
+    assert local_vars['a'] == False
+    assert local_vars['b'] == True
+
+def test_parentheses() -> None:
+    code = """
+a = (1 + 2) * 3;
+b = 2 ^ (1 + 1);
+c = ((4));
+"""
+    local_vars = run(code)
+    assert local_vars['a'] == 9
+    assert local_vars['b'] == 4
+    assert local_vars['c'] == 4
+
+def test_in() -> None:
+    code = """
+a = 2 dans [1, 2, 3];
+b = 5 dans [1, 2, 3];
+"""
+    local_vars = run(code)
+    assert local_vars['a'] == True
+    assert local_vars['b'] == False
+
 def test_numeric_comparison() -> None:
     code = """t1 = 1 < 2;
 f1 = 1 > 2;
@@ -410,3 +458,24 @@ a = hello(5);
     assert local_vars['a'] == 5
 
 
+def test_call_twoargs() -> None:
+    code = """
+définir add(x, y)
+    retour x + y;
+fin
+a = add(2, 3);
+"""
+    local_vars = run(code)
+    assert local_vars['a'] == 5
+
+
+def test_call_statement() -> None:
+    code = """
+définir hello(arg)
+    retour arg;
+fin
+hello(5);
+a = 1;
+"""
+    local_vars = run(code)
+    assert local_vars['a'] == 1
@@ -0,0 +1,1214 @@
+# Tests for the shared parser machinery in ANTLRParserBase/LinguisParserBase
+#
+
+import ast
+import contextlib
+import json
+import logging
+import os
+import random
+
+import importlib.metadata
+import re
+import subprocess
+import sys
+
+import antlr4
+import pytest
+
+import pylinguis.parsers
+from pylinguis.parsers import find_parser
+from pylinguis.parsers.Runtime import LinguisList, imports_lists
+from pylinguis.parsers.Languages import languages
+
+########################################
+## Diagnostics
+##
+def test_trace_writes_dumps(tmp_path) -> None:
+    parser = find_parser("en-us", trace=str(tmp_path))
+    parser.parse("a = 1 + 2;")
+
+    assert sorted(os.listdir(tmp_path)) == [ "parse-1.ast.txt", "parse-1.py", "parse-1.tree.txt" ]
+    assert (tmp_path / "parse-1.py").read_text() == "a = 1 + 2"
+    assert "assignment" in (tmp_path / "parse-1.tree.txt").read_text()
+
+def test_trace_names_dumps_after_file(tmp_path) -> None:
+    source = tmp_path / "prog.lin"
+    source.write_text("println(\"Hi\");")
+    tracedir = tmp_path / "trace"
+
+    # The same name in another directory gets dumps of its own
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "prog.lin").write_text("println(\"Bye\");")
+
+    parser = find_parser("en-us", trace=str(tracedir))
+    parser.parse_file(str(source))
+    parser.parse_file(str(other / "prog.lin"))
+
+    dumps = sorted(tracedir.glob("prog.lin-*.py"))
+    assert len(os.listdir(tracedir)) == 6
+    assert all(re.fullmatch(r"prog\.lin-[0-9a-f]{8}\.py", dump.name) for dump in dumps)
+    assert sorted(dump.read_text() for dump in dumps) == [ "print('Bye')", "print('Hi')" ]
+
+def test_no_trace_by_default() -> None:
+    parser = find_parser("en-us")
+    assert parser.trace is None
+
+def test_visitor_dumps_gated_on_level() -> None:
+    parser = find_parser("en-us")
+    level = parser.logger.level
+    try:
+        parser.logger.setLevel(logging.WARNING)
+        assert parser.getVisitor().debugging == False
+        parser.logger.setLevel(logging.DEBUG)
+        assert parser.getVisitor().debugging == True
+    finally:
+        parser.logger.setLevel(level)
+
+    # Same AST either way
+    assert ast.dump(parser.parse("a = 1;")) == ast.dump(ast.parse("a = 1"))
+
+########################################
+## Parser registry
+##
+def test_find_parser_imports_only_what_it_needs() -> None:
+    script = ("import sys, pylinguis\n"
+              "assert not any(m.startswith('antlr4') for m in sys.modules)\n"
+              "pylinguis.parsers.find_parser('fr')\n"
+              "print(sorted(m for m in sys.modules if m.endswith('.LinguisParser')))\n")
+    src = os.path.join(os.path.dirname(__file__), "..", "src")
+    result = subprocess.run([ sys.executable, "-c", script ], capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=src), check=True)
+    assert result.stdout.strip() == "['pylinguis.parsers.fr.LinguisParser']"
+
+def test_register_parser_by_path(monkeypatch) -> None:
+    monkeypatch.setitem(pylinguis.parsers.parsers, "en-us-again", "pylinguis.parsers.enus:ENUSParser")
+
+    parser = find_parser("en-us-again", memo_size=2)
+    assert type(parser).__name__ == "ENUSParser"
+    assert parser.memo is not None
+    assert pylinguis.parsers.parsers["en-us-again"] is type(parser)     # Resolved once, then kept
+
+def test_parsers_discovered_from_entry_points(monkeypatch) -> None:
+    pack = importlib.metadata.EntryPoint(name="fr-ca", value="pylinguis.parsers.fr:FRParser",
+                                         group=pylinguis.parsers.ENTRY_POINT_GROUP)
+    imposter = importlib.metadata.EntryPoint(name="en-us", value="nowhere:Nothing",
+                                             group=pylinguis.parsers.ENTRY_POINT_GROUP)
+    monkeypatch.setattr(importlib.metadata, "entry_points", lambda group: [ pack, imposter ])
+    monkeypatch.setattr(pylinguis.parsers, "_discovered", False)
+    monkeypatch.setattr(pylinguis.parsers, "parsers", dict(pylinguis.parsers.parsers))
+
+    assert find_parser("xx") is None
+    assert pylinguis.parsers.parser_names() == [ "en-pl", "en-us", "fr", "fr-ca" ]
+    assert ast.dump(find_parser("fr-ca").parse("a = vrai;")) == ast.dump(ast.parse("a = True"))
+    assert type(find_parser("en-us")).__name__ == "ENUSParser"
+
+########################################
+## Language tables and the shared visitor
+##
+SYNTAX = os.path.join(os.path.dirname(__file__), "..", "..", "syntax")
+
+def test_language_tables_match_lexer_grammars() -> None:
+    for lang in languages.values():
+        grammar = open(os.path.join(SYNTAX, f"Linguis{lang.package.upper()}Lexer.g4"), encoding="utf-8").read()
+        rules = dict(re.findall(r"^(\w+)\s*:\s*'([^']*)';", grammar, re.MULTILINE))
+        assert lang.keywords == { k: rules[k] for k in lang.keywords }
+        bools = re.search(r"^Bool\s*:\s*'([^']*)'\s*\|\s*'([^']*)'", grammar, re.MULTILINE).groups()
+        assert lang.booleans == { bools[0]: True, bools[1]: False }
+
+def test_languages_share_visitor_tables() -> None:
+    visitors = [ find_parser(name).getVisitor() for name in languages ]
+    assert all(v.dispatch for v in visitors)
+    assert len({ id(v.dispatch) for v in visitors }) == len(visitors)   # One per generated parser...
+    assert len({ type(v) for v in visitors }) == 1                      # ...for the one visitor
+
+def test_getTruthy() -> None:
+    assert find_parser("fr").getTruthy("vrai") == True
+    assert find_parser("en-pl").getTruthy("alsefay") == False
+    try:
+        find_parser("en-us").getTruthy("vrai")
+        assert False, "Shouldn't get here, 'vrai' isn't English!"
+    except Exception as e:
+        assert "not recognized" in str(e)
+
+########################################
+## The hand-written ("fast") engine
+##
+# A little of every statement and operator
+PROGRAM = """
+a = 1 + 2 * 3 ^ 2 - 4 / 5;
+b = [1, 2.5, "three"];
+if a >= 10 && b[0] != 2 || false do
+    println(size(b));
+else if a < 3 do
+    print(a);
+else do
+    a = 0 - a;
+end
+def f(x, y)
+    return x * y;
+end
+for i = 0 to 3 do
+    a = f(a, i);
+end
+while a > 100 do
+    a = a - 1;
+end
+"""
+
+def same_ast(language: str, code: str) -> str:
+    antlr = ast.dump(find_parser(language).parse(code))
+    assert ast.dump(find_parser(language, engine="fast").parse(code)) == antlr
+    return antlr
+
+def test_fast_engine_groups_like_antlr() -> None:
+    assert same_ast("en-us", "a = -2 ^ 2;") == ast.dump(ast.parse("a = (-2) ** 2"))
+    assert same_ast("en-us", "a = 2 ^ 3 ^ 2;") == ast.dump(ast.parse("a = 2 ** 3 ** 2"))
+    assert same_ast("en-us", "a = 1 - 2 - 3;") == ast.dump(ast.parse("a = 1 - 2 - 3"))
+    assert same_ast("en-us", "a = !b == c;") == ast.dump(ast.parse("a = (not b) == c"))
+    assert same_ast("en-us", "a = b == 1 in l;") == ast.dump(ast.parse("a = (b == 1) in l"))
+    same_ast("en-us", "a = b < c < d && e || f && g;")
+    same_ast("en-us", PROGRAM)
+
+def test_fast_engine_keywords_take_longest_match() -> None:
+    same_ast("en-us", "printx = 1; println(printx); inx = input(\"?\");")
+    # Keywords the Identifier rule can't spell beat identifiers, even without a space after them
+    assert same_ast("fr", "définirf(a) retour a; fin si vrai àb = f(1); fin") == \
+           same_ast("fr", "définir f(a) retour a; fin si vrai à b = f(1); fin")
+    same_ast("en-pl", "a = uetray; b = uetrayx;")
+
+def test_fast_engine_syntax_errors() -> None:
+    parser = find_parser("en-us", engine="fast")
+    try:
+        parser.parse("a = 1;\nb = 2 +;\n")
+        assert False, "Shouldn't get here, that's not an expression!"
+    except SyntaxError as e:
+        assert (e.lineno, e.offset, e.text) == (2, 8, "b = 2 +;")
+        assert "expected an expression, found ';'" in str(e)
+
+    try:
+        find_parser("fr", engine="fast").parse("si a à b = 1;")
+        assert False, "Shouldn't get here, the 'si' never ends!"
+    except SyntaxError as e:
+        assert "expected 'fin', found end of input" in str(e)
+
+def test_fast_engine_leaves_antlr_alone() -> None:
+    script = ("import sys, pylinguis\n"
+              "pylinguis.parsers.find_parser('en-us', engine='fast').parse('a = 1;')\n"
+              "print(any(m.startswith('antlr4') for m in sys.modules))\n")
+    src = os.path.join(os.path.dirname(__file__), "..", "src")
+    result = subprocess.run([ sys.executable, "-c", script ], capture_output=True, text=True,
+                            env=dict(os.environ, PYTHONPATH=src), check=True)
+    assert result.stdout.strip() == "False"
+
+def test_fast_engine_memo_and_trace(tmp_path) -> None:
+    parser = find_parser("en-us", engine="fast", memo_size=2)
+    parser.parse("a = 1;")
+    assert ast.dump(parser.parse("a = 1;")) == ast.dump(ast.parse("a = 1"))
+    assert (parser.memo.hits, parser.memo.misses) == (1, 1)
+
+    parser = find_parser("en-us", engine="fast", trace=str(tmp_path))
+    parser.parse("a = 1;")
+    assert (tmp_path / "parse-1.py").read_text() == "a = 1"
+    assert "Identifier a" in (tmp_path / "parse-1.tree.txt").read_text()
+
+def test_unknown_engine() -> None:
+    try:
+        find_parser("en-us", engine="warp")
+        assert False, "Shouldn't get here, there's no such engine!"
+    except ValueError:
+        pass
+    assert find_parser("xx", engine="fast") is None
+
+########################################
+## Two-stage (SLL, then LL) parsing
+##
+def test_valid_input_finishes_in_sll() -> None:
+    parser = find_parser("en-us")
+    parser.parse("a = 1 + 2 * 3;")
+    parser.parse("if a < 10 do a = 10; else do a = 20; end")
+
+    assert parser.stats.sll == 2
+    assert parser.stats.ll == 0
+    assert parser.stats.sll_rate == 1.0
+
+def test_syntax_error_falls_back_to_ll() -> None:
+    parser = find_parser("en-us")
+    module = parser.parse("a = 1")    # Missing ';'; the LL stage recovers from it
+
+    assert parser.stats.sll == 0
+    assert parser.stats.ll == 1
+    assert ast.dump(module) == ast.dump(ast.parse("a = 1"))
+
+def test_two_stage_off_uses_ll_only() -> None:
+    parser = find_parser("en-us", two_stage=False)
+    module = parser.parse("a = 1 + 2;")
+
+    assert parser.stats.sll == 0
+    assert parser.stats.ll == 1
+    assert ast.dump(module) == ast.dump(find_parser("en-us").parse("a = 1 + 2;"))
+
+########################################
+## Reused lexer/parser/visitor
+##
+def test_recognizers_are_reused() -> None:
+    parser = find_parser("en-us")
+    parser.parse("a = 1;")
+    lexer, antlr_parser, visitor = parser.lexer, parser.antlr_parser, parser.visitor
+    module = parser.parse("b = 2;")
+
+    assert parser.lexer is lexer
+    assert parser.antlr_parser is antlr_parser
+    assert parser.visitor is visitor
+    assert ast.dump(module) == ast.dump(ast.parse("b = 2"))
+
+def test_reuse_after_failed_visit() -> None:
+    parser = find_parser("en-us")
+    try:
+        parser.parse("for i = do end")
+        assert False, "Shouldn't get here, there's no range to visit!"
+    except Exception as e:
+        assert "Unrecognized ExpressionContext" in str(e)
+
+    module = parser.parse("a = 1;")
+    assert ast.dump(module) == ast.dump(ast.parse("a = 1"))
+
+def test_reuse_after_failure_inside_sll_stage() -> None:
+    parser = find_parser("en-us")
+    stream, antlr_parser = parser.recognizers(antlr4.InputStream("a = 1;"))
+
+    def boom():
+        antlr_parser.assignment()   # Leaves the parser partway through the input
+        raise KeyboardInterrupt()
+    try:
+        parser.parse_tree(antlr_parser, boom)
+        assert False, "Shouldn't get here, the rule blew up!"
+    except KeyboardInterrupt:
+        pass
+
+    module = parser.parse("a = 1; b = a;")
+    assert ast.dump(module) == ast.dump(ast.parse("a = 1\nb = a"))
+    assert parser.stats.sll == 1
+
+########################################
+## Streaming one top-level unit at a time
+##
+def test_units_match_whole_parse(tmp_path) -> None:
+    source = tmp_path / "warmup.lin"
+    source.write_text(PROGRAM + "return a;\n")
+    for engine in [ "antlr", "fast" ]:
+        parser = find_parser("en-us", engine=engine)
+        units = list(parser.units_from_file(str(source)))
+        # A unit that builds a list imports what builds it, as the whole Module does, once
+        bodies = [ [ stmt for stmt in unit.body if not imports_lists(stmt) ] for unit in units ]
+        assert [ len(body) for body in bodies ] == [ 1 ] * 7
+        assert [ ast.dump(body[0]) for body in bodies ] == \
+               [ ast.dump(stmt) for stmt in parser.parse_file(str(source)).body if not imports_lists(stmt) ]
+
+def test_units_release_tokens(tmp_path) -> None:
+    source = tmp_path / "big.lin"
+    source.write_text("a = 1 + 2;\n" * 1000)
+    parser = find_parser("en-us")
+    units = parser.units_from_file(str(source))
+    for _ in range(500):
+        next(units)
+    assert len(parser.tokens.tokens) < 10
+    assert sum(1 for _ in units) == 500
+
+def test_units_are_parsed_lazily(tmp_path) -> None:
+    source = tmp_path / "broken.lin"
+    source.write_text("a = 1;\nb = ;\n")
+    units = find_parser("en-us", engine="fast").units_from_file(str(source))
+    assert ast.dump(next(units)) == ast.dump(ast.parse("a = 1"))
+    try:
+        next(units)
+        assert False, "Shouldn't get here, the second statement is broken!"
+    except SyntaxError as e:
+        assert e.lineno == 2
+
+########################################
+## Incremental re-parsing
+##
+# Lines that are whole top-level units, for edit scripts to put together
+LINES = [
+    "a = 1 + 2 * 3;",
+    "b = [1, 2.5, \"three\"];",
+    "println(a);",
+    "if a > 1 do b = 2; else do b = 3; end",
+    "def g(x) return x * 2; end",
+    "for i = 0 to 3 do a = a + i; end",
+    "// just a comment",
+    "/* another */ c = a - 1;",
+]
+
+def tokens_of(session) -> list:
+    return [ (t.type, t.text, t.start, t.stop, t.line, t.column, t.tokenIndex) for t in session.tokens ]
+
+def same_as_fresh(parser, session) -> None:
+    fresh = parser.incremental(session.code)
+    assert tokens_of(session) == tokens_of(fresh)
+    assert session.reach == fresh.reach
+    assert ast.dump(session.transformed(), include_attributes=True) == ast.dump(parser.parse(session.code), include_attributes=True)
+
+def type_in(session, pos: int, text: str) -> None:
+    """ Types text in at pos a character at a time, as somebody at an editor would. """
+    for i, ch in enumerate(text):
+        # Halfway through, the code is as often broken as not
+        with contextlib.suppress(Exception):
+            session.edit(pos + i, pos + i, ch)
+
+def test_incremental_matches_full_parse_on_random_edits() -> None:
+    parser = find_parser("en-us")
+    for seed in range(5):
+        rng = random.Random(seed)
+        lines = [ rng.choice(LINES) for _ in range(8) ]
+        session = parser.incremental("\n".join(lines) + "\n")
+        for _ in range(40):
+            offsets = [ 0 ]
+            for line in lines:
+                offsets.append(offsets[-1] + len(line) + 1)
+            n = rng.randrange(len(lines)) if lines else 0
+            op = rng.choice([ "insert", "delete", "retype", "digit", "typo", "comment" ])
+            if op == "insert" or not lines:
+                line = rng.choice(LINES)
+                if rng.random() < 0.5:
+                    type_in(session, offsets[n], line + "\n")
+                else:
+                    session.edit(offsets[n], offsets[n], line + "\n")
+                lines.insert(n, line)
+            elif op == "delete":
+                session.edit(offsets[n], offsets[n + 1], "")
+                del lines[n]
+            elif op == "retype":
+                line = rng.choice(LINES)
+                for pos in reversed(range(offsets[n], offsets[n + 1] - 1)):
+                    with contextlib.suppress(Exception):
+                        session.edit(pos, pos + 1, "")
+                type_in(session, offsets[n], line)
+                lines[n] = line
+            elif op == "digit":
+                digits = [ m.start() for m in re.finditer(r"\d", lines[n]) ]
+                if digits:
+                    pos = rng.choice(digits)
+                    digit = str(rng.randrange(10))
+                    session.edit(offsets[n] + pos, offsets[n] + pos + 1, digit)
+                    lines[n] = lines[n][:pos] + digit + lines[n][pos + 1:]
+            elif op == "typo":
+                pos = rng.randrange(len(session.code) + 1)
+                with contextlib.suppress(Exception):
+                    session.edit(pos, pos, rng.choice("(;\"/*x1 "))
+                session.edit(pos, pos + 1, "")
+            elif op == "comment":
+                last = rng.randrange(n, len(lines))
+                if not any("*/" in line for line in lines[n:last + 1]):
+                    # Opening the comment leaves it unterminated, until it's closed
+                    with contextlib.suppress(Exception):
+                        session.edit(offsets[n], offsets[n], "/*")
+                    session.edit(offsets[last + 1] + 1, offsets[last + 1] + 1, "*/")
+                    lines[n:last + 1] = [ "/*" + "\n".join(lines[n:last + 1]) + "*/" ]
+
+            assert session.code == "\n".join(lines) + ("\n" if lines else "")
+            same_as_fresh(parser, session)
+
+def test_incremental_reparses_only_the_damage() -> None:
+    parser = find_parser("en-us")
+    code = "".join(f"a{i} = {i} * 2;\n" for i in range(200))
+    session = parser.incremental(code)
+    before = list(session.module.body)
+    parses = parser.stats.total
+
+    pos = code.index("a100 = 100") + len("a100 = 10")
+    module = session.edit(pos, pos + 1, "7")
+    assert parser.stats.total - parses <= 2
+    assert ast.unparse(module.body[100]) == "a100 = 107 * 2"
+    assert all(new is old for i, (new, old) in enumerate(zip(module.body, before)) if i != 100)
+    same_as_fresh(parser, session)
+
+def test_incremental_update() -> None:
+    parser = find_parser("en-us")
+    session = parser.incremental(PROGRAM)
+    code = PROGRAM.replace("x * y", "x + y + 1").replace("a - 1;", "a - 2;")
+    assert ast.dump(session.update(code)) == ast.dump(parser.parse(code))
+    assert session.code == code
+    same_as_fresh(parser, session)
+
+    try:
+        session.edit(10, 5, "")
+        assert False, "Shouldn't get here, the edit is backwards!"
+    except ValueError:
+        pass
+
+def test_incremental_runs_the_parsers_passes() -> None:
+    code = "def sq(n)\n return n * n;\nend\nlimit = 3;\nfor i = 0 to limit do\n println(sq(i) + 2^3);\nend\nb = [1, 2];\n"
+    for options in [ { "optimize": True }, { "optimize": True, "fast_locals": True }, { "numpy_lists": True } ]:
+        parser = find_parser("en-us", **options)
+        session = parser.incremental(code)
+        assert ast.dump(session.transformed()) == ast.dump(parser.parse(code))
+        edited = code.replace("limit = 3", "limit = 5")
+        module = session.update(edited)
+        assert ast.dump(module) == ast.dump(parser.parse(edited))
+        # The session's own module is left as the visitor made it, for the next edit
+        assert ast.dump(session.module) == ast.dump(ast.Module(body=find_parser("en-us").parse(edited).body[1:], type_ignores=[]))
+
+def test_incremental_starts_from_broken_code() -> None:
+    parser = find_parser("en-us")
+    session = parser.incremental("a = 1;\nb = * 2;\nc = 3;\n")
+    assert session.errors
+    module = session.edit(11, 12, "")
+    assert not session.errors
+    assert ast.dump(module) == ast.dump(ast.parse("a = 1\nb = 2\nc = 3"))
+
+########################################
+## #parser segments
+##
+MIXED = """a = 1;
+println(a);
+#parser fr
+si a == 1 à
+    b = vrai;
+fin
+#parser en-pl
+c = uetray;
+#parser en-us
+d = a + 1;
+"""
+
+def test_split_segments() -> None:
+    from pylinguis.parsers.Segments import has_pragmas, split_segments
+
+    segments = split_segments(MIXED, "en-us")
+    assert [ (s.parser, s.line) for s in segments ] == [ ("en-us", 1), ("fr", 4), ("en-pl", 8), ("en-us", 10) ]
+    assert segments[2].code == "c = uetray;\n"
+    assert has_pragmas(MIXED)
+    assert not has_pragmas('s = "#parser fr";')
+
+def test_segments_parse_into_one_module() -> None:
+    from pylinguis.parsers.Segments import SegmentParser
+
+    expected = ast.dump(ast.parse("a = 1\nprint(a)\nif a == 1:\n    b = True\nc = True\nd = a + 1"))
+    for engine in [ "antlr", "fast" ]:
+        assert ast.dump(SegmentParser("en-us", engine=engine).parse(MIXED)) == expected
+
+def test_segments_cached_by_content() -> None:
+    from pylinguis.parsers.Segments import SegmentParser
+
+    segments = SegmentParser("en-us")
+    segments.parse(MIXED)
+    assert segments.cache.misses == 4
+
+    # Only the edited segment is parsed again, though every one after it has moved
+    module = segments.parse(MIXED.replace("b = vrai;", "b = vrai;\n    b = faux;"))
+    assert segments.cache.misses == 5
+    assert ast.unparse(module.body[2]) == "if a == 1:\n    b = True\n    b = False"
+    assert ast.unparse(module.body[3]) == "c = True"
+
+def test_segments_optimized_whole() -> None:
+    from pylinguis.parsers.Segments import SegmentParser
+
+    # Constants propagate across segments, once they're one Module
+    module = SegmentParser("en-us", optimize=True).parse(MIXED)
+    assert ast.unparse(module) == "a = 1\nprint(1)\nb = True\nc = True\nd = 2"
+    # ...but not when a later segment assigns to them again
+    module = SegmentParser("en-us", optimize=True).parse(MIXED + "#parser fr\na = 3;\n")
+    assert ast.unparse(module.body[1]) == "print(a)"
+
+def test_segments_report_source_lines() -> None:
+    from pylinguis.parsers.Segments import SegmentParser
+
+    for code, line in [ (MIXED.replace("c = uetray;", "c = ;"), 8), (MIXED + "#parser xx\n", 11) ]:
+        try:
+            SegmentParser("en-us", engine="fast").parse(code, "mixed.lin")
+            assert False, "Shouldn't get here, the code is broken!"
+        except SyntaxError as e:
+            assert (e.filename, e.lineno) == ("mixed.lin", line)
+
+########################################
+## In-memory memo of parsed modules and code objects
+##
+def test_memo_off_by_default() -> None:
+    parser = find_parser("en-us")
+    assert parser.memo is None
+
+def test_memo_hits_return_fresh_modules() -> None:
+    parser = find_parser("en-us", memo_size=4)
+    first = parser.parse("a = 1 + 2;")
+    first.body.clear()                  # Callers can't damage what's cached...
+    second = parser.parse("a = 1 + 2;")
+    second.body[0].targets[0].id = "b"  # ...whether it came from a miss or a hit
+    third = parser.parse("a = 1 + 2;")
+
+    assert ast.dump(third) == ast.dump(ast.parse("a = 1 + 2"))
+    assert third is not second
+    assert (parser.memo.hits, parser.memo.misses) == (2, 1)
+    assert parser.stats.total == 1
+
+def test_memo_compiles_once() -> None:
+    parser = find_parser("en-us", memo_size=4)
+    code = parser.compile_code("a = 6 * 7;", "prog.lin")
+    assert parser.compile_code("a = 6 * 7;", "prog.lin") is code
+    assert parser.compile_code("a = 6 * 7;", "other.lin").co_filename == "other.lin"
+
+    localvars = {}
+    exec(code, {}, localvars)
+    assert localvars["a"] == 42
+    assert parser.stats.total == 2
+
+def test_memo_evicts_least_recently_used() -> None:
+    parser = find_parser("en-us", memo_size=2)
+    parser.parse("a = 1;")
+    parser.parse("b = 2;")
+    parser.parse("a = 1;")      # Now "b = 2;" is the oldest...
+    parser.parse("c = 3;")      # ...and goes to make room
+
+    assert len(parser.memo) == 2
+    parser.parse("a = 1;")
+    parser.parse("b = 2;")
+    assert (parser.memo.hits, parser.memo.misses) == (2, 4)
+
+def test_memo_bypassed_when_tracing(tmp_path) -> None:
+    parser = find_parser("en-us", memo_size=4, trace=str(tmp_path))
+    parser.parse("a = 1;")
+    parser.parse("a = 1;")
+
+    assert parser.stats.total == 2
+    assert len(os.listdir(tmp_path)) == 6
+
+########################################
+## Optimizer (constant folding and propagation)
+##
+def optimized(code: str, engine: str = "antlr", inline: bool = False) -> str:
+    return ast.unparse(find_parser("en-us", engine=engine, optimize=True, inline=inline).parse(code))
+
+def test_optimizer_folds_constants() -> None:
+    for engine in [ "antlr", "fast" ]:
+        assert optimized("a = 666^2; b = ((2^2)^2)^2; c = -(1 + 2) * 4 % 5;", engine) == "a = 443556\nb = 256\nc = 3"
+        assert optimized("a = 1 < 2; b = 3 == 4 || 2 >= 2; c = !true;", engine) == "a = True\nb = True\nc = False"
+        assert optimized('s = "ab" + "cd";', engine) == "s = 'abcd'"
+
+def test_optimizer_off_by_default() -> None:
+    assert ast.unparse(find_parser("en-us").parse("a = 666^2;")) == "a = 666 ** 2"
+
+def test_optimizer_propagates_single_assignments() -> None:
+    code = """
+        n = 10;
+        m = n * 2;
+        k = 1;
+        k = k + 1;
+        j = k * 2;
+        def f(n)
+          return n + m;
+        end
+        """
+    assert optimized(code) == "n = 10\nm = 20\nk = 1\nk = k + 1\nj = k * 2\n\ndef f(n):\n    return n + 20"
+
+def test_optimizer_propagates_only_after_assignment() -> None:
+    code = """
+        def f()
+          return a;
+        end
+        a = 2;
+        b = a + f();
+        """
+    assert optimized(code).endswith("a = 2\nb = 2 + f()")
+    assert "return a" in optimized(code)
+
+def test_optimizer_prunes_dead_branches() -> None:
+    code = """
+        if false do
+          println("never");
+        else do
+          println("always");
+        end
+        while 1 > 2 do
+          println("never");
+        end
+        def f(x)
+          if 1 == 2 do
+            return x;
+          end
+        end
+        assert(2^10 == 1024);
+        """
+    assert optimized(code) == "print('always')\n\ndef f(x):\n    pass"
+
+def test_optimizer_squares_loop_counters_by_multiplying() -> None:
+    code = "for i = 1 to 10 do\n println(i^2);\nend\ndef sq(x)\n return x^2;\nend\nb = sq(3)^2;"
+    for engine in [ "antlr", "fast" ]:
+        assert optimized(code, engine) == "for i in range(1, 10):\n    print(i * i)\n\ndef sq(x):\n    return x ** 2\nb = sq(3) ** 2"
+    # Not once the counter is assigned something else, nor once range isn't the builtin
+    assert "i ** 2" in optimized("for i = 1 to 10 do\n i = i / 2;\n println(i^2);\nend")
+    assert "i ** 2" in optimized("def range(a, b)\n return [ 1.5 ];\nend\nfor i = 1 to 10 do\n println(i^2);\nend")
+
+def test_optimizer_leaves_float_squares_to_overflow() -> None:
+    code = "def sq(x)\n return x^2;\nend\nbig = 1.0;\nfor i = 1 to 300 do\n big = big * 10;\nend\nb = sq(big);"
+    for engine in [ "antlr", "fast" ]:
+        for optimize in [ False, True ]:
+            with pytest.raises(OverflowError):
+                exec(find_parser("en-us", engine=engine, optimize=optimize).compile_code(code), {}, {})
+
+def test_optimizer_leaves_what_would_raise_or_blow_up() -> None:
+    assert optimized("a = 1/0;") == "a = 1 / 0"
+    assert optimized("a = 10^10^10;") == "a = 10 ** 10000000000"
+    assert optimized('a = "ab" * 10000;') == "a = 'ab' * 10000"
+    assert optimized("a = 2^64;") == "a = 18446744073709551616"
+
+def test_optimizer_keeps_behaviour() -> None:
+    code = """
+        total = 0;
+        limit = 10;
+        for i = 1 to limit do
+          if i % 2 == 0 && true do
+            total = total + i^2;
+          end
+        end
+        assert(total == 2^2 + 4^2 + 6^2 + 8^2);
+        """
+    for engine in [ "antlr", "fast" ]:
+        results = []
+        for optimize in [ False, True ]:
+            localvars = {}
+            exec(find_parser("en-us", engine=engine, optimize=optimize).compile_code(code), {}, localvars)
+            results.append((localvars["total"], localvars["limit"]))
+        assert results[0] == results[1] == (120, 10)
+
+########################################
+## Inliner
+##
+def test_inliner_inlines_small_helpers() -> None:
+    code = """
+        def twice(n)
+          temp = n + n;
+          return temp;
+        end
+        def squared(n)
+          return n*n;
+        end
+        def squaredAndTwice(n)
+          return twice(squared(n));
+        end
+        a = squaredAndTwice(x);
+        b = squared(squared(squared(2)));
+        """
+    module = optimized(code, inline=True)
+    assert module.endswith("a = x * x + x * x\nb = 256")
+    # The functions stay, for anyone who calls them by name
+    assert "def squaredAndTwice(n):\n    return n * n + n * n" in module
+    assert optimized(code).endswith("a = squaredAndTwice(x)\nb = squared(squared(squared(2)))")
+
+def test_inliner_keeps_evaluation_order(capsys) -> None:
+    code = """
+        def p(x)
+          println(x);
+          return x;
+        end
+        def ab(a, b)
+          return a - b;
+        end
+        def ba(a, b)
+          return b - a;
+        end
+        def second(a, b)
+          return b;
+        end
+        c = ab(p(1), p(2));
+        d = ba(p(3), p(4));
+        e = second(p(5), 6);
+        """
+    module = optimized(code, inline=True)
+    assert "c = p(1) - p(2)" in module
+    assert "d = ba(p(3), p(4))" in module     # Would call p(4) first
+    assert "e = second(p(5), 6)" in module    # Would never call p(5)
+
+    localvars = {}
+    exec(find_parser("en-us", optimize=True).compile_code(code), { "print": print }, localvars)
+    assert capsys.readouterr().out.split() == [ str(n) for n in range(1, 6) ]
+    assert (localvars["c"], localvars["d"], localvars["e"]) == (-1, 1, 6)
+
+def test_inliner_leaves_what_it_cannot_inline() -> None:
+    code = """
+        def fib(n)
+          if n < 2 do
+            return n;
+          end
+          return fib(n-1) + fib(n-2);
+        end
+        def one()
+          return 1;
+        end
+        one = 2;
+        def big(n)
+          return n+n+n+n+n+n+n+n+n+n+n+n+n+n+n+n+n+n+n+n+n+n;
+        end
+        def k()
+          return g;
+        end
+        def shadowed(g)
+          return k();
+        end
+        a = fib(10) + one() + big(1);
+        """
+    module = optimized(code, inline=True)
+    assert "a = fib(10) + one() + big(1)" in module
+    assert "return k()" in module
+
+def test_inliner_thresholds(monkeypatch) -> None:
+    from pylinguis.parsers import Inliner
+
+    code = "def f(n)\n return n * n + 1;\nend\na = f(x);"
+    assert optimized(code, inline=True).endswith("a = x * x + 1")
+    monkeypatch.setattr(Inliner, "MAX_BODY_NODES", 4)
+    assert optimized(code, inline=True).endswith("a = f(x)")
+
+########################################
+## Tail calls
+##
+DEEP = """
+def count(n, total)
+  if n == 0 do
+    return total;
+  end
+  return count(n - 1, total + n);
+end
+def swap(a, b, n)
+  if n == 0 do
+    return [a, b];
+  end
+  return swap(b, a, n - 1);
+end
+def down(n)
+  if n > 0 do
+    return down(n - 1);
+  end
+end
+total = count(1000000, 0);
+swapped = swap(1, 2, 1000001);
+fell = down(1000000);
+"""
+
+def test_tail_calls_recurse_a_million_deep() -> None:
+    for engine in [ "antlr", "fast" ]:
+        parser = find_parser("en-us", engine=engine, optimize=True)
+        namespace = parser.runtime.run(parser.compile_code(DEEP))
+        assert namespace["total"] == 500000500000
+        assert namespace["swapped"] == [ 2, 1 ]
+        assert namespace["fell"] is None
+
+    with pytest.raises(RecursionError):
+        parser = find_parser("en-us")
+        parser.runtime.run(parser.compile_code(DEEP))
+
+def test_tail_calls_become_loops() -> None:
+    module = optimized(DEEP)
+    assert "def count(n, total):\n    while True:\n        if n == 0:\n            return total\n" \
+           "        n, total = (n - 1, total + n)\n        continue" in module
+    assert "def down(n):\n    while True:\n        if n > 0:\n            n = n - 1\n            continue\n        return" in module
+
+def test_tail_calls_only_when_safe() -> None:
+    code = """
+        def fact(n)
+          if n < 2 do
+            return 1;
+          end
+          return n * fact(n - 1);
+        end
+        def looped(n)
+          for i = 0 to n do
+            return looped(i);
+          end
+          return 0;
+        end
+        def rebound(n)
+          return rebound(n - 1);
+        end
+        rebound = 1;
+        """
+    module = optimized(code)
+    assert "while True" not in module
+    assert "return looped(i)" in module and "return rebound(n - 1)" in module
+
+########################################
+## Memoizing pure functions
+##
+PURE = """
+def fib(n)
+  if n < 2 do
+    return n;
+  end
+  return fib(n-1) + fib(n-2);
+end
+def choose(n, k)
+  if k == 0 || k == n do
+    return 1;
+  end
+  return choose(n - 1, k - 1) + choose(n - 1, k);
+end
+def range_of(n)
+  if n == 0 do
+    return [];
+  end
+  return range_of(n - 1) + [n];
+end
+def loud(n)
+  println(n);
+  if n < 1 do
+    return 0;
+  end
+  return loud(n - 1);
+end
+def calls_loud(n)
+  if n < 1 do
+    return loud(n);
+  end
+  return calls_loud(n - 1);
+end
+limit = input("");
+def capped(n)
+  if n > limit do
+    return limit;
+  end
+  return capped(n + 1);
+end
+def squared(n)
+  return n * n;
+end
+"""
+
+def test_memoize_finds_pure_functions() -> None:
+    from pylinguis.parsers import Memoize
+
+    for engine in [ "antlr", "fast" ]:
+        module = find_parser("en-us", engine=engine, optimize=True, inline=False, memoize=False).parse(PURE)
+        assert sorted(Memoize.pure_functions(module)) == [ "choose", "fib", "range_of", "squared" ]
+        # squared neither recurses nor loops, and isn't worth a cache
+        assert Memoize.memoize(module) == [ "fib", "choose", "range_of" ]
+
+def test_memoize_fib_in_linear_time() -> None:
+    from pylinguis.parsers.Memoize import memos
+
+    code = PURE + "a = fib(90); b = choose(60, 30); c = range_of(3); d = range_of(3);"
+    for engine in [ "antlr", "fast" ]:
+        for fast_locals in [ False, True ]:
+            parser = find_parser("en-us", engine=engine, optimize=True, fast_locals=fast_locals)
+            namespace = parser.runtime.namespace()
+            namespace["input"] = lambda prompt: 10
+            exec(parser.compile_code(code), namespace)
+            stats = memos(namespace)
+            assert stats["fib"].misses == 91 and stats["fib"].hits == 88
+            assert stats["choose"].currsize == stats["choose"].misses == 960
+            # Lists aren't kept, since whoever gets one may change it
+            assert stats["range_of"].hits == 0 and stats["range_of"].currsize == 0
+            if not fast_locals:
+                assert namespace["a"] == 2880067194370816120 and namespace["b"] == 118264581564861424
+                assert namespace["c"] == namespace["d"] == [ 1, 2, 3 ] and namespace["c"] is not namespace["d"]
+
+def test_memoize_opt_out() -> None:
+    assert "@__linguis_memoized__\ndef fib" in optimized(PURE)
+    assert "memoized" not in ast.unparse(find_parser("en-us", optimize=True, memoize=False).parse(PURE))
+    module = ast.unparse(find_parser("en-us", optimize=True, no_memoize=[ "fib" ]).parse(PURE))
+    assert "@__linguis_memoized__\ndef choose" in module and "@__linguis_memoized__\ndef fib" not in module
+    assert "memoized" not in ast.unparse(find_parser("en-us").parse(PURE))
+
+def test_memoized_tells_types_apart() -> None:
+    from pylinguis.parsers.Memoize import memoized
+
+    namespace = {}
+    exec("def same(x):\n    return x\n", namespace)
+    same = memoized(namespace["same"])
+    assert same(1) == 1 and same(True) is True and type(same(1.0)) is float
+    assert same([ 1 ]) == [ 1 ] and same(1) == 1
+    assert same.cache_info() == (1, 4, 4096, 3)
+    assert namespace["__linguis_memos__"] == { "same": same }
+
+########################################
+## Fast-locals mode
+##
+FIB = """
+def fib(n)
+  if n < 2 do
+    return n;
+  end
+  return fib(n-1) + fib(n-2);
+end
+total = 0;
+for i = 1 to 10 do
+  total = total + fib(i);
+end
+println(total);
+"""
+
+def test_fast_locals_wraps_top_level() -> None:
+    module = find_parser("en-us", fast_locals=True).parse("a = 1;\nb = a + 1;")
+    assert ast.unparse(module) == "def __linguis_main__():\n    a = 1\n    b = a + 1\n__linguis_main__()"
+    assert find_parser("en-us", fast_locals=True).parse("").body == []
+
+def test_fast_locals_functions_see_each_other(capsys) -> None:
+    for engine in [ "antlr", "fast" ]:
+        # Run the way tests (and embedders) often do, with separate globals and locals:
+        # plain exec leaves fib unable to find itself...
+        with pytest.raises(NameError):
+            exec(find_parser("en-us", engine=engine).compile_code(FIB), {}, {})
+        # ...but as locals of the wrapper, the functions and top-level names are all closures' cells
+        localvars = {}
+        exec(find_parser("en-us", engine=engine, fast_locals=True).compile_code(FIB), {}, localvars)
+        assert capsys.readouterr().out.endswith("88\n")
+        assert list(localvars) == [ "__linguis_main__" ]
+
+def test_fast_locals_compiles_to_fast_locals() -> None:
+    code = find_parser("en-us", fast_locals=True).compile_code(FIB)
+    main = next(c for c in code.co_consts if isinstance(c, type(code)))
+    assert {"total", "i"} <= set(main.co_varnames)
+    assert "fib" in main.co_cellvars
+
+def test_fast_locals_with_segments() -> None:
+    from pylinguis.parsers.Segments import SegmentParser
+
+    module = SegmentParser("en-us", fast_locals=True).parse(MIXED)
+    assert [ type(node) for node in module.body ] == [ ast.FunctionDef, ast.Expr ]
+    assert len(module.body[0].body) == 5
+
+########################################
+## Runtime namespaces
+##
+def test_runtime_built_once_per_parser() -> None:
+    parser = find_parser("en-us")
+    assert parser.runtime is parser.runtime
+    assert parser.runtime is not find_parser("en-us").runtime
+
+def test_runtime_namespace_is_minimal() -> None:
+    namespace = find_parser("fr", engine="fast").runtime.namespace()
+    assert set(namespace) == { "__name__", "__builtins__", "print", "input", "len", "range" }
+    assert namespace["__name__"] == "__main__"
+
+def test_runtime_builtins_are_restricted() -> None:
+    parser = find_parser("en-us", optimize=True)
+    first, second = parser.runtime.namespace(), parser.runtime.namespace()
+    assert set(first["__builtins__"]) == { "__import__" }
+    assert first["__builtins__"] is not second["__builtins__"]
+
+    # The passes' helpers still import; nothing else does
+    code = "def fib(n)\n if n < 2 do\n  return n;\n end\n return fib(n - 1) + fib(n - 2);\nend\nf = fib(30);"
+    assert parser.runtime.run(parser.compile_code(code))["f"] == 832040
+    with pytest.raises(ImportError):
+        first["__builtins__"]["__import__"]("os")
+    with pytest.raises(NameError):
+        parser.runtime.run(parser.compile_code("a = open;"))
+
+def test_runtime_programs_are_isolated() -> None:
+    parser = find_parser("en-us")
+    first = parser.runtime.run(parser.compile_code("a = 1; def f(n) return n + a; end"))
+    assert first["f"](1) == 2
+
+    with pytest.raises(NameError):
+        parser.runtime.run(parser.compile_code("b = a;"))
+    assert "a" not in parser.runtime.template and "f" not in parser.runtime.template
+
+def test_runtime_uses_parser_builtins(capsys) -> None:
+    class Shouting(type(find_parser("en-us"))):
+        def builtins(self):
+            return { **super().builtins(), "print": lambda *args, **kwargs: print(*[ str(a).upper() for a in args ], **kwargs) }
+
+    parser = Shouting()
+    parser.runtime.run(parser.compile_code('println("hi");'))
+    assert capsys.readouterr().out == "HI\n"
+
+########################################
+## List operators
+##
+MATHS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "examples", "maths.lin")
+
+def test_list_operators_in_maths_example() -> None:
+    for engine in [ "antlr", "fast" ]:
+        for numpy_lists in [ False, True ]:
+            parser = find_parser("en-us", engine=engine, numpy_lists=numpy_lists)
+            # Its asserts include [1] + 1 == [1,1], [1,2,3,4,5] - 4 == [1,2,3,5] and [1,2,3] * 2
+            parser.runtime.run(compile(parser.parse_file(MATHS), MATHS, "exec"))
+
+def test_list_operators() -> None:
+    code = """
+        a = [1, 2, 3, 4, 4, 5];
+        appended = a + 6;
+        prepended = 0 + a;
+        joined = a + [7, 8];
+        nested = [1] + [[2]];
+        removed = a - 4;
+        each = a - [1, 5];
+        repeated = [1, 2] * 2;
+        twice = 2 * [1.5];
+        """
+    for engine in [ "antlr", "fast" ]:
+        for numpy_lists in [ False, True ]:
+            parser = find_parser("en-us", engine=engine, numpy_lists=numpy_lists)
+            namespace = parser.runtime.run(parser.compile_code(code))
+            assert namespace["a"] == [ 1, 2, 3, 4, 4, 5 ]
+            assert namespace["appended"] == [ 1, 2, 3, 4, 4, 5, 6 ]
+            assert namespace["prepended"] == [ 0, 1, 2, 3, 4, 4, 5 ]
+            assert namespace["joined"] == [ 1, 2, 3, 4, 4, 5, 7, 8 ]
+            assert namespace["nested"] == [ 1, [ 2 ] ]
+            assert namespace["removed"] == [ 1, 2, 3, 5 ]
+            assert namespace["each"] == [ 2, 3, 4, 4 ]
+            assert namespace["repeated"] == [ 1, 2, 1, 2 ] and namespace["twice"] == [ 1.5, 1.5 ]
+            # What they make are lists too
+            assert namespace["removed"] + 9 == [ 1, 2, 3, 5, 9 ]
+
+    with pytest.raises(TypeError):
+        parser = find_parser("en-us")
+        parser.runtime.run(parser.compile_code("a = 1 - [1];"))
+
+########################################
+## NumPy-backed lists
+##
+LISTS = """
+a = [1, 2, 3, 4, 5];
+b = [0.5, 1.5];
+c = ["x", 1];
+repeated = [1, 2, 3] * 2;
+joined = a + b;
+found = 3 in a;
+n = size(a) + a[4] + a[-1];
+same = a == [1, 2, 3, 4, 5];
+"""
+
+# Each is run with numpy_lists on and off, and must come out (or fail) the same either way
+SAME_EITHER_WAY = [
+    "[] + [1]", "[1, 2] + [3]", "[1] + [2.5]", "[1.5] + [\"a\"]", "[1] + [[2]]", "[1] + []", "[] + [1.5] + [2]",
+    "[1] + 1", "[] + 1", "[\"a\"] + \"b\"", "1 + [1]", "\"a\" + [1]", "[1, 2] - 1", "[1, 2] - [1]", "-[1]",
+    "[1, 2, 3, 4, 5] - 4", "[1, 2, 1] - [1]", "[1.5, 2.5] - 1.5", "[1, 2] - 1.0", "[1.5] - 1", "[1, 2] - true",
+    "[1] + 1.5", "[1.5] + 1", "[1] + true", "[1] - \"a\"", "[1] - [[1]]", "2.5 + [1]", "1 - [1]", "([1] + 1) - 1",
+    "[1, 2] * 2", "2 * [1, 2]", "[1] * 0", "[1] * -1", "[1] * true", "[1] * 1.5", "[1] * [2]",
+    "[1, 2] / 2", "[1, 2] % 2", "[1, 2] ^ 2",
+    "[1, 2, 3][1]", "[1, 2, 3][-1]", "[1, 2, 3][5]", "[1, 2][true]", "[1, 2][1.0]", "[1.5, 2.5][0]",
+    "3 in [1, 2, 3]", "3.0 in [1, 2, 3]", "1 in [1.0]", "true in [1, 2]", "\"a\" in [1]",
+    "[1, 2] == [1, 2]", "[1, 2] == [1.0, 2.0]", "[1] == 1", "[1, 2] < [1, 3]", "[1] < [1.5]", "[1] < 2",
+    "size([1, 2] + [3])", "[9223372036854775807] + [1]", "[9223372036854775807] + [9223372036854775808]",
+    "[1, 2] + [true]", "([1] + [\"a\"])[1]", "([1] + [2.5])[0]",
+]
+
+def outcome(parser, expression: str) -> tuple:
+    try:
+        value = parser.runtime.run(parser.compile_code(f"r = {expression};"))["r"]
+    except Exception as e:
+        return type(e).__name__, str(e)
+    # A NumericList is how numpy_lists spells a list
+    kind = lambda v: "list" if type(v).__name__ in ("LinguisList", "NumericList") else type(v).__name__
+    return repr(value), kind(value), [ kind(v) for v in value ] if kind(value) == "list" else None
+
+def test_numpy_lists_behave_as_lists() -> None:
+    pytest.importorskip("numpy")
+    from pylinguis.parsers.NumericList import NumericList
+
+    for engine in [ "antlr", "fast" ]:
+        for optimize in [ False, True ]:
+            parser = find_parser("en-us", engine=engine, optimize=optimize, numpy_lists=True)
+            namespace = parser.runtime.run(parser.compile_code(LISTS))
+            assert type(namespace["a"]) is NumericList and namespace["a"].items.dtype == "int64"
+            assert type(namespace["b"]) is NumericList and namespace["b"].items.dtype == "float64"
+            assert type(namespace["c"]) is LinguisList
+            assert namespace["repeated"] == [ 1, 2, 3, 1, 2, 3 ]
+            # Ints joined to floats stay ints
+            assert namespace["joined"] == [ 1, 2, 3, 4, 5, 0.5, 1.5 ] and type(namespace["joined"][0]) is int
+            assert namespace["found"] is True and namespace["same"] is True
+            assert namespace["n"] == 15 and type(namespace["a"][0]) is int
+
+def test_numpy_lists_compute_what_lists_do() -> None:
+    pytest.importorskip("numpy")
+
+    for optimize in [ False, True ]:
+        plain = find_parser("en-us", optimize=optimize)
+        numeric = find_parser("en-us", optimize=optimize, numpy_lists=True)
+        for expression in SAME_EITHER_WAY:
+            assert outcome(numeric, expression) == outcome(plain, expression), expression
+
+def test_numpy_lists_print_as_lists(capsys) -> None:
+    pytest.importorskip("numpy")
+
+    parser = find_parser("en-us", numpy_lists=True)
+    parser.runtime.run(parser.compile_code('println([1, 2] + [3]); println([1.5] + ["a"]); println([[1], []]);'))
+    assert capsys.readouterr().out == "[1, 2, 3]\n[1.5, 'a']\n[[1], []]\n"
+
+def test_numpy_lists_off_by_default() -> None:
+    for engine in [ "antlr", "fast" ]:
+        assert ast.unparse(find_parser("en-us", engine=engine).parse("a = [1, [2]];")) == \
+            "from pylinguis.parsers.Runtime import LinguisList as __linguis_list__\na = __linguis_list__([1, __linguis_list__([2])])"
+        assert ast.unparse(find_parser("en-us", engine=engine, numpy_lists=True).parse("a = [1, [2]];")) == \
+            "from pylinguis.parsers.NumericList import make_list as __linguis_list__\na = __linguis_list__([1, __linguis_list__([2])])"
+    assert "__linguis_list__" not in ast.unparse(find_parser("en-us").parse("a = 1;"))
+
+########################################
+## Source locations
+##
+LOCATED = """a = 1;
+def f(n)
+  if n > 2 do
+    return f(n - 1) + size([1, 2]);
+  end
+  return 10 / (n - n);
+end
+for i = 0 to 2 do
+  print(i);
+end
+assert(a == 1);
+println(f(4));
+"""
+
+def unlocated(module: ast.Module) -> list:
+    return [ type(n).__name__ for n in ast.walk(module) if "lineno" in n._attributes and getattr(n, "lineno", None) is None ]
+
+def test_locations_from_the_source() -> None:
+    module = find_parser("en-us").parse(LOCATED)
+    assert unlocated(module) == []
+    # After the import of what builds its lists
+    function = module.body[2]
+    assert (function.lineno, function.col_offset, function.end_lineno, function.end_col_offset) == (2, 0, 7, 3)
+    division = function.body[1].value
+    assert (division.lineno, division.col_offset, division.end_lineno, division.end_col_offset) == (6, 9, 6, 21)
+    assert [ (arg.lineno, arg.col_offset) for arg in function.args.args ] == [ (2, 6) ]
+
+    # The fast engine puts everything in the same places
+    for options in [ {}, { "optimize": True }, { "optimize": True, "fast_locals": True } ]:
+        antlr = find_parser("en-us", **options).parse(LOCATED)
+        fast = find_parser("en-us", engine="fast", **options).parse(LOCATED)
+        assert unlocated(antlr) == unlocated(fast) == []
+        assert ast.dump(antlr, include_attributes=True) == ast.dump(fast, include_attributes=True)
+
+def test_tracebacks_point_at_linguis_lines(tmp_path) -> None:
+    source = tmp_path / "prog.lin"
+    source.write_text(LOCATED)
+    for engine in [ "antlr", "fast" ]:
+        for optimize in [ False, True ]:
+            parser = find_parser("en-us", engine=engine, optimize=optimize)
+            code = compile(parser.parse_file(str(source)), str(source), "exec")
+            with contextlib.redirect_stdout(None), pytest.raises(ZeroDivisionError) as e:
+                parser.runtime.run(code)
+            lines = [ (entry.name, entry.lineno + 1) for entry in e.traceback if str(entry.path) == str(source) ]
+            assert lines[0] == ("<module>", 12) and lines[-1] == ("f", 6)
+
+def test_segment_locations_are_the_files() -> None:
+    from pylinguis.parsers.Segments import SegmentParser
+
+    module = SegmentParser().parse("a = 1;\n#parser fr\nb = 2;\n\nc = 3;\n#parser en-us\nd = 4;\n")
+    assert unlocated(module) == []
+    assert [ statement.lineno for statement in module.body ] == [ 1, 3, 5, 7 ]
+
+########################################
+## Stage timings
+##
+def test_timings_stage_by_stage(tmp_path, capsys) -> None:
+    from pylinguis.parsers.Timings import run_file
+
+    source = tmp_path / "prog.lin"
+    program = LOCATED.replace("10 / (n - n)", "n")
+    source.write_text(program)
+    antlr = run_file(find_parser("en-us"), str(source))
+    fast = run_file(find_parser("en-us", engine="fast"), str(source))
+    assert capsys.readouterr().out == "016\n016\n"
+    assert [ stage.name for stage in antlr.stages ] == [ "read", "lex", "parse", "visit", "transform", "compile", "exec" ]
+    assert [ stage.name for stage in fast.stages ] == [ "read", "lex", "parse", "transform", "compile", "exec" ]
+
+    # Both engines see the same tokens and build the same AST; only ANTLR has a parse tree
+    assert antlr.counts["tokens"] == fast.counts["tokens"] == 64
+    assert antlr.counts["ast_nodes"] == fast.counts["ast_nodes"] == len(list(ast.walk(find_parser("en-us").parse(program))))
+    assert antlr.counts["parse_tree_nodes"] > antlr.counts["tokens"] and fast.counts["parse_tree_nodes"] is None
+    assert antlr.wall == pytest.approx(sum(stage.wall for stage in antlr.stages))
+    assert json.loads(json.dumps(antlr.as_dict()))["stages"][2]["name"] == "parse"
+    assert "Timings for prog.lin (64 tokens, " in antlr.report()